@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from src.config import VERSION
+from src.antispam import SpamGuard
+import src.cogs.automod as automod
+from src.cogs.automod import AutoMod
+from benchmarks.handlers import FakeBot, FakeGuild, FakeUser, FakeChannel, FakeMessage, BENCH_GUILD_ID
+
+# Throughput of the anti-spam / anti-raid engine on synthetic traffic.
+#
+#   python -m benchmarks.antispam --events 200000
+#   python -m benchmarks.antispam --only on_message --spammers 0.05
+#
+# "engine" drives SpamGuard directly; "on_message" and "on_member_join" go
+# through the AutoMod listeners with the fake Discord objects from
+# benchmarks.handlers, spread over --guilds guilds. Ordinary members chat at
+# a normal pace; a --spammers fraction of them floods and repeats itself.
+# Actions are set to "log", so flagged members only produce (counted)
+# mod-log entries. No database is involved.
+
+CHATTER = [
+    "hello everyone", "anyone up for a game tonight?", "gm", "lol", "that patch broke my build again",
+    "check the pinned message", "nice", "which channel is for support?", "brb", "thanks!",
+]
+SPAM = "FREE NITRO >>> discord-gift.example/claim <<<"
+_ids = itertools.count(2_000_000)
+
+def _traffic(events, guilds, spammers, seed):
+    """(guild index, user index, content, is spam) for each event; users are per guild."""
+    rng = random.Random(seed)
+    users = max(10, events // 20)
+    spammer_count = max(1, int(users * spammers))
+    traffic = []
+    for _ in range(events):
+        guild = rng.randrange(guilds)
+        if rng.random() < spammers * 4:
+            traffic.append((guild, rng.randrange(spammer_count), SPAM, True))
+        else:
+            traffic.append((guild, rng.randrange(spammer_count, users), f"{rng.choice(CHATTER)} {rng.randrange(1000)}", False))
+    return traffic
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+def _result(name, events, elapsed, latencies, **extra):
+    latencies.sort()
+    return {
+        "scenario": name,
+        "events": events,
+        "seconds": round(elapsed, 4),
+        "events_per_sec": round(events / elapsed, 1),
+        "p50_us": round(_percentile(latencies, 50) * 1_000_000, 3),
+        "p99_us": round(_percentile(latencies, 99) * 1_000_000, 3),
+        **extra,
+    }
+
+async def engine(args):
+    guard = SpamGuard()
+    traffic = _traffic(args.events, args.guilds, args.spammers, args.seed)
+    latencies = []
+    flagged = 0
+    now = 0.0
+    step = 1 / args.rate
+    started = time.perf_counter()
+    for guild, user, content, _ in traffic:
+        now += step
+        t = time.perf_counter()
+        if guard.message(guild, user, content, now):
+            flagged += 1
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+    return _result("engine", args.events, elapsed, latencies, flagged=flagged, tracked_users=guard.stats["users"])
+
+async def on_message(args):
+    guilds = [FakeGuild(BENCH_GUILD_ID + i, inviters=0) for i in range(args.guilds)]
+    bot = FakeBot(guilds[0])
+    cog = AutoMod(bot)
+    channels = [FakeChannel(next(_ids), guild) for guild in guilds]
+    users = {}
+
+    # Build every message up front so only the handler is measured
+    messages = []
+    for guild, user, content, _ in _traffic(args.events, args.guilds, args.spammers, args.seed):
+        key = (guild, user)
+        if key not in users:
+            users[key] = FakeUser(next(_ids), guilds[guild])
+        messages.append(FakeMessage(users[key], channels[guild], content))
+
+    latencies = []
+    started = time.perf_counter()
+    for i, message in enumerate(messages):
+        t = time.perf_counter()
+        await cog.on_message(message)
+        latencies.append(time.perf_counter() - t)
+        if i % 1000 == 0:
+            # Let queued actions run, as they would between gateway events
+            await asyncio.sleep(0)
+    while cog._tasks:
+        await asyncio.gather(*cog._tasks)
+    elapsed = time.perf_counter() - started
+    return _result("on_message", args.events, elapsed, latencies,
+                   flagged=cog.guard.stats["flagged"], modlog_entries=bot.modlog.entries)
+
+async def on_member_join(args):
+    guild = FakeGuild(BENCH_GUILD_ID, inviters=0)
+    bot = FakeBot(guild)
+    cog = AutoMod(bot)
+    members = [FakeUser(next(_ids), guild) for _ in range(args.events)]
+
+    latencies = []
+    started = time.perf_counter()
+    for i, member in enumerate(members):
+        t = time.perf_counter()
+        await cog.on_member_join(member)
+        latencies.append(time.perf_counter() - t)
+        if i % 1000 == 0:
+            await asyncio.sleep(0)
+    while cog._tasks:
+        await asyncio.gather(*cog._tasks)
+    elapsed = time.perf_counter() - started
+    return _result("on_member_join", args.events, elapsed, latencies,
+                   raids=cog.guard.stats["raids"], modlog_entries=bot.modlog.entries)
+
+SCENARIOS = {
+    "engine": engine,
+    "on_message": on_message,
+    "on_member_join": on_member_join,
+}
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark spam and raid detection.")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="Comma separated scenarios to run.")
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--spammers", type=float, default=0.01, help="Fraction of members who spam.")
+    parser.add_argument("--rate", type=float, default=20_000, help="Simulated messages/sec for the engine's clock.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    automod.ANTISPAM_ACTION = "log"
+    automod.RAID_ACTION = "log"
+
+    results = []
+    for name in args.only.split(","):
+        result = await SCENARIOS[name](args)
+        results.append(result)
+        print(f"{name:<16} {result['events_per_sec']:>12.1f} ev/s  p50 {result['p50_us']:.2f}us  p99 {result['p99_us']:.2f}us")
+
+    print(json.dumps({"version": VERSION, "results": results}, indent=2))
+
+if __name__ == '__main__':
+    asyncio.run(main())
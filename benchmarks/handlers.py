@@ -0,0 +1,339 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from datetime import datetime, timezone
+from sqlalchemy import delete
+from src.config import VERSION
+from src.intents import get_profile
+from src.scheduler import Scheduler
+from src.database.db import init_db, async_session, engine
+from src.database.metrics import db_metrics
+from src.database.cache import guild_configs, reaction_roles
+from src.database.models import (
+    GuildConfig, UserProfile, UserHistory, Warning, Ticket, ActivityHourly, ActivityDaily
+)
+import src.cogs.tracking as tracking
+from src.cogs.tracking import Tracking
+from src.cogs.roles import Roles
+from src.cogs.moderation import Moderation
+from src.cogs.tickets import TicketSelect
+
+# Micro-benchmarks for the hot event and command handlers.
+#
+#   python -m benchmarks.handlers --events 5000
+#   python -m benchmarks.handlers --only on_message,warn
+#   DATABASE_URL=sqlite+aiosqlite:///bench.db python -m benchmarks.handlers
+#
+# Each scenario calls the real handler with lightweight fake Discord objects
+# (no gateway, no HTTP) against the configured database, and reports
+# events/sec, p50/p99 handler latency and database round trips per event. The
+# time to drain write-behind buffers and background tasks afterwards counts
+# towards events/sec and round trips, so batching shows up as it would in
+# production. Rows are written under BENCH_GUILD_ID and deleted afterwards.
+# Mod-log entries are counted, not posted.
+
+BENCH_GUILD_ID = 42 # Not a valid snowflake, so it can't collide with a real guild
+BENCH_ROLE_ID = 4242
+_ids = itertools.count(1_000_000)
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+        self.mention = f"<@&{role_id}>"
+
+class FakeUser:
+    def __init__(self, user_id, guild=None, bot=False):
+        self.id = user_id
+        self.guild = guild
+        self.bot = bot
+        self.name = f"user{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+
+    async def add_roles(self, *roles, reason=None):
+        pass
+
+    async def remove_roles(self, *roles, reason=None):
+        pass
+
+    async def send(self, *args, **kwargs):
+        pass
+
+class FakeChannel:
+    def __init__(self, channel_id, guild, name="general"):
+        self.id = channel_id
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, *args, **kwargs):
+        pass
+
+class FakeInvite:
+    def __init__(self, code, inviter):
+        self.code = code
+        self.inviter = inviter
+        self.uses = 0
+        self.max_uses = 0
+
+class FakeGuild:
+    def __init__(self, guild_id, inviters=20):
+        self.id = guild_id
+        self.name = "Benchmark Guild"
+        self.features = []
+        self.default_role = FakeRole(guild_id)
+        self.me = FakeUser(1, self, bot=True)
+        self.roles = {BENCH_ROLE_ID: FakeRole(BENCH_ROLE_ID)}
+        self.channels = {}
+        self.invite_list = [FakeInvite(f"code{i}", FakeUser(next(_ids), self)) for i in range(inviters)]
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_member(self, user_id):
+        return None
+
+    async def invites(self):
+        return list(self.invite_list)
+
+    async def create_text_channel(self, name, category=None, overwrites=None):
+        channel = FakeChannel(next(_ids), self, name)
+        self.channels[channel.id] = channel
+        return channel
+
+class FakeResponse:
+    async def send_message(self, *args, **kwargs):
+        pass
+
+    async def defer(self, *args, **kwargs):
+        pass
+
+class FakeFollowup:
+    async def send(self, *args, **kwargs):
+        pass
+
+class FakeInteraction:
+    def __init__(self, bot, guild, user, channel):
+        self.client = bot
+        self.guild = guild
+        self.user = user
+        self.channel = channel
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+class FakeModLog:
+    def __init__(self):
+        self.entries = 0
+
+    def enqueue(self, guild, content):
+        self.entries += 1
+
+class FakeBot:
+    def __init__(self, guild):
+        self.guild = guild
+        self.guilds = [guild]
+        self.shard_ids = None
+        self.intent_profile = get_profile("full")
+        self.modlog = FakeModLog()
+        self.scheduler = Scheduler(self)
+
+    def get_guild(self, guild_id):
+        return self.guild if guild_id == self.guild.id else None
+
+    def get_channel(self, channel_id):
+        return self.guild.get_channel(channel_id)
+
+    def request_chunk(self, guild):
+        pass
+
+class FakeMessage:
+    def __init__(self, author, channel, content=""):
+        self.author = author
+        self.guild = channel.guild
+        self.channel = channel
+        self.content = content
+        self.created_at = datetime.now(timezone.utc)
+
+class FakeReactionPayload:
+    def __init__(self, guild_id, message_id, emoji, member):
+        self.guild_id = guild_id
+        self.message_id = message_id
+        self.emoji = emoji
+        self.member = member
+        self.user_id = member.id
+
+# Scenarios: setup(bot, events) returns (handler, drain); handler(i) handles one event
+
+async def on_message(bot, events):
+    cog = Tracking(bot)
+    channels = [FakeChannel(next(_ids), bot.guild) for _ in range(10)]
+    users = [FakeUser(next(_ids), bot.guild) for _ in range(max(1, events // 20))]
+
+    async def handle(i):
+        await cog.on_message(FakeMessage(random.choice(users), random.choice(channels)))
+
+    async def drain():
+        await cog.message_counts.close()
+        await cog.activity.close()
+
+    return handle, drain
+
+async def on_raw_reaction_add(bot, events, tracked_fraction=0.1):
+    cog = Roles(bot)
+    await reaction_roles.load_all()
+    tracked = [next(_ids) for _ in range(50)]
+    for message_id in tracked:
+        reaction_roles.add(message_id, "✅", BENCH_ROLE_ID)
+    member = FakeUser(next(_ids), bot.guild)
+
+    async def handle(i):
+        message_id = random.choice(tracked) if random.random() < tracked_fraction else next(_ids)
+        await cog.on_raw_reaction_add(FakeReactionPayload(bot.guild.id, message_id, "✅", member))
+
+    async def drain():
+        for message_id in tracked:
+            reaction_roles.remove(message_id)
+
+    return handle, drain
+
+async def on_member_join(bot, events):
+    cog = Tracking(bot)
+    await cog._cache_guild_invites(bot.guild)
+
+    async def handle(i):
+        # Discord bumps the invite's use count before the join event arrives
+        random.choice(bot.guild.invite_list).uses += 1
+        await cog.on_member_join(FakeUser(next(_ids), bot.guild))
+
+    async def drain():
+        while cog._join_tasks:
+            await asyncio.gather(*cog._join_tasks.values())
+
+    return handle, drain
+
+async def warn(bot, events):
+    cog = Moderation(bot)
+    moderator = FakeUser(next(_ids), bot.guild)
+    members = [FakeUser(next(_ids), bot.guild) for _ in range(max(1, events // 5))]
+    channel = FakeChannel(next(_ids), bot.guild)
+
+    async def handle(i):
+        interaction = FakeInteraction(bot, bot.guild, moderator, channel)
+        await cog.warn.callback(cog, interaction, random.choice(members), "Benchmark warning")
+
+    async def drain():
+        pass
+
+    return handle, drain
+
+async def ticket_select(bot, events):
+    guild_configs.set(GuildConfig(guild_id=bot.guild.id, admin_role_id=BENCH_ROLE_ID))
+    channel = FakeChannel(next(_ids), bot.guild)
+
+    async def handle(i):
+        select = TicketSelect()
+        select._values = ["Reporting"]
+        interaction = FakeInteraction(bot, bot.guild, FakeUser(next(_ids), bot.guild), channel)
+        await select.callback(interaction)
+
+    async def drain():
+        guild_configs.invalidate(bot.guild.id)
+
+    return handle, drain
+
+SCENARIOS = {
+    "on_message": on_message,
+    "on_raw_reaction_add": on_raw_reaction_add,
+    "on_member_join": on_member_join,
+    "warn": warn,
+    "ticket_select": ticket_select,
+}
+
+def _round_trips():
+    return sum(h.count for h in db_metrics.statements.values())
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+async def cleanup():
+    async with async_session() as session:
+        for model in (Warning, UserHistory, Ticket, ActivityHourly, ActivityDaily, UserProfile):
+            await session.execute(delete(model).where(model.guild_id == BENCH_GUILD_ID))
+        await session.commit()
+
+async def run_scenario(name, events):
+    bot = FakeBot(FakeGuild(BENCH_GUILD_ID))
+    handle, drain = await SCENARIOS[name](bot, events)
+
+    # Warm up connections, caches and statement caches outside the measurement
+    for i in range(min(50, events)):
+        await handle(i)
+    await drain()
+    handle, drain = await SCENARIOS[name](bot, events)
+    bot.modlog.entries = 0
+
+    latencies = []
+    trips = _round_trips()
+    started = time.perf_counter()
+    for i in range(events):
+        t = time.perf_counter()
+        await handle(i)
+        latencies.append(time.perf_counter() - t)
+        # Let background tasks (flushes, join windows) run as they would between gateway events
+        await asyncio.sleep(0)
+    await drain()
+    elapsed = time.perf_counter() - started
+    trips = _round_trips() - trips
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "events": events,
+        "seconds": round(elapsed, 4),
+        "events_per_sec": round(events / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 4),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 4),
+        "db_round_trips": trips,
+        "db_round_trips_per_event": round(trips / events, 4),
+        "modlog_entries": bot.modlog.entries,
+    }
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot event and command handlers.")
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="Comma separated scenarios to run.")
+    parser.add_argument("--join-window", type=float, default=0.05, help="INVITE_JOIN_WINDOW used for on_member_join.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    tracking.INVITE_JOIN_WINDOW = args.join_window
+
+    await init_db()
+    await cleanup()
+    results = []
+    try:
+        for name in args.only.split(","):
+            result = await run_scenario(name, args.events)
+            results.append(result)
+            print(
+                f"{name:<20} {result['events_per_sec']:>10.1f} ev/s  "
+                f"p50 {result['p50_ms']:.3f}ms  p99 {result['p99_ms']:.3f}ms  "
+                f"{result['db_round_trips_per_event']:.3f} round trips/event"
+            )
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+    print(json.dumps({"version": VERSION, "results": results}, indent=2))
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+import discord
+from discord.state import ConnectionState
+from src.intents import PROFILES, get_profile
+
+# Memory and startup benchmark for the intent profiles in src/intents.py.
+#
+#   python -m benchmarks.intent_profiles --guilds 20 --sizes 1000,10000,50000
+#
+# Feeds synthetic GUILD_CREATE and member chunk payloads through discord.py's
+# real ConnectionState for each profile and reports how long "startup" took
+# and how much memory the cached state holds. Profiles that chunk at startup
+# process every member up front. Lazy profiles chunk only the
+# --active-fraction of guilds that would see traffic, reported separately.
+
+CHUNK_SIZE = 1000
+
+def _guild_payload(guild_id):
+    return {
+        "id": str(guild_id),
+        "name": f"Guild {guild_id}",
+        "owner_id": "1",
+        "features": [],
+        "roles": [{
+            "id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False,
+        }],
+        "channels": [],
+        "members": [],
+        "emojis": [],
+        "stickers": [],
+    }
+
+def _member_payload(user_id):
+    return {
+        "user": {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None, "global_name": None},
+        "roles": [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+def _chunk(state, guild, size):
+    """Processes a guild's members the way GUILD_MEMBERS_CHUNK does, honouring the cache flags."""
+    cache = state.member_cache_flags.joined
+    base = guild.id * 1_000_000
+    for start in range(0, size, CHUNK_SIZE):
+        for i in range(start, min(start + CHUNK_SIZE, size)):
+            member = discord.Member(data=_member_payload(base + i), guild=guild, state=state)
+            if cache:
+                guild._add_member(member)
+
+def run_profile(name, guilds, size, active_fraction):
+    profile = get_profile(name)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+
+    state = ConnectionState(dispatch=lambda *a, **k: None, handlers={}, hooks={}, http=None, **profile.client_options())
+    created = [state._add_guild_from_data(_guild_payload(guild_id)) for guild_id in range(1, guilds + 1)]
+
+    if profile.chunk_guilds_at_startup:
+        for guild in created:
+            _chunk(state, guild, size)
+
+    startup = time.perf_counter() - started
+    startup_memory = tracemalloc.get_traced_memory()[0] - before
+
+    lazy = None
+    if profile.lazy_chunking:
+        active = created[:max(1, int(len(created) * active_fraction))]
+        lazy_started = time.perf_counter()
+        for guild in active:
+            _chunk(state, guild, size)
+        lazy = {
+            "chunked_guilds": len(active),
+            "chunk_seconds": round(time.perf_counter() - lazy_started, 4),
+            "memory_mb": round((tracemalloc.get_traced_memory()[0] - before) / 1e6, 2),
+        }
+
+    cached_members = sum(len(guild._members) for guild in created)
+    tracemalloc.stop()
+    del state, created
+
+    return {
+        "profile": name,
+        "guilds": guilds,
+        "members_per_guild": size,
+        "startup_seconds": round(startup, 4),
+        "startup_memory_mb": round(startup_memory / 1e6, 2),
+        "cached_members": cached_members,
+        "after_lazy_chunking": lazy,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare intent profiles at synthetic guild sizes.")
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--active-fraction", type=float, default=0.1, help="Share of guilds lazily chunked by lazy profiles.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        for name in args.profiles.split(","):
+            result = run_profile(name, args.guilds, size, args.active_fraction)
+            results.append(result)
+            print(
+                f"{name:<9} {args.guilds} guilds x {size:>6} members: "
+                f"startup {result['startup_seconds']:.3f}s, {result['startup_memory_mb']:.1f} MB, "
+                f"{result['cached_members']} members cached"
+            )
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+import math
+from collections import deque
+
+# In-memory spam and raid detection (used by the AutoMod cog).
+#
+# Every check is a handful of list operations on per-user / per-guild state,
+# so nothing touches the database or the network on the message path. Rate
+# limits are ring buffers holding the last N event times: N events fall within
+# the window exactly when the oldest of them is younger than the window.
+# State that has been idle longer than every window is dropped by sweep().
+
+class RingWindow:
+    """The times of the last `limit` events."""
+
+    __slots__ = ("times", "index")
+
+    def __init__(self, limit):
+        self.times = [-math.inf] * limit
+        self.index = 0
+
+    def hit(self, now, window):
+        """Records an event; True when the last `limit` events all fall within `window` seconds."""
+        times = self.times
+        times[self.index] = now
+        self.index = (self.index + 1) % len(times)
+        # The slot we'll overwrite next holds the oldest of the last `limit` events
+        return now - times[self.index] < window
+
+    def clear(self):
+        self.times = [-math.inf] * len(self.times)
+
+def _last_seen(seen):
+    # guild.contents values: a time for text seen once, a RingWindow after that
+    return seen.times[seen.index - 1] if isinstance(seen, RingWindow) else seen
+
+class _UserState:
+    __slots__ = ("messages", "duplicates", "content_hash", "content_seen", "last", "cooldown_until")
+
+    def __init__(self, message_limit):
+        self.messages = RingWindow(message_limit)
+        # Most messages differ from the previous one, so the repeat window is only
+        # allocated once the same content comes twice in a row
+        self.duplicates = None
+        self.content_hash = None
+        self.content_seen = 0.0
+        self.last = 0.0
+        self.cooldown_until = -math.inf
+
+class _GuildState:
+    __slots__ = ("joins", "recent_joins", "raid_until", "contents", "last")
+
+    def __init__(self, join_limit):
+        self.joins = RingWindow(join_limit)
+        self.recent_joins = deque(maxlen=join_limit)
+        self.raid_until = -math.inf
+        self.contents = {}
+        self.last = 0.0
+
+class SpamGuard:
+    """
+    Flags members who send too many messages, repeat the same message, or
+    post text that many others in the guild just posted, and guilds whose
+    join rate looks like a raid. Times are monotonic seconds supplied by the
+    caller. Limits of 0 disable a check.
+    """
+
+    MAX_GUILD_CONTENTS = 4096
+
+    def __init__(self, message_limit=7, message_window=4.0,
+                 duplicate_limit=4, duplicate_window=15.0,
+                 guild_duplicate_limit=8, duplicate_min_length=12,
+                 join_limit=10, join_window=10.0, raid_duration=300.0,
+                 cooldown=30.0):
+        self.message_limit = message_limit
+        self.message_window = message_window
+        self.duplicate_limit = duplicate_limit
+        self.duplicate_window = duplicate_window
+        self.guild_duplicate_limit = guild_duplicate_limit
+        self.duplicate_min_length = duplicate_min_length
+        self.join_limit = join_limit
+        self.join_window = join_window
+        self.raid_duration = raid_duration
+        self.cooldown = cooldown
+        self.idle_after = max(message_window, duplicate_window, join_window, cooldown)
+        self._users = {}
+        self._guilds = {}
+        self.flagged = 0
+        self.raids = 0
+
+    def _guild(self, guild_id):
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = _GuildState(max(self.join_limit, 1))
+        return state
+
+    def message(self, guild_id, user_id, content, now):
+        """Returns why the message is spam, or None."""
+        key = (guild_id, user_id)
+        state = self._users.get(key)
+        if state is None:
+            state = self._users[key] = _UserState(max(self.message_limit, 1))
+        state.last = now
+        if now < state.cooldown_until:
+            # Already being dealt with
+            return None
+
+        reason = None
+        if self.message_limit and state.messages.hit(now, self.message_window):
+            reason = f"sent {self.message_limit} messages in {self.message_window:g}s"
+
+        if content and reason is None:
+            normalized = content.strip().lower()
+            content_hash = hash(normalized)
+
+            if self.duplicate_limit:
+                if content_hash != state.content_hash:
+                    state.content_hash = content_hash
+                    state.content_seen = now
+                    state.duplicates = None
+                else:
+                    if state.duplicates is None:
+                        state.duplicates = RingWindow(self.duplicate_limit)
+                        state.duplicates.hit(state.content_seen, self.duplicate_window)
+                    if state.duplicates.hit(now, self.duplicate_window):
+                        reason = f"repeated the same message {self.duplicate_limit} times in {self.duplicate_window:g}s"
+
+            if reason is None and self.guild_duplicate_limit and len(normalized) >= self.duplicate_min_length:
+                guild = self._guild(guild_id)
+                guild.last = now
+                # First sighting: just the time; a window once the text comes back
+                seen = guild.contents.get(content_hash)
+                if seen is None:
+                    if len(guild.contents) >= self.MAX_GUILD_CONTENTS:
+                        self._trim_contents(guild, now)
+                    guild.contents[content_hash] = now
+                else:
+                    if not isinstance(seen, RingWindow):
+                        first, seen = seen, RingWindow(self.guild_duplicate_limit)
+                        guild.contents[content_hash] = seen
+                        seen.hit(first, self.duplicate_window)
+                    if seen.hit(now, self.duplicate_window):
+                        reason = f"posted a message seen {self.guild_duplicate_limit} times in this server within {self.duplicate_window:g}s"
+
+        if reason:
+            self.flagged += 1
+            state.cooldown_until = now + self.cooldown
+            state.messages.clear()
+            state.duplicates = None
+            state.content_hash = None
+        return reason
+
+    def _trim_contents(self, guild, now):
+        cutoff = now - self.duplicate_window
+        fresh = {h: w for h, w in guild.contents.items() if _last_seen(w) >= cutoff}
+        # Everything is fresh: a flood of unique messages, nothing to learn from keeping it
+        guild.contents = fresh if len(fresh) < self.MAX_GUILD_CONTENTS // 2 else {}
+
+    def join(self, guild_id, member, now):
+        """
+        Records a join. Returns (members to act on, whether a raid just started).
+        When a raid starts, the recent joins that triggered it are returned
+        too; while it lasts, every new member is.
+        """
+        if not self.join_limit:
+            return [], False
+        guild = self._guild(guild_id)
+        guild.last = now
+        guild.recent_joins.append((now, member))
+
+        started = False
+        if guild.joins.hit(now, self.join_window):
+            started = now >= guild.raid_until
+            guild.raid_until = now + self.raid_duration
+
+        if started:
+            self.raids += 1
+            cutoff = now - self.join_window
+            return [m for t, m in guild.recent_joins if t >= cutoff], True
+        if now < guild.raid_until:
+            return [member], False
+        return [], False
+
+    def in_raid(self, guild_id, now):
+        guild = self._guilds.get(guild_id)
+        return guild is not None and now < guild.raid_until
+
+    def sweep(self, now):
+        """Drops state idle longer than every window. Returns how many entries were dropped."""
+        cutoff = now - self.idle_after
+        users = [key for key, state in self._users.items() if state.last < cutoff and state.cooldown_until < now]
+        for key in users:
+            del self._users[key]
+        guilds = [key for key, state in self._guilds.items() if state.last < cutoff and state.raid_until < now]
+        for key in guilds:
+            del self._guilds[key]
+        for state in self._guilds.values():
+            if state.contents:
+                self._trim_contents(state, now)
+        return len(users) + len(guilds)
+
+    def forget(self, guild_id):
+        self._guilds.pop(guild_id, None)
+        for key in [key for key in self._users if key[0] == guild_id]:
+            del self._users[key]
+
+    @property
+    def stats(self):
+        return {
+            "users": len(self._users),
+            "guilds": len(self._guilds),
+            "flagged": self.flagged,
+            "raids": self.raids,
+        }
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import os
+import sys
+import aiohttp
+from src.config import DISCORD_TOKEN
+from src.ipc import IPCServer
+from src.logger import logger
+
+# Multi-process cluster launcher.
+#
+#   python -m src.cluster --clusters 4
+#
+# Asks Discord for the recommended shard count, splits the shards into
+# contiguous ranges and runs one `python -m src.main` worker per range. Each
+# worker is an AutoShardedBot over its range and talks to the launcher over
+# src.ipc for cluster-wide operations (/ping stats, /update).
+#
+# `--fake-gateway` skips Discord entirely: workers start, join IPC and answer
+# requests without logging in, so the launcher can be exercised locally.
+
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+RESTART_DELAY = 5
+
+async def fetch_recommended_shards(token):
+    """Returns Discord's recommended shard count for this bot token."""
+    headers = {"Authorization": f"Bot {token}"}
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_URL, headers=headers) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+    return data["shards"]
+
+def split_shards(shard_count, clusters):
+    """Splits shard IDs 0..shard_count-1 into at most `clusters` contiguous ranges."""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    ranges = []
+    start = 0
+    for i in range(clusters):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+class Launcher:
+    def __init__(self, shard_count, clusters, fake_gateway=False, ipc_port=0):
+        self.shard_count = shard_count
+        self.ranges = split_shards(shard_count, clusters)
+        self.fake_gateway = fake_gateway
+        self.ipc = IPCServer(port=ipc_port)
+        self._processes = {}
+        self._generation = 0
+        self._stopping = False
+
+        self.ipc.handler("restart")(self.restart_all)
+        self.ipc.handler("cluster_info")(self.cluster_info)
+
+    def _worker_env(self, cluster_id):
+        env = dict(os.environ)
+        env.update({
+            "CLUSTER_ID": str(cluster_id),
+            "SHARD_IDS": ",".join(map(str, self.ranges[cluster_id])),
+            "SHARD_COUNT": str(self.shard_count),
+            "CLUSTER_IPC_PORT": str(self.ipc.port),
+            "CLUSTER_FAKE_GATEWAY": "1" if self.fake_gateway else "0",
+        })
+        return env
+
+    async def _spawn(self, cluster_id):
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "src.main",
+            env=self._worker_env(cluster_id)
+        )
+        self._processes[cluster_id] = process
+        logger.info(f"Started cluster {cluster_id} (PID {process.pid}) with shards {self.ranges[cluster_id]}")
+        return process
+
+    async def _supervise(self, cluster_id):
+        """Keeps one worker alive, restarting it if it exits unexpectedly."""
+        generation = self._generation
+        while not self._stopping:
+            process = await self._spawn(cluster_id)
+            code = await process.wait()
+            # Stopped on purpose by run() or restart_all()
+            if self._stopping or generation != self._generation:
+                return
+            logger.warning(f"Cluster {cluster_id} exited with code {code}, restarting in {RESTART_DELAY}s")
+            await asyncio.sleep(RESTART_DELAY)
+
+    async def _stop_workers(self):
+        for process in self._processes.values():
+            if process.returncode is None:
+                process.terminate()
+        await asyncio.gather(*(process.wait() for process in self._processes.values()))
+
+    async def restart_all(self):
+        """IPC op: restart every worker, e.g. after /update pulled new code."""
+        async def restart():
+            self._generation += 1
+            await self._stop_workers()
+            for cluster_id in range(len(self.ranges)):
+                asyncio.create_task(self._supervise(cluster_id))
+
+        # Answer first; the requesting worker is about to be terminated
+        asyncio.get_running_loop().call_later(1, lambda: asyncio.create_task(restart()))
+        return {"clusters": len(self.ranges)}
+
+    async def cluster_info(self):
+        """IPC op: static layout of the cluster."""
+        return {
+            "shard_count": self.shard_count,
+            "clusters": len(self.ranges),
+            "connected": self.ipc.connected,
+        }
+
+    async def run(self):
+        await self.ipc.start()
+        logger.info(f"Launching {len(self.ranges)} cluster(s) for {self.shard_count} shard(s)")
+        for cluster_id in range(len(self.ranges)):
+            asyncio.create_task(self._supervise(cluster_id))
+
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._stopping = True
+            await self._stop_workers()
+            await self.ipc.close()
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the bot as a multi-process shard cluster.")
+    parser.add_argument("--clusters", type=int, default=os.cpu_count() or 1, help="Number of worker processes.")
+    parser.add_argument("--shards", type=int, default=None, help="Total shard count. Defaults to Discord's recommendation.")
+    parser.add_argument("--ipc-port", type=int, default=0, help="Localhost port for worker IPC. Defaults to a free port.")
+    parser.add_argument("--fake-gateway", action="store_true", help="Run workers without connecting to Discord (local testing).")
+    args = parser.parse_args(argv)
+
+    if args.shards:
+        shard_count = args.shards
+    elif args.fake_gateway:
+        shard_count = args.clusters
+    else:
+        if not DISCORD_TOKEN:
+            logger.critical("DISCORD_TOKEN is not set in .env")
+            sys.exit(1)
+        shard_count = await fetch_recommended_shards(DISCORD_TOKEN)
+        logger.info(f"Discord recommends {shard_count} shard(s)")
+
+    await Launcher(shard_count, args.clusters, fake_gateway=args.fake_gateway, ipc_port=args.ipc_port).run()
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
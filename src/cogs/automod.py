@@ -0,0 +1,145 @@
+import asyncio
+import time
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+from src.antispam import SpamGuard
+from src.config import (
+    ANTISPAM_ENABLED, ANTISPAM_MESSAGE_LIMIT, ANTISPAM_MESSAGE_WINDOW,
+    ANTISPAM_DUPLICATE_LIMIT, ANTISPAM_GUILD_DUPLICATE_LIMIT, ANTISPAM_DUPLICATE_WINDOW,
+    ANTISPAM_DUPLICATE_MIN_LENGTH, ANTISPAM_ACTION, ANTISPAM_TIMEOUT_MINUTES,
+    RAID_JOIN_LIMIT, RAID_JOIN_WINDOW, RAID_DURATION, RAID_ACTION
+)
+from src.logger import logger
+from src.profiling import latency_budget
+
+ACTIONS = ("log", "timeout", "kick", "ban")
+ACTION_CONCURRENCY = 5 # Kicks/bans in flight at once during a raid
+
+class AutoMod(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.guard = SpamGuard(
+            message_limit=ANTISPAM_MESSAGE_LIMIT,
+            message_window=ANTISPAM_MESSAGE_WINDOW,
+            duplicate_limit=ANTISPAM_DUPLICATE_LIMIT,
+            duplicate_window=ANTISPAM_DUPLICATE_WINDOW,
+            guild_duplicate_limit=ANTISPAM_GUILD_DUPLICATE_LIMIT,
+            duplicate_min_length=ANTISPAM_DUPLICATE_MIN_LENGTH,
+            join_limit=RAID_JOIN_LIMIT,
+            join_window=RAID_JOIN_WINDOW,
+            raid_duration=RAID_DURATION
+        )
+        self._semaphore = asyncio.Semaphore(ACTION_CONCURRENCY)
+        self._tasks = set()
+
+    async def cog_load(self):
+        for name, action in (("ANTISPAM_ACTION", ANTISPAM_ACTION), ("RAID_ACTION", RAID_ACTION)):
+            if action not in ACTIONS:
+                logger.warning(f"{name}={action!r} is not one of {', '.join(ACTIONS)}; only logging.")
+        # Hot reload (/update): keep the counters, so a reload mid-raid doesn't reset detection
+        state = self.bot.cog_state.pop(self.qualified_name, None)
+        if state:
+            self.guard = state["guard"]
+        self.sweep.start()
+
+    async def cog_unload(self):
+        self.sweep.cancel()
+
+    def export_state(self):
+        """In-memory state handed to the new instance on hot reload (see Bot.reload_extensions)."""
+        return {"guard": self.guard}
+
+    @tasks.loop(minutes=1)
+    async def sweep(self):
+        self.guard.sweep(time.monotonic())
+
+    @commands.Cog.listener()
+    @latency_budget(5)
+    async def on_message(self, message):
+        if message.author.bot or not message.guild:
+            return
+        reason = self.guard.message(message.guild.id, message.author.id, message.content, time.monotonic())
+        if reason:
+            self._act(ANTISPAM_ACTION, message.guild, message.author, f"AutoMod: {reason}")
+
+    @commands.Cog.listener()
+    @latency_budget()
+    async def on_member_join(self, member):
+        if member.bot:
+            return
+        guild = member.guild
+        targets, started = self.guard.join(guild.id, member, time.monotonic())
+        if started:
+            logger.warning(f"Raid detected in guild {guild.id}: {len(targets)} joins in {RAID_JOIN_WINDOW:g}s")
+            self.bot.modlog.enqueue(
+                guild,
+                f"🚨 **RAID DETECTED**: {len(targets)} members joined within {RAID_JOIN_WINDOW:g}s. "
+                f"Members joining in the next {RAID_DURATION / 60:g} minutes get: {RAID_ACTION}"
+            )
+        for target in targets:
+            self._act(RAID_ACTION, guild, target, "AutoMod: joined during a raid")
+
+    def _act(self, action, guild, member, reason):
+        # Off the listener's path: moderation calls go over HTTP
+        task = asyncio.create_task(self._apply(action, guild, member, reason), name="automod-action")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _apply(self, action, guild, member, reason):
+        # Staff are never acted on
+        permissions = getattr(member, "guild_permissions", None)
+        if permissions and (permissions.manage_messages or permissions.administrator):
+            return
+
+        moderation = self.bot.get_cog("Moderation") if action in ("timeout", "kick", "ban") else None
+        if moderation is None:
+            self.bot.modlog.enqueue(guild, f"**AUTOMOD**: {member.mention} (ID: {member.id})\nReason: {reason}")
+            return
+
+        async with self._semaphore:
+            try:
+                if action == "timeout":
+                    await moderation.timeout_member(guild, member, ANTISPAM_TIMEOUT_MINUTES, reason, self.bot.user)
+                elif action == "kick":
+                    await moderation.kick_member(guild, member, reason, self.bot.user)
+                else:
+                    await moderation.ban_member(guild, member, reason, self.bot.user)
+            except discord.NotFound:
+                pass # Already left
+            except discord.HTTPException as e:
+                logger.warning(f"AutoMod could not {action} {member.id} in guild {guild.id}: {e}")
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.guard.forget(guild.id)
+
+    @app_commands.command(name="automod", description="Show anti-spam and raid detection status.")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def automod(self, interaction: discord.Interaction):
+        stats = self.guard.stats
+        raid = self.guard.in_raid(interaction.guild.id, time.monotonic())
+        embed = discord.Embed(title="AutoMod", color=discord.Color.red() if raid else discord.Color.green())
+        embed.add_field(
+            name="Spam",
+            value=f"{ANTISPAM_MESSAGE_LIMIT} messages / {ANTISPAM_MESSAGE_WINDOW:g}s, "
+                  f"{ANTISPAM_DUPLICATE_LIMIT} repeats / {ANTISPAM_DUPLICATE_WINDOW:g}s\nAction: {ANTISPAM_ACTION}",
+            inline=False
+        )
+        embed.add_field(
+            name="Raids",
+            value=f"{RAID_JOIN_LIMIT} joins / {RAID_JOIN_WINDOW:g}s\nAction: {RAID_ACTION}\n"
+                  f"Raid mode: {'**active**' if raid else 'off'}",
+            inline=False
+        )
+        embed.add_field(
+            name="This process",
+            value=f"Tracking {stats['users']} member(s) in {stats['guilds']} guild(s)\n"
+                  f"{stats['flagged']} spammer(s) flagged, {stats['raids']} raid(s) detected",
+            inline=False
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    if ANTISPAM_ENABLED:
+        await bot.add_cog(AutoMod(bot))
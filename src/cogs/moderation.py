@@ -1,61 +1,291 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from sqlalchemy import select
+from discord.ui import View, Button, DynamicItem
+from sqlalchemy import select, delete, func, tuple_
+from src.config import WARNING_EXPIRY_DAYS
 from src.database.db import get_session
-from src.database.models import GuildConfig, Warning as WarningModel, UserProfile
-from src.logger import logger
-from datetime import datetime, timedelta
+from src.database.models import Warning as WarningModel, UserProfile
+from src.purge import PurgeJob
+from datetime import datetime, timedelta, timezone
+
+WARNINGS_PAGE_SIZE = 10
+
+def _encode_ts(ts):
+    return int(ts.replace(tzinfo=timezone.utc).timestamp() * 1_000_000)
+
+def _decode_ts(value):
+    return datetime.fromtimestamp(value / 1_000_000, tz=timezone.utc).replace(tzinfo=None)
+
+async def build_warnings_page(guild, user_id, page, cursor=None, direction="older"):
+    """
+    Builds one page of a member's warnings, newest first.
+
+    Pages are fetched with keyset pagination on (timestamp, id): `cursor` is
+    the (timestamp, id) of the last row of the previous page ("older") or the
+    first row of the next page ("newer"). Every page costs one indexed COUNT
+    and one LIMIT query, however many warnings the member has.
+    Returns (embed, view), or None if the member has no warnings.
+    """
+    owner = (WarningModel.user_id == user_id) & (WarningModel.guild_id == guild.id)
+    key = tuple_(WarningModel.timestamp, WarningModel.id)
+
+    warnings = []
+    async for session in get_session():
+        stmt = select(func.count(), func.max(WarningModel.timestamp)).where(owner)
+        total, last_warning = (await session.execute(stmt)).one()
+
+        if total:
+            stmt = select(WarningModel).where(owner)
+            if direction == "newer":
+                if cursor:
+                    stmt = stmt.where(key > tuple_(*cursor))
+                stmt = stmt.order_by(WarningModel.timestamp.asc(), WarningModel.id.asc())
+            else:
+                if cursor:
+                    stmt = stmt.where(key < tuple_(*cursor))
+                stmt = stmt.order_by(WarningModel.timestamp.desc(), WarningModel.id.desc())
+
+            result = await session.execute(stmt.limit(WARNINGS_PAGE_SIZE))
+            warnings = list(result.scalars().all())
+
+    if not total:
+        return None
+
+    if direction == "newer":
+        warnings.reverse()
+
+    pages = -(-total // WARNINGS_PAGE_SIZE)
+    page = max(1, min(page, pages))
+    member = guild.get_member(user_id)
+    name = member.display_name if member else str(user_id)
+
+    embed = discord.Embed(
+        title=f"Warnings for {name}",
+        description=f"**Total:** {total} | **Last warning:** {last_warning.strftime('%Y-%m-%d')}",
+        color=discord.Color.orange()
+    )
+    for w in warnings:
+        expires = f" | expires {w.expires_at.strftime('%Y-%m-%d')}" if w.expires_at else ""
+        embed.add_field(
+            name=f"ID: {w.id} | {w.timestamp.strftime('%Y-%m-%d')}{expires}",
+            value=f"**Reason:** {w.reason[:900]}\n**Mod:** <@{w.moderator_id}>",
+            inline=False
+        )
+    embed.set_footer(text=f"Page {page}/{pages}")
+
+    view = View(timeout=None)
+    if warnings:
+        first, last = warnings[0], warnings[-1]
+        view.add_item(WarningsPageButton("newer", user_id, page - 1, _encode_ts(first.timestamp), first.id, disabled=page <= 1))
+        view.add_item(WarningsPageButton("older", user_id, page + 1, _encode_ts(last.timestamp), last.id, disabled=page >= pages))
+    return embed, view
+
+class WarningsPageButton(DynamicItem[Button], template=r"warnings:(?P<direction>older|newer):(?P<user_id>\d+):(?P<page>\d+):(?P<ts>\d+):(?P<id>\d+)"):
+    """Persistent pager button for /warnings. All the state it needs is in its custom_id."""
+
+    def __init__(self, direction, user_id, page, ts, warning_id, disabled=False):
+        self.direction = direction
+        self.user_id = user_id
+        self.page = page
+        self.cursor = (_decode_ts(ts), warning_id)
+        super().__init__(Button(
+            label="◀ Newer" if direction == "newer" else "Older ▶",
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"warnings:{direction}:{user_id}:{page}:{ts}:{warning_id}",
+            disabled=disabled
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["direction"], int(match["user_id"]), int(match["page"]), int(match["ts"]), int(match["id"]))
+
+    async def interaction_check(self, interaction):
+        if not interaction.permissions.moderate_members:
+            await interaction.response.send_message("You don't have permission to view warnings.", ephemeral=True)
+            return False
+        return True
+
+    async def callback(self, interaction):
+        page = await build_warnings_page(interaction.guild, self.user_id, self.page, self.cursor, self.direction)
+        if page is None:
+            return await interaction.response.edit_message(content=f"<@{self.user_id}> has no warnings.", embed=None, view=None)
+
+        embed, view = page
+        await interaction.response.edit_message(embed=embed, view=view)
+
+class PurgeCancelView(View):
+    def __init__(self, job, owner_id):
+        super().__init__(timeout=None)
+        self.job = job
+        self.owner_id = owner_id
+
+    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.red)
+    async def cancel(self, interaction: discord.Interaction, button: Button):
+        if interaction.user.id != self.owner_id:
+            return await interaction.response.send_message("Only the moderator who started this purge can cancel it.", ephemeral=True)
+        self.job.cancel()
+        await interaction.response.edit_message(content="Cancelling purge...", view=None)
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.purges = {}
+
+    async def cog_load(self):
+        # Pager buttons keep working after restarts
+        self.bot.add_dynamic_items(WarningsPageButton)
+        self.bot.scheduler.handler("unban")(self.scheduled_unban)
+        self.bot.scheduler.handler("expire_warning")(self.expire_warning)
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(WarningsPageButton)
+
+    def log_action(self, guild, message_content):
+        """Queues an entry for the configured mod-log channel (see ModLogDispatcher)."""
+        self.bot.modlog.enqueue(guild, message_content)
+
+    # Shared by the slash commands and AutoMod; `moderator` is whoever is credited in the mod-log
+
+    async def kick_member(self, guild, member, reason, moderator):
+        await guild.kick(member, reason=reason)
+        self.log_action(guild, f"**KICK**: {moderator.mention} kicked {member.mention} (ID: {member.id})\nReason: {reason}")
 
-    async def log_action(self, guild, message_content):
-        """Helper to log actions to the configured mod-log channel."""
+    async def ban_member(self, guild, member, reason, moderator):
+        await guild.ban(member, reason=reason)
+        self.log_action(guild, f"**BAN**: {moderator.mention} banned {member.mention} (ID: {member.id})\nReason: {reason}")
+        # A permanent ban replaces any pending tempban expiry
+        await self.bot.scheduler.cancel("unban", guild.id, member.id)
+
+    async def timeout_member(self, guild, member, minutes, reason, moderator):
+        await member.timeout(timedelta(minutes=minutes), reason=reason)
+        self.log_action(guild, f"**TIMEOUT**: {moderator.mention} timed out {member.mention} (ID: {member.id}) for {minutes}m\nReason: {reason}")
+
+    async def scheduled_unban(self, job):
+        """Scheduled action: lifts a /tempban."""
+        guild = self.bot.get_guild(job.guild_id)
+        if guild is None:
+            return
+        try:
+            await guild.unban(discord.Object(id=job.target_id), reason="Temporary ban expired")
+        except discord.NotFound:
+            return # Already unbanned by hand
+        self.log_action(guild, f"**UNBAN**: temporary ban of <@{job.target_id}> (ID: {job.target_id}) expired")
+
+    async def expire_warning(self, job):
+        """Scheduled action: removes a warning once it reaches its expiry."""
         async for session in get_session():
-            stmt = select(GuildConfig).where(GuildConfig.guild_id == guild.id)
-            result = await session.execute(stmt)
-            config = result.scalar_one_or_none()
+            result = await session.execute(delete(WarningModel).where(WarningModel.id == job.target_id).returning(WarningModel.user_id))
+            user_id = result.scalar_one_or_none()
+            await session.commit()
 
-            if config and config.mod_log_channel_id:
-                channel = guild.get_channel(config.mod_log_channel_id)
-                if channel:
-                    await channel.send(message_content)
+        guild = self.bot.get_guild(job.guild_id)
+        if guild and user_id:
+            self.log_action(guild, f"**WARNING EXPIRED**: warning #{job.target_id} for <@{user_id}>")
 
     @app_commands.command(name="kick", description="Kick a user from the server.")
     @app_commands.checks.has_permissions(kick_members=True)
     async def kick(self, interaction: discord.Interaction, member: discord.Member, reason: str = "No reason provided"):
-        await member.kick(reason=reason)
+        await self.kick_member(interaction.guild, member, reason, interaction.user)
         await interaction.response.send_message(f"Kicked {member.mention}. Reason: {reason}")
-        await self.log_action(interaction.guild, f"**KICK**: {interaction.user.mention} kicked {member.mention} (ID: {member.id})\nReason: {reason}")
 
     @app_commands.command(name="ban", description="Ban a user from the server.")
     @app_commands.checks.has_permissions(ban_members=True)
     async def ban(self, interaction: discord.Interaction, member: discord.Member, reason: str = "No reason provided"):
-        await member.ban(reason=reason)
-        await interaction.response.send_message(f"Banned {member.mention}. Reason: {reason}")
-        await self.log_action(interaction.guild, f"**BAN**: {interaction.user.mention} banned {member.mention} (ID: {member.id})\nReason: {reason}")
+        # ban_member also clears any tempban expiry in the database; answer within the 3s window first
+        await interaction.response.defer()
+        await self.ban_member(interaction.guild, member, reason, interaction.user)
+        await interaction.followup.send(f"Banned {member.mention}. Reason: {reason}")
+
+    @app_commands.command(name="tempban", description="Ban a user for a limited time.")
+    @app_commands.checks.has_permissions(ban_members=True)
+    async def tempban(self, interaction: discord.Interaction, member: discord.Member, hours: app_commands.Range[int, 1, 8760], reason: str = "No reason provided"):
+        """
+        Parameters:
+        - member: The member to ban.
+        - hours: How long the ban lasts.
+        - reason: Why the member is banned.
+        """
+        await interaction.response.defer()
+        await member.ban(reason=f"{reason} (temporary, {hours}h)")
+        until = datetime.utcnow() + timedelta(hours=hours)
+        await self.bot.scheduler.cancel("unban", interaction.guild.id, member.id)
+        await self.bot.scheduler.schedule("unban", interaction.guild.id, member.id, until)
+
+        await interaction.followup.send(f"Banned {member.mention} for {hours} hour(s). Reason: {reason}")
+        self.log_action(interaction.guild, f"**TEMPBAN**: {interaction.user.mention} banned {member.mention} (ID: {member.id}) for {hours}h\nReason: {reason}")
 
     @app_commands.command(name="timeout", description="Timeout a user.")
     @app_commands.checks.has_permissions(moderate_members=True)
     async def timeout(self, interaction: discord.Interaction, member: discord.Member, minutes: int, reason: str = "No reason provided"):
-        duration = timedelta(minutes=minutes)
-        await member.timeout(duration, reason=reason)
+        await self.timeout_member(interaction.guild, member, minutes, reason, interaction.user)
         await interaction.response.send_message(f"Timed out {member.mention} for {minutes} minutes. Reason: {reason}")
-        await self.log_action(interaction.guild, f"**TIMEOUT**: {interaction.user.mention} timed out {member.mention} (ID: {member.id}) for {minutes}m\nReason: {reason}")
 
     @app_commands.command(name="purge", description="Delete a number of messages.")
     @app_commands.checks.has_permissions(manage_messages=True)
-    async def purge(self, interaction: discord.Interaction, amount: int):
+    async def purge(self, interaction: discord.Interaction,
+                    amount: app_commands.Range[int, 1, 10000],
+                    user: discord.User = None,
+                    bots_only: bool = False,
+                    contains: str = None,
+                    has_attachments: bool = False,
+                    before: str = None,
+                    after: str = None):
+        """
+        Parameters:
+        - amount: How many matching messages to delete.
+        - user: Optional. Only delete messages from this user.
+        - bots_only: Optional. Only delete messages from bots.
+        - contains: Optional. Only delete messages containing this text.
+        - has_attachments: Optional. Only delete messages with attachments.
+        - before: Optional. Only delete messages before this message ID.
+        - after: Optional. Only delete messages after this message ID.
+        """
+        channel = interaction.channel
+        if channel.id in self.purges:
+            return await interaction.response.send_message("A purge is already running in this channel.", ephemeral=True)
+
+        try:
+            before_obj = discord.Object(id=int(before)) if before else None
+            after_obj = discord.Object(id=int(after)) if after else None
+        except ValueError:
+            return await interaction.response.send_message("Invalid message ID.", ephemeral=True)
+
+        needle = contains.lower() if contains else None
+
+        def check(message):
+            if user and message.author.id != user.id:
+                return False
+            if bots_only and not message.author.bot:
+                return False
+            if needle and needle not in message.content.lower():
+                return False
+            if has_attachments and not message.attachments:
+                return False
+            return True
+
         await interaction.response.defer(ephemeral=True)
-        deleted = await interaction.channel.purge(limit=amount)
-        await interaction.followup.send(f"Deleted {len(deleted)} messages.", ephemeral=True)
-        await self.log_action(interaction.guild, f"**PURGE**: {interaction.user.mention} deleted {len(deleted)} messages in {interaction.channel.mention}")
+
+        async def progress(job):
+            await status.edit(content=job.summary(), view=None if job.done or job.cancelled else cancel_view)
+
+        job = PurgeJob(channel, amount, check=check, before=before_obj, after=after_obj, progress=progress)
+        cancel_view = PurgeCancelView(job, interaction.user.id)
+        status = await interaction.followup.send("Starting purge...", view=cancel_view, ephemeral=True, wait=True)
+
+        self.purges[channel.id] = job
+        try:
+            await job.run()
+        finally:
+            self.purges.pop(channel.id, None)
+
+        self.log_action(interaction.guild, f"**PURGE**: {interaction.user.mention} deleted {job.total_deleted} messages in {channel.mention}" + (" (cancelled)" if job.cancelled else ""))
 
     @app_commands.command(name="warn", description="Warn a user.")
     @app_commands.checks.has_permissions(moderate_members=True)
     async def warn(self, interaction: discord.Interaction, member: discord.Member, reason: str):
+        # Two database transactions before the reply; answer within the 3s window first
+        await interaction.response.defer()
         async for session in get_session():
             # Ensure profile exists
             stmt = select(UserProfile).where((UserProfile.user_id == member.id) & (UserProfile.guild_id == interaction.guild.id))
@@ -67,45 +297,36 @@ class Moderation(commands.Cog):
                 session.add(profile)
 
             # Create warning
+            expires_at = datetime.utcnow() + timedelta(days=WARNING_EXPIRY_DAYS) if WARNING_EXPIRY_DAYS else None
             warning = WarningModel(
                 user_id=member.id,
                 guild_id=interaction.guild.id,
                 moderator_id=interaction.user.id,
-                reason=reason
+                reason=reason,
+                expires_at=expires_at
             )
             session.add(warning)
             await session.commit()
 
-        await interaction.response.send_message(f"Warned {member.mention}. Reason: {reason}")
+        if expires_at:
+            await self.bot.scheduler.schedule("expire_warning", interaction.guild.id, warning.id, expires_at)
+
+        await interaction.followup.send(f"Warned {member.mention}. Reason: {reason}")
         try:
             await member.send(f"You have been warned in **{interaction.guild.name}**. Reason: {reason}")
         except:
             pass
-        await self.log_action(interaction.guild, f"**WARN**: {interaction.user.mention} warned {member.mention} (ID: {member.id})\nReason: {reason}")
+        self.log_action(interaction.guild, f"**WARN**: {interaction.user.mention} warned {member.mention} (ID: {member.id})\nReason: {reason}")
 
     @app_commands.command(name="warnings", description="View warnings for a user.")
     @app_commands.checks.has_permissions(moderate_members=True)
     async def warnings(self, interaction: discord.Interaction, member: discord.Member):
-        async for session in get_session():
-            stmt = select(WarningModel).where(
-                (WarningModel.user_id == member.id) &
-                (WarningModel.guild_id == interaction.guild.id)
-            ).order_by(WarningModel.timestamp.desc())
-            result = await session.execute(stmt)
-            warnings = result.scalars().all()
-
-        if not warnings:
+        page = await build_warnings_page(interaction.guild, member.id, page=1)
+        if page is None:
             return await interaction.response.send_message(f"{member.mention} has no warnings.")
 
-        embed = discord.Embed(title=f"Warnings for {member.display_name}", color=discord.Color.orange())
-        for w in warnings:
-            embed.add_field(
-                name=f"ID: {w.id} | {w.timestamp.strftime('%Y-%m-%d')}",
-                value=f"**Reason:** {w.reason}\n**Mod:** <@{w.moderator_id}>",
-                inline=False
-            )
-
-        await interaction.response.send_message(embed=embed)
+        embed, view = page
+        await interaction.response.send_message(embed=embed, view=view)
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
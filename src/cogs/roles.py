@@ -4,7 +4,9 @@ from discord.ext import commands
 from sqlalchemy import select, delete
 from src.database.db import get_session
 from src.database.models import ReactionRole
+from src.database.cache import reaction_roles
 from src.logger import logger
+from src.profiling import latency_budget
 
 class Roles(commands.Cog):
     def __init__(self, bot):
@@ -32,8 +34,12 @@ class Roles(commands.Cog):
         except Exception as e:
             return await interaction.response.send_message(f"Failed to add reaction. Ensure I have permission and the emoji is valid. Error: {e}", ephemeral=True)
 
-        # Save to DB
+        # Save to DB, replacing any existing binding for this emoji
         async for session in get_session():
+            await session.execute(delete(ReactionRole).where(
+                (ReactionRole.message_id == msg_id) &
+                (ReactionRole.emoji == str(emoji))
+            ))
             rr = ReactionRole(
                 guild_id=interaction.guild.id,
                 message_id=msg_id,
@@ -43,52 +49,102 @@ class Roles(commands.Cog):
             session.add(rr)
             await session.commit()
 
+        reaction_roles.add(msg_id, str(emoji), role.id)
+
         await interaction.response.send_message(f"Reaction role set! Reacting with {emoji} gives {role.mention}.", ephemeral=True)
 
-    @commands.Cog.listener()
-    async def on_raw_reaction_add(self, payload):
-        if payload.member.bot:
-            return
+    @app_commands.command(name="reaction_role_list", description="List the reaction roles in this server.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def reaction_role_list(self, interaction: discord.Interaction):
+        async for session in get_session():
+            stmt = select(ReactionRole).where(ReactionRole.guild_id == interaction.guild.id).order_by(ReactionRole.message_id)
+            result = await session.execute(stmt)
+            bindings = result.scalars().all()
+
+        if not bindings:
+            return await interaction.response.send_message("No reaction roles are set up in this server.", ephemeral=True)
+
+        lines = [f"`{rr.message_id}` {rr.emoji} → <@&{rr.role_id}>" for rr in bindings]
+        description = "\n".join(lines)
+        if len(description) > 4000:
+            description = description[:4000].rsplit("\n", 1)[0] + "\n…"
+
+        embed = discord.Embed(title="Reaction Roles", description=description, color=discord.Color.blue())
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="reaction_role_remove", description="Remove a reaction role binding from a message.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def reaction_role_remove(self, interaction: discord.Interaction, message_id: str, emoji: str = None):
+        """
+        Parameters:
+        - message_id: The message the reaction role is on.
+        - emoji: Optional. Only remove this emoji's binding; all bindings on the message are removed otherwise.
+        """
+        try:
+            msg_id = int(message_id)
+        except ValueError:
+            return await interaction.response.send_message("Invalid message ID.", ephemeral=True)
 
         async for session in get_session():
-            stmt = select(ReactionRole).where(
-                (ReactionRole.message_id == payload.message_id) &
-                (ReactionRole.emoji == str(payload.emoji))
+            stmt = delete(ReactionRole).where(
+                (ReactionRole.guild_id == interaction.guild.id) &
+                (ReactionRole.message_id == msg_id)
             )
+            if emoji:
+                stmt = stmt.where(ReactionRole.emoji == str(emoji))
             result = await session.execute(stmt)
-            rr = result.scalar_one_or_none()
-
-            if rr:
-                guild = self.bot.get_guild(payload.guild_id)
-                if guild:
-                    role = guild.get_role(rr.role_id)
-                    if role:
-                        try:
-                            await payload.member.add_roles(role)
-                        except discord.Forbidden:
-                            logger.warning(f"Missing permissions to add role {role.id} in guild {guild.id}")
+            await session.commit()
+            removed = result.rowcount
+
+        if not removed:
+            return await interaction.response.send_message("No matching reaction role found.", ephemeral=True)
+
+        reaction_roles.remove(msg_id, str(emoji) if emoji else None)
+        await interaction.response.send_message(f"Removed {removed} reaction role binding(s).", ephemeral=True)
 
     @commands.Cog.listener()
+    @latency_budget()
+    async def on_raw_reaction_add(self, payload):
+        # Untracked messages are rejected from memory, without a DB round trip
+        role_id = await reaction_roles.lookup(payload.message_id, str(payload.emoji))
+        if role_id is None:
+            return
+
+        if payload.member is None or payload.member.bot:
+            return
+
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild:
+            role = guild.get_role(role_id)
+            if role:
+                try:
+                    await payload.member.add_roles(role)
+                except discord.Forbidden:
+                    logger.warning(f"Missing permissions to add role {role.id} in guild {guild.id}")
+
+    @commands.Cog.listener()
+    @latency_budget()
     async def on_raw_reaction_remove(self, payload):
-        async for session in get_session():
-            stmt = select(ReactionRole).where(
-                (ReactionRole.message_id == payload.message_id) &
-                (ReactionRole.emoji == str(payload.emoji))
-            )
-            result = await session.execute(stmt)
-            rr = result.scalar_one_or_none()
-
-            if rr:
-                guild = self.bot.get_guild(payload.guild_id)
-                if guild:
-                    member = guild.get_member(payload.user_id)
-                    if member:
-                        role = guild.get_role(rr.role_id)
-                        if role:
-                            try:
-                                await member.remove_roles(role)
-                            except discord.Forbidden:
-                                logger.warning(f"Missing permissions to remove role {role.id} in guild {guild.id}")
+        role_id = await reaction_roles.lookup(payload.message_id, str(payload.emoji))
+        if role_id is None:
+            return
+
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild:
+            member = guild.get_member(payload.user_id)
+            if member is None and not self.bot.intent_profile.member_cache_flags.joined:
+                # No member cache under this intent profile
+                try:
+                    member = await guild.fetch_member(payload.user_id)
+                except discord.HTTPException:
+                    member = None
+            if member:
+                role = guild.get_role(role_id)
+                if role:
+                    try:
+                        await member.remove_roles(role)
+                    except discord.Forbidden:
+                        logger.warning(f"Missing permissions to remove role {role.id} in guild {guild.id}")
 
 async def setup(bot):
     await bot.add_cog(Roles(bot))
@@ -1,10 +1,10 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from sqlalchemy import select, update
-from sqlalchemy.dialects.postgresql import insert
 from src.database.db import get_session
+from src.database.dialect import insert
 from src.database.models import GuildConfig
+from src.database.cache import guild_configs
 from src.logger import logger
 
 class Setup(commands.Cog):
@@ -62,27 +62,21 @@ class Setup(commands.Cog):
         # 3. Check/Create Bot Config Category (Optional, but good for organization)
         # 4. Save to DB
 
-        async for session in get_session():
-            stmt = select(GuildConfig).where(GuildConfig.guild_id == guild.id)
-            result = await session.execute(stmt)
-            config = result.scalar_one_or_none()
-
-            if not config:
-                config = GuildConfig(
-                    guild_id=guild.id,
-                    mod_log_channel_id=mod_log_channel.id,
-                    ticket_category_id=ticket_category.id,
-                    admin_role_id=staff_role.id if staff_role else None
-                )
-                session.add(config)
-            else:
-                config.mod_log_channel_id = mod_log_channel.id
-                config.ticket_category_id = ticket_category.id
-                if staff_role:
-                    config.admin_role_id = staff_role.id
+        # One upsert; an existing staff role is kept unless a new one was given
+        values = {"mod_log_channel_id": mod_log_channel.id, "ticket_category_id": ticket_category.id}
+        if staff_role:
+            values["admin_role_id"] = staff_role.id
 
+        async for session in get_session():
+            stmt = insert(GuildConfig).values(guild_id=guild.id, **values)
+            stmt = stmt.on_conflict_do_update(index_elements=[GuildConfig.guild_id], set_=values).returning(GuildConfig)
+            result = await session.execute(stmt, execution_options={"populate_existing": True})
+            config = result.scalar_one()
             await session.commit()
 
+        # Keep the shared cache in step with what was just written
+        guild_configs.set(config)
+
         response_msg = "Setup Complete!\n"
         response_msg += f"**Mod Log Channel:** {mod_log_channel.mention} ({'Created' if created_mod_log else 'Found'})\n"
         response_msg += f"**Tickets Category:** {ticket_category.name} ({'Created' if created_ticket_cat else 'Found'})\n"
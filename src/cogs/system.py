@@ -1,41 +1,250 @@
+import asyncio
+import io
+import threading
 import discord
 from discord import app_commands
 from discord.ext import commands
 import os
 import sys
-import subprocess
-from src.logger import logger
+from src.config import PROFILER_INTERVAL
+from src.logger import logger, stop_logging
+from src.database.metrics import db_metrics
+from src.metrics import bot_metrics
+from src.profiling import SamplingProfiler
+from src.updater import git, UpdatePlan
+
+# How long /update waits for every cluster worker to hot reload
+RELOAD_TIMEOUT = 60
 
 class System(commands.Cog):
+    profiler = app_commands.Group(name="profiler", description="Sample what the event loop is doing.")
+
     def __init__(self, bot):
         self.bot = bot
+        self._profiler = None
+        self._profiler_stop = None
+
+    def cog_unload(self):
+        if self._profiler_stop:
+            self._profiler_stop.set()
 
     @app_commands.command(name="ping", description="Check the bot's latency.")
     async def ping(self, interaction: discord.Interaction):
-        await interaction.response.send_message(f"Pong! Latency: {round(self.bot.latency * 1000)}ms")
+        stats = await self.bot.cluster_stats()
+        if len(stats) == 1:
+            return await interaction.response.send_message(f"Pong! Latency: {round(self.bot.latency * 1000)}ms")
+
+        lines = []
+        for s in stats:
+            latency = f"{round(s['latency'] * 1000)}ms" if s["latency"] is not None else "n/a"
+            shards = f"{s['shards'][0]}-{s['shards'][-1]}" if s["shards"] else "-"
+            lines.append(f"Cluster {s['cluster_id']} | Shards {shards} | {s['guilds']} guilds | {latency}")
+        total = sum(s["guilds"] for s in stats)
+        await interaction.response.send_message(
+            f"Pong! This cluster: {round(self.bot.latency * 1000)}ms\n```\n" + "\n".join(lines) + f"\n```\nTotal guilds: {total}"
+        )
+
+    @app_commands.command(name="dbstats", description="Show database pool and query statistics.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def dbstats(self, interaction: discord.Interaction):
+        snapshot = db_metrics.snapshot()
+        pool = snapshot["pool"]
+        wait = snapshot["checkout_wait"]
+
+        embed = discord.Embed(title="Database", color=discord.Color.blue())
+        embed.add_field(
+            name="Pool",
+            value=f"In use: {pool['checked_out']} / {pool['size']} (+{max(pool['overflow'], 0)} overflow)\n"
+                  f"Checkout wait p50/p99: {wait['p50_ms']}ms / {wait['p99_ms']}ms (max {wait['max_ms']}ms)",
+            inline=False
+        )
+
+        # Slowest statements by total time spent
+        statements = sorted(snapshot["statements"].items(), key=lambda kv: kv[1]["avg_ms"] * kv[1]["count"], reverse=True)[:8]
+        if statements:
+            embed.add_field(
+                name="Statements",
+                value="\n".join(f"`{label}` x{s['count']} avg {s['avg_ms']}ms p99 {s['p99_ms']}ms" for label, s in statements),
+                inline=False
+            )
+
+        # Who holds connections the longest
+        callers = sorted(snapshot["callers"].items(), key=lambda kv: kv[1]["hold"]["avg_ms"] * kv[1]["hold"]["count"], reverse=True)[:8]
+        if callers:
+            embed.add_field(
+                name="Callers (connection hold)",
+                value="\n".join(
+                    f"`{caller}` x{s['hold']['count']} avg {s['hold']['avg_ms']}ms, wait p99 {s['checkout_wait']['p99_ms']}ms"
+                    for caller, s in callers
+                ),
+                inline=False
+            )
 
-    @app_commands.command(name="update", description="Pull latest changes from git and restart.")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="stats", description="Show handler, gateway and cache statistics for this process.")
     @app_commands.checks.has_permissions(administrator=True)
-    async def update(self, interaction: discord.Interaction):
+    async def stats(self, interaction: discord.Interaction):
+        snapshot = bot_metrics.snapshot(self.bot)
+        lag = snapshot["loop_lag"]
+
+        embed = discord.Embed(title=f"Stats (cluster {self.bot.cluster_id})", color=discord.Color.blue())
+        shards = [f"{shard_id}: {'n/a' if ms is None else f'{ms:.0f}ms'}" for shard_id, ms in sorted(snapshot["shards"].items())]
+        embed.add_field(
+            name="Gateway",
+            value=(", ".join(shards[:20]) + (f" (+{len(shards) - 20} more)" if len(shards) > 20 else "")) or "Not connected",
+            inline=False
+        )
+        embed.add_field(
+            name="Event loop lag",
+            value=f"Now {lag['last_ms']}ms, p50/p99 {lag['p50_ms']}ms / {lag['p99_ms']}ms, max {lag['max_ms']}ms",
+            inline=False
+        )
+
+        # Handlers by total time spent; command errors are keyed as "/name"
+        for title, table, prefix in (("Listeners", snapshot["listeners"], ""), ("Commands", snapshot["commands"], "/")):
+            top = sorted(table.items(), key=lambda kv: kv[1]["avg_ms"] * kv[1]["count"], reverse=True)[:8]
+            lines = []
+            for name, h in top:
+                line = f"`{name}` x{h['count']} avg {h['avg_ms']}ms p99 {h['p99_ms']}ms"
+                errors = snapshot["errors"].get(f"{prefix}{name}")
+                if errors:
+                    line += f", {errors} errors"
+                lines.append(line)
+            if lines:
+                embed.add_field(name=title, value="\n".join(lines), inline=False)
+
+        pool = snapshot["pool"]
+        embed.add_field(name="DB pool", value=f"In use: {pool.get('checked_out', 0)} / {pool.get('size', 0)}", inline=True)
+        embed.add_field(name="Caches", value="\n".join(f"{name}: {size}" for name, size in snapshot["caches"].items()), inline=True)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @profiler.command(name="start", description="Sample the event loop for a number of seconds and report the hottest frames.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def profiler_start(self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, 600] = 30):
+        if self._profiler and self._profiler.running:
+            return await interaction.response.send_message("The profiler is already running. Use `/profiler stop` to end it.", ephemeral=True)
+
+        # Commands run on the event loop thread, so this is the thread to sample
+        self._profiler = profiler = SamplingProfiler(threading.get_ident(), PROFILER_INTERVAL)
+        self._profiler_stop = stop = asyncio.Event()
+        await interaction.response.send_message(f"Profiling the event loop for {seconds}s...", ephemeral=True)
+        logger.info(f"Sampling profiler started by {interaction.user} for {seconds}s")
+
+        profiler.start()
+        try:
+            await asyncio.wait_for(stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await profiler.stop()
+
+        if not profiler.samples:
+            return await interaction.followup.send("No samples were taken.", ephemeral=True)
+
+        lines = [f"{'self':>6} {'total':>6}  frame"]
+        for label, own, total in profiler.top(15):
+            lines.append(f"{own / profiler.samples:>6.1%} {total / profiler.samples:>6.1%}  {label[:90]}")
+        report = "\n".join(lines)
+        if len(report) > 1800:
+            report = report[:1800] + "\n..."
+
+        # Collapsed stacks load straight into flamegraph.pl or speedscope
+        file = discord.File(io.BytesIO(profiler.collapsed().encode()), filename="profile.collapsed.txt")
+        await interaction.followup.send(
+            f"{profiler.samples} samples over {profiler.duration:.1f}s\n```\n{report}\n```",
+            file=file,
+            ephemeral=True
+        )
+
+    @profiler.command(name="stop", description="Stop the running profiler early and report.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def profiler_stop(self, interaction: discord.Interaction):
+        if not (self._profiler and self._profiler.running):
+            return await interaction.response.send_message("The profiler is not running.", ephemeral=True)
+        self._profiler_stop.set()
+        await interaction.response.send_message("Stopping the profiler, the report follows shortly.", ephemeral=True)
+
+    @app_commands.command(name="update", description="Pull latest changes from git and reload or restart as needed.")
+    @app_commands.describe(restart="Restart the whole process even if only cogs changed.")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def update(self, interaction: discord.Interaction, restart: bool = False):
         await interaction.response.send_message("Pulling latest changes from GitHub...", ephemeral=True)
 
         try:
-            # Run git pull
-            process = subprocess.run(["git", "pull"], capture_output=True, text=True)
+            # git runs without blocking the event loop
+            _, old, _ = await git("rev-parse", "HEAD")
+            code, output, error = await git("pull")
+            if code != 0:
+                return await interaction.followup.send(f"Git pull failed.\nError:\n```\n{error[:1800]}\n```")
+            _, new, _ = await git("rev-parse", "HEAD")
+
+            if old == new and not restart:
+                return await interaction.followup.send("Already up to date.")
 
-            if process.returncode == 0:
-                await interaction.followup.send(f"Git pull successful.\nOutput:\n```\n{process.stdout}\n```\nRestarting bot...")
-                logger.info("Update command initiated. Restarting...")
+            # Only changed cogs are reloaded; anything else means a full restart (see src/updater.py)
+            plan = await UpdatePlan.between(old, new) if old != new else UpdatePlan([])
+            summary = f"Git pull successful ({old[:7]}..{new[:7]}).\nOutput:\n```\n{output[:1500]}\n```\n"
 
-                # Restart the bot process
-                # This works if running via a wrapper or simple python script.
-                # In Docker, the container might exit and restart if configured to do so (restart: always).
-                os.execv(sys.executable, ['python'] + sys.argv)
+            if restart or plan.restart:
+                reason = "requested" if restart else "core files changed: " + ", ".join(plan.restart_reasons[:10])
+                await interaction.followup.send(summary + f"Restarting bot ({reason})...")
+                logger.info(f"Update command initiated. Restarting ({reason})...")
+                return await self.restart()
+
+            extensions = plan.reload + plan.load + plan.unload
+            if not extensions:
+                return await interaction.followup.send(summary + "No code that needs reloading changed.")
+
+            await interaction.followup.send(summary + f"Reloading {', '.join(ext.rsplit('.', 1)[-1] for ext in extensions)}...")
+            logger.info(f"Update command initiated. Hot reloading {', '.join(extensions)}")
+
+            # In cluster mode every worker reloads, since they all run from this checkout
+            if self.bot.ipc:
+                clusters = (await self.bot.ipc.request("cluster_info"))["clusters"]
+                try:
+                    reports = await self.bot.ipc.request("reload_extensions", timeout=RELOAD_TIMEOUT, **plan.extensions)
+                except asyncio.TimeoutError:
+                    reports = []
             else:
-                await interaction.followup.send(f"Git pull failed.\nError:\n```\n{process.stderr}\n```")
+                clusters = 1
+                reports = [await self.bot.ipc_reload_extensions(**plan.extensions)]
+
+            # Once, from this process: every worker has the same commands
+            await self.bot.sync_tree()
+
+            # A worker that didn't answer may still be reloading or may have failed; either way it isn't done
+            answered = {report["cluster_id"]: report["results"] for report in reports or []}
+            failed = False
+            lines = []
+            for cluster_id in sorted(set(range(clusters)) | set(answered)):
+                results = answered.get(cluster_id)
+                if results is None:
+                    failed = True
+                    lines.append(f"Cluster {cluster_id}: FAILED, no answer within {RELOAD_TIMEOUT}s (check its logs)")
+                    continue
+                failed = failed or any(outcome.startswith("failed") for outcome in results.values())
+                outcomes = ", ".join(f"{ext.rsplit('.', 1)[-1]} {outcome}" for ext, outcome in results.items())
+                lines.append(f"Cluster {cluster_id}: {outcomes}")
+
+            status = "Update incomplete, some reloads failed." if failed else "Update applied."
+            await interaction.followup.send(f"{status}\n```\n" + "\n".join(lines)[:1800] + "\n```")
         except Exception as e:
             await interaction.followup.send(f"An error occurred during update: {str(e)}")
             logger.error(f"Update failed: {e}")
 
+    async def restart(self):
+        # In cluster mode the launcher restarts every worker so they all run the new code
+        if self.bot.ipc:
+            await self.bot.ipc.request("restart")
+            return
+
+        # Restart the bot process
+        # This works if running via a wrapper or simple python script.
+        # In Docker, the container might exit and restart if configured to do so (restart: always).
+        stop_logging() # execv skips atexit, so write out queued log lines first
+        os.execv(sys.executable, ['python'] + sys.argv)
+
 async def setup(bot):
     await bot.add_cog(System(bot))
@@ -1,10 +1,15 @@
+import asyncio
+import os
 import discord
 from discord import app_commands
 from discord.ext import commands
 from discord.ui import View, Select, Button
-from sqlalchemy import select
+from sqlalchemy import select, update
 from src.database.db import get_session
-from src.database.models import GuildConfig, Ticket
+from src.database.models import Ticket
+from src.database.cache import guild_configs
+from src.transcripts import TranscriptExporter
+from src.config import TRANSCRIPT_ATTACH_MAX_BYTES
 from src.logger import logger
 
 class TicketSelect(Select):
@@ -24,13 +29,10 @@ class TicketSelect(Select):
         category_id = None
 
         staff_role_id = None
-        async for session in get_session():
-            stmt = select(GuildConfig).where(GuildConfig.guild_id == guild.id)
-            result = await session.execute(stmt)
-            config = result.scalar_one_or_none()
-            if config:
-                category_id = config.ticket_category_id
-                staff_role_id = config.admin_role_id
+        config = await guild_configs.get(guild.id)
+        if config:
+            category_id = config.ticket_category_id
+            staff_role_id = config.admin_role_id
 
         category = guild.get_channel(category_id) if category_id else None
 
@@ -90,14 +92,19 @@ class TicketControlView(View):
             result = await session.execute(stmt)
             ticket = result.scalar_one_or_none()
 
-            if ticket:
-                ticket.status = 'CLOSED'
-                ticket.closed_at = datetime.utcnow()
-                await session.commit()
-
-                await interaction.response.send_message("Ticket closing in 5 seconds...")
-                await discord.utils.sleep_until(discord.utils.utcnow() + timedelta(seconds=5))
-                await interaction.channel.delete()
+            cog = interaction.client.get_cog("Tickets")
+            if ticket and cog.archiving(interaction.channel.id):
+                await interaction.response.send_message("This ticket is already closing.", ephemeral=True)
+            elif ticket:
+                # A CLOSED ticket whose channel still exists had a failed export; try again
+                if ticket.status != 'CLOSED':
+                    ticket.status = 'CLOSED'
+                    ticket.closed_at = datetime.utcnow()
+                    await session.commit()
+
+                await interaction.response.send_message("Ticket closed. Saving the transcript, this channel will be deleted shortly...")
+                # Export and delete in the background so long tickets don't hold up the interaction
+                cog.archive(interaction.channel, ticket.id)
             else:
                 await interaction.response.send_message("This does not appear to be a tracked ticket channel.", ephemeral=True)
 
@@ -111,6 +118,69 @@ class TicketLauncherView(View):
 class Tickets(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._archives = {}
+
+    async def cog_load(self):
+        self.bot.scheduler.handler("delete_channel")(self.delete_channel)
+        # on_ready doesn't fire again after a hot reload; replace the old module's views now
+        if self.bot.is_ready():
+            await self.on_ready()
+
+    async def cog_unload(self):
+        # Give running exports a chance to finish before shutdown / reload
+        if self._archives:
+            done, pending = await asyncio.wait(self._archives.values(), timeout=30)
+            for task in pending:
+                task.cancel()
+
+    def archiving(self, channel_id):
+        return channel_id in self._archives
+
+    def archive(self, channel, ticket_id):
+        """Exports a closed ticket's transcript, then schedules the channel for deletion."""
+        if channel.id not in self._archives:
+            task = asyncio.create_task(self._archive(channel, ticket_id), name="ticket-archive")
+            self._archives[channel.id] = task
+            task.add_done_callback(lambda _: self._archives.pop(channel.id, None))
+
+    async def delete_channel(self, job):
+        """Scheduled action: deletes a closed ticket's channel."""
+        channel = self.bot.get_channel(job.target_id)
+        if channel is None:
+            return
+        try:
+            await channel.delete(reason="Ticket closed")
+        except discord.NotFound:
+            pass
+
+    async def _archive(self, channel, ticket_id):
+        grace = datetime.utcnow() + timedelta(seconds=5)
+        try:
+            exporter = await TranscriptExporter(channel, ticket_id).run()
+        except Exception as e:
+            # Keep the channel rather than lose the conversation
+            logger.error(f"Transcript export failed for ticket {ticket_id}: {e}")
+            try:
+                await channel.send("Saving the transcript failed, so this channel was kept. Please delete it manually.")
+            except discord.HTTPException:
+                pass
+            return
+
+        async for session in get_session():
+            await session.execute(update(Ticket).where(Ticket.id == ticket_id).values(transcript_path=exporter.path))
+            await session.commit()
+
+        content = f"**Ticket Closed** #{ticket_id} ({channel.name}): {exporter.count} message(s), transcript saved to `{exporter.path}`"
+        try:
+            if os.path.getsize(exporter.html_path) <= TRANSCRIPT_ATTACH_MAX_BYTES:
+                await self.bot.modlog.post_file(channel.guild, content, exporter.html_path)
+            else:
+                self.bot.modlog.enqueue(channel.guild, content)
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to post transcript of ticket {ticket_id} to the mod-log: {e}")
+
+        # Persisted, so the channel still goes away if we restart in the meantime
+        await self.bot.scheduler.schedule("delete_channel", channel.guild.id, channel.id, grace)
 
     @app_commands.command(name="ticket_panel", description="Send the ticket creation panel.")
     @app_commands.checks.has_permissions(administrator=True)
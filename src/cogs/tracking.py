@@ -1,41 +1,202 @@
+import asyncio
 import discord
 from discord import app_commands
-from discord.ext import commands
-from sqlalchemy import select, update
-from sqlalchemy.dialects.postgresql import insert
-from src.database.db import get_session
-from src.database.models import UserProfile, UserHistory
+from discord.ext import commands, tasks
+from src.database.db import async_session
+from src.database.buffers import MessageCountBuffer, HistoryBuffer, ActivityBuffer, increment_profile_counters
+from src.database.activity import compact_activity, activity_series, activity_top
+from src.database.leaderboard import leaderboards
+from src.config import (
+    MESSAGE_COUNT_FLUSH_INTERVAL, MESSAGE_COUNT_MAX_PENDING, INVITE_JOIN_WINDOW,
+    HISTORY_FLUSH_INTERVAL, HISTORY_MAX_PENDING,
+    ACTIVITY_FLUSH_INTERVAL, ACTIVITY_MAX_PENDING, ACTIVITY_HOURLY_RETENTION_DAYS
+)
 from src.logger import logger
-from datetime import datetime
+from src.profiling import latency_budget
+from datetime import datetime, timedelta
 
 class Tracking(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self._invites_cache = {}
+        self._invite_meta = {}
+        self._invite_locks = {}
+        self._pending_joins = {}
+        self._join_tasks = {}
+        self.message_counts = MessageCountBuffer(
+            flush_interval=MESSAGE_COUNT_FLUSH_INTERVAL,
+            max_pending=MESSAGE_COUNT_MAX_PENDING
+        )
+        self.history = HistoryBuffer(
+            flush_interval=HISTORY_FLUSH_INTERVAL,
+            max_pending=HISTORY_MAX_PENDING
+        )
+        self.activity = ActivityBuffer(
+            flush_interval=ACTIVITY_FLUSH_INTERVAL,
+            max_pending=ACTIVITY_MAX_PENDING
+        )
+
+    async def cog_load(self):
+        self.message_counts.start()
+        self.history.start()
+        self.activity.start()
+        self.compact_activity.start()
+
+        # Hot reload (/update): take over the previous instance's invite caches
+        # instead of refetching every guild's invites
+        state = self.bot.cog_state.pop(self.qualified_name, None)
+        if state:
+            self.import_state(state)
+        elif self.bot.is_ready():
+            asyncio.create_task(self.on_ready(), name="invite-cache")
+
+    def export_state(self):
+        """In-memory state handed to the new instance on hot reload (see Bot.reload_extensions)."""
+        return {
+            "invites": self._invites_cache,
+            "invite_meta": self._invite_meta,
+            "pending_joins": self._pending_joins,
+        }
+
+    def import_state(self, state):
+        self._invites_cache = state["invites"]
+        self._invite_meta = state["invite_meta"]
+        self._pending_joins = state["pending_joins"]
+        # The old instance's join windows were cancelled on unload; reopen them here
+        for guild_id in list(self._pending_joins):
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                self._pending_joins.pop(guild_id)
+                continue
+            self._join_tasks[guild_id] = asyncio.create_task(self._attribute_joins(guild), name="invite-attribution")
+
+    async def cog_unload(self):
+        # Flush buffered counts on shutdown / reload
+        for task in self._join_tasks.values():
+            task.cancel()
+        await self.message_counts.close()
+        await self.history.close()
+        await self.activity.close()
+        self.compact_activity.cancel()
 
     @commands.Cog.listener()
+    @latency_budget(10) # Counting is buffered, so anything slow here is a regression
     async def on_message(self, message):
         if message.author.bot or not message.guild:
             return
 
-        async for session in get_session():
-            # Upsert UserProfile
-            # We use Postgres insert().on_conflict_do_update() for efficiency if possible,
-            # but standard ORM way is also fine for low scale.
+        # Counts are buffered and written in bulk, see MessageCountBuffer
+        self.message_counts.add(message.guild.id, message.author.id)
+        self.activity.add(message.guild.id, message.channel.id, message.author.id, message.created_at)
+
+        # Lazy profiles only load a guild's members once it is active
+        self.bot.request_chunk(message.guild)
+
+    @tasks.loop(hours=1)
+    async def compact_activity(self):
+        try:
+            compacted = await compact_activity(ACTIVITY_HOURLY_RETENTION_DAYS)
+            if compacted:
+                logger.info(f"Compacted {compacted} hourly activity row(s) into daily buckets.")
+        except Exception as e:
+            logger.error(f"Activity compaction failed: {e}")
+
+    @app_commands.command(name="activity", description="Chart message activity for the server, a channel or a user.")
+    async def activity_command(self, interaction: discord.Interaction,
+                               days: app_commands.Range[int, 1, 90] = 7,
+                               channel: discord.TextChannel = None,
+                               member: discord.Member = None):
+        """
+        Parameters:
+        - days: How many days back to chart (1-90).
+        - channel: Optional. Only count messages in this channel.
+        - member: Optional. Only count messages from this member.
+        """
+        await interaction.response.defer()
+
+        # Flush what is buffered so the chart includes the last few seconds
+        await self.activity.flush()
+
+        hourly = days <= 2
+        now = datetime.utcnow()
+        start = now - timedelta(days=days)
+        start = start.replace(minute=0, second=0, microsecond=0) if hourly else start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        channel_id = channel.id if channel else None
+        user_id = member.id if member else None
+        series = await activity_series(interaction.guild.id, start, hourly=hourly, channel_id=channel_id, user_id=user_id)
+
+        # Fill empty buckets so gaps show in the chart
+        step = timedelta(hours=1) if hourly else timedelta(days=1)
+        buckets = []
+        when = start
+        while when <= now:
+            buckets.append((when, series.get(when, 0)))
+            when += step
 
-            stmt = select(UserProfile).where(
-                (UserProfile.user_id == message.author.id) &
-                (UserProfile.guild_id == message.guild.id)
-            )
-            result = await session.execute(stmt)
-            profile = result.scalar_one_or_none()
+        total = sum(count for _, count in buckets)
+        scope = member.display_name if member else (channel.mention if channel else interaction.guild.name)
+        embed = discord.Embed(
+            title=f"Activity for the last {days} day(s)",
+            description=f"{scope}: **{total}** message(s)",
+            color=discord.Color.blue()
+        )
 
-            if not profile:
-                profile = UserProfile(user_id=message.author.id, guild_id=message.guild.id, message_count=1)
-                session.add(profile)
-            else:
-                profile.message_count += 1
+        peak = max((count for _, count in buckets), default=0) or 1
+        fmt = "%m-%d %H:00" if hourly else "%Y-%m-%d"
+        lines = [f"{when.strftime(fmt)} {'█' * round(count / peak * 20):<20} {count}" for when, count in buckets]
+        chart = "\n".join(lines)
+        if len(chart) > 3900:
+            chart = "\n".join(lines[-(3900 // (len(lines[0]) + 1)):])
+        embed.description += f"\n```\n{chart}\n```"
 
-            await session.commit()
+        if not member:
+            by, label = ("user_id", lambda i: f"<@{i}>") if channel else ("channel_id", lambda i: f"<#{i}>")
+            top = await activity_top(interaction.guild.id, start, by, channel_id=channel_id)
+            if top:
+                embed.add_field(
+                    name="Top members" if channel else "Top channels",
+                    value="\n".join(f"{label(i)}: {count}" for i, count in top),
+                    inline=False
+                )
+
+        await interaction.followup.send(embed=embed)
+
+    @app_commands.command(name="leaderboard", description="Show the top members by messages or invites.")
+    @app_commands.choices(metric=[
+        app_commands.Choice(name="Messages", value="messages"),
+        app_commands.Choice(name="Invites", value="invites"),
+    ])
+    async def leaderboard(self, interaction: discord.Interaction, metric: str = "messages", member: discord.Member = None):
+        """
+        Parameters:
+        - metric: Rank by messages sent or members invited.
+        - member: Optional. Whose rank to show (defaults to you).
+        """
+        await interaction.response.defer()
+
+        if metric == "messages":
+            # Push buffered counts through so the ranking includes the last few seconds
+            await self.message_counts.flush()
+
+        guild_id = interaction.guild.id
+        member = member or interaction.user
+        top = await leaderboards.top(guild_id, metric, 10)
+        rank, count = await leaderboards.rank(guild_id, metric, member.id)
+
+        unit = "message(s)" if metric == "messages" else "invite(s)"
+        lines = [f"**{i}.** <@{user_id}>: {value} {unit}" for i, (user_id, value) in enumerate(top, 1)]
+        embed = discord.Embed(
+            title=f"{'Message' if metric == 'messages' else 'Invite'} Leaderboard",
+            description="\n".join(lines) or "No activity recorded yet.",
+            color=discord.Color.gold()
+        )
+        embed.add_field(
+            name=f"Rank of {member.display_name}",
+            value=f"#{rank} with {count} {unit}" if rank else "Not ranked yet.",
+            inline=False
+        )
+        await interaction.followup.send(embed=embed)
 
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
@@ -43,107 +204,152 @@ class Tracking(commands.Cog):
             return
 
         # Check for nickname change
+        # History is buffered and written in batches, see HistoryBuffer
         if before.nick != after.nick:
-            async for session in get_session():
-                history = UserHistory(
-                    user_id=after.id,
-                    guild_id=after.guild.id,
-                    change_type='NICKNAME',
-                    old_value=before.nick,
-                    new_value=after.nick,
-                    timestamp=datetime.utcnow()
-                )
-                session.add(history)
-                await session.commit()
-
-        # Check for username change (if global update happens while in guild context?
-        # Actually on_member_update covers guild-specific changes like nickname.
-        # on_user_update covers global username changes, but we track per guild history usually)
-
-        # If username changed (rarely captured in on_member_update unless we check user object)
-        if before.name != after.name:
-             async for session in get_session():
-                history = UserHistory(
-                    user_id=after.id,
-                    guild_id=after.guild.id,
-                    change_type='USERNAME',
-                    old_value=before.name,
-                    new_value=after.name,
-                    timestamp=datetime.utcnow()
-                )
-                session.add(history)
-                await session.commit()
+            self.history.add(after.guild.id, after.id, 'NICKNAME', before.nick, after.nick)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before, after):
+        # Username changes are global, so record one per mutual guild in a single batch
+        if after.bot or before.name == after.name:
+            return
+
+        now = datetime.utcnow()
+        for guild in after.mutual_guilds:
+            self.history.add(guild.id, after.id, 'USERNAME', before.name, after.name, now)
 
     # Invite Tracking
-    # We maintain a local cache of invites to compare against when a member joins
+    # We keep a compact code -> uses map per guild and diff it against a fresh
+    # fetch when members join. Joins within INVITE_JOIN_WINDOW seconds share one
+    # fetch, and the usage deltas decide which inviters get credit.
 
-    def __init__(self, bot):
-        self.bot = bot
-        self._invites_cache = {}
+    async def _fetch_invites(self, guild):
+        """Returns ({code: uses}, {code: (inviter_id, max_uses)}) for a guild, including the vanity URL."""
+        invites = await guild.invites()
+        uses = {}
+        meta = {}
+        for invite in invites:
+            uses[invite.code] = invite.uses or 0
+            meta[invite.code] = (invite.inviter.id if invite.inviter else None, invite.max_uses or 0)
+
+        if "VANITY_URL" in guild.features:
+            try:
+                vanity = await guild.vanity_invite()
+            except discord.HTTPException:
+                vanity = None
+            if vanity:
+                uses[vanity.code] = vanity.uses or 0
+                meta[vanity.code] = (None, 0)
+
+        return uses, meta
+
+    async def _cache_guild_invites(self, guild):
+        try:
+            uses, meta = await self._fetch_invites(guild)
+        except discord.HTTPException:
+            return
+        self._invites_cache[guild.id] = uses
+        self._invite_meta[guild.id] = meta
 
     @commands.Cog.listener()
     async def on_ready(self):
         # Cache invites for all guilds on startup
-        for guild in self.bot.guilds:
-            try:
-                self._invites_cache[guild.id] = await guild.invites()
-            except:
-                pass
+        await asyncio.gather(*(self._cache_guild_invites(guild) for guild in self.bot.guilds))
+        # Already seeded guilds are skipped, so reconnects are cheap
+        await leaderboards.seed_guilds([guild.id for guild in self.bot.guilds])
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        await self._cache_guild_invites(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self._invites_cache.pop(guild.id, None)
+        self._invite_meta.pop(guild.id, None)
+        leaderboards.forget(guild.id)
 
     @commands.Cog.listener()
     async def on_invite_create(self, invite):
         # Update cache when new invite is created
         if invite.guild.id in self._invites_cache:
-             self._invites_cache[invite.guild.id].append(invite)
+            self._invites_cache[invite.guild.id][invite.code] = invite.uses or 0
+            self._invite_meta[invite.guild.id][invite.code] = (invite.inviter.id if invite.inviter else None, invite.max_uses or 0)
+
+    @commands.Cog.listener()
+    async def on_invite_delete(self, invite):
+        guild_id = invite.guild.id if invite.guild else None
+        if guild_id not in self._invites_cache:
+            return
+        # A join window is open: the invite may have just hit max_uses, so
+        # leave it for the diff to account for. The refetch drops it anyway.
+        if guild_id in self._join_tasks:
+            return
+        self._invites_cache[guild_id].pop(invite.code, None)
+        self._invite_meta[guild_id].pop(invite.code, None)
 
     @commands.Cog.listener()
+    @latency_budget()
     async def on_member_join(self, member):
         guild = member.guild
         if guild.id not in self._invites_cache:
             return
 
-        old_invites = self._invites_cache[guild.id]
-        try:
-            new_invites = await guild.invites()
-        except:
-            return
+        self._pending_joins.setdefault(guild.id, []).append(member)
+        if guild.id not in self._join_tasks:
+            self._join_tasks[guild.id] = asyncio.create_task(self._attribute_joins(guild), name="invite-attribution")
 
-        # Find which invite usage count incremented
-        used_invite = None
-        for new_inv in new_invites:
-            for old_inv in old_invites:
-                if new_inv.code == old_inv.code:
-                    if new_inv.uses > old_inv.uses:
-                        used_invite = new_inv
-                        break
-            if used_invite:
-                break
-
-        # Update cache
-        self._invites_cache[guild.id] = new_invites
-
-        if used_invite and used_invite.inviter:
-             async for session in get_session():
-                # Update inviter's stats
-                stmt = select(UserProfile).where(
-                    (UserProfile.user_id == used_invite.inviter.id) &
-                    (UserProfile.guild_id == guild.id)
-                )
-                result = await session.execute(stmt)
-                profile = result.scalar_one_or_none()
-
-                if not profile:
-                    profile = UserProfile(
-                        user_id=used_invite.inviter.id,
-                        guild_id=guild.id,
-                        invites_count=1
-                    )
-                    session.add(profile)
-                else:
-                    profile.invites_count += 1
-
-                await session.commit()
-                logger.info(f" tracked invite for {member} by {used_invite.inviter}")
+    async def _attribute_joins(self, guild):
+        await asyncio.sleep(INVITE_JOIN_WINDOW)
+
+        # Joins arriving from here on open a new window
+        self._join_tasks.pop(guild.id, None)
+        members = self._pending_joins.pop(guild.id, [])
+
+        lock = self._invite_locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            try:
+                new_uses, new_meta = await self._fetch_invites(guild)
+            except discord.HTTPException as e:
+                logger.warning(f"Could not fetch invites for guild {guild.id}, {len(members)} join(s) unattributed: {e}")
+                return
+
+            old_uses = self._invites_cache.get(guild.id, {})
+            old_meta = self._invite_meta.get(guild.id, {})
+            self._invites_cache[guild.id] = new_uses
+            self._invite_meta[guild.id] = new_meta
+
+            credits = {}
+            attributed = 0
+            for code, uses in new_uses.items():
+                delta = uses - old_uses.get(code, 0)
+                if delta > 0:
+                    inviter_id = new_meta[code][0]
+                    credits[inviter_id] = credits.get(inviter_id, 0) + delta
+                    attributed += delta
+
+            # Invites that vanished were most likely used up by these joins
+            for code, uses in old_uses.items():
+                if code in new_uses or attributed >= len(members):
+                    continue
+                inviter_id, max_uses = old_meta.get(code, (None, 0))
+                if max_uses and uses < max_uses:
+                    delta = min(max_uses - uses, len(members) - attributed)
+                    credits[inviter_id] = credits.get(inviter_id, 0) + delta
+                    attributed += delta
+
+        # Vanity URL joins have no inviter to credit
+        credits.pop(None, None)
+        if credits:
+            counts = {(guild.id, inviter_id): delta for inviter_id, delta in credits.items()}
+            try:
+                async with async_session() as session:
+                    updated = await increment_profile_counters(session, "invites_count", counts)
+                    await session.commit()
+                leaderboards.offer_rows("invites", updated)
+            except Exception as e:
+                logger.error(f"Failed to save invite counts for guild {guild.id}: {e}")
+
+        logger.info(f"Tracked {len(members)} join(s) in guild {guild.id}: {attributed} attributed to {len(credits)} inviter(s)")
 
 async def setup(bot):
     await bot.add_cog(Tracking(bot))
@@ -1,4 +1,5 @@
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,6 +12,125 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 
 # Construct the Async Database URL
-DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Set DATABASE_URL to use something else, e.g. sqlite+aiosqlite:///bot.db for a single-file database
+DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Connection pool and driver tuning
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0")) # 0 = no timeout
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")) # Set to 0 behind pgbouncer
+
+# Write-behind message counter (Tracking.on_message)
+# Counts are flushed every interval, or immediately once MAX_PENDING are buffered.
+# While the database is reachable that is also about the most a crash can lose; during
+# an outage up to 10 x MAX_PENDING are kept and the oldest beyond that are dropped.
+MESSAGE_COUNT_FLUSH_INTERVAL = float(os.getenv("MESSAGE_COUNT_FLUSH_INTERVAL", "10"))
+MESSAGE_COUNT_MAX_PENDING = int(os.getenv("MESSAGE_COUNT_MAX_PENDING", "500"))
+
+# Joins arriving within this many seconds share one invites fetch
+INVITE_JOIN_WINDOW = float(os.getenv("INVITE_JOIN_WINDOW", "2"))
+
+# Max concurrent mod-log posts for the startup version broadcast
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "10"))
+
+# Cluster mode, set per worker by the launcher (python -m src.cluster)
+CLUSTER_ID = int(os.getenv("CLUSTER_ID", "0"))
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i] or None
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+CLUSTER_IPC_PORT = int(os.getenv("CLUSTER_IPC_PORT")) if os.getenv("CLUSTER_IPC_PORT") else None
+CLUSTER_FAKE_GATEWAY = os.getenv("CLUSTER_FAKE_GATEWAY", "0") == "1"
+
+# Gateway intents and member caching: full, standard or minimal (see src/intents.py)
+INTENT_PROFILE = os.getenv("INTENT_PROFILE", "full")
+
+# Slash commands are only synced when their hash differs from the stored one
+COMMAND_TREE_HASH_FILE = os.getenv("COMMAND_TREE_HASH_FILE", ".command_tree.hash")
+FORCE_TREE_SYNC = os.getenv("FORCE_TREE_SYNC", "0") == "1" or "--sync" in sys.argv
+
+# Mod-log dispatcher: entries within the window are posted as one message
+MODLOG_COALESCE_WINDOW = float(os.getenv("MODLOG_COALESCE_WINDOW", "2"))
+MODLOG_MAX_RETRIES = int(os.getenv("MODLOG_MAX_RETRIES", "3"))
+MODLOG_MAX_BACKLOG = int(os.getenv("MODLOG_MAX_BACKLOG", "1000"))
+
+# /purge: most history scanned per run, and the pause between single deletes
+# of messages too old for bulk delete (they share a strict rate limit)
+PURGE_MAX_SCAN = int(os.getenv("PURGE_MAX_SCAN", "20000"))
+PURGE_OLD_DELETE_INTERVAL = float(os.getenv("PURGE_OLD_DELETE_INTERVAL", "1.2"))
+
+# Write-behind nickname/username history (Tracking.on_member_update / on_user_update)
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "5"))
+HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", "1000"))
+
+# Hourly activity rollups; hourly rows older than the retention are compacted into daily ones
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "30"))
+ACTIVITY_MAX_PENDING = int(os.getenv("ACTIVITY_MAX_PENDING", "5000"))
+ACTIVITY_HOURLY_RETENTION_DAYS = int(os.getenv("ACTIVITY_HOURLY_RETENTION_DAYS", "14"))
+
+# Users kept per guild in the in-memory /leaderboard rankings
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "100"))
+
+# Ticket transcripts: where exports are written, and the largest HTML view attached to the mod-log
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "transcripts")
+TRANSCRIPT_ATTACH_MAX_BYTES = int(os.getenv("TRANSCRIPT_ATTACH_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Scheduled actions (src/scheduler.py): jobs due within the horizon are kept in memory,
+# the rest are picked up from the database as they come due
+SCHEDULER_HORIZON = float(os.getenv("SCHEDULER_HORIZON", "3600"))
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "5"))
+SCHEDULER_MAX_ATTEMPTS = int(os.getenv("SCHEDULER_MAX_ATTEMPTS", "5"))
+
+# Warnings are removed automatically after this many days (0 = never)
+WARNING_EXPIRY_DAYS = int(os.getenv("WARNING_EXPIRY_DAYS", "0"))
+
+# Metrics (src/metrics.py): Prometheus endpoint, off unless METRICS_PORT is set
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
+METRICS_LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "1"))
+
+# Profiling (src/profiling.py)
+# Log the event loop thread's stack when the loop is blocked this many seconds (0 disables the watchdog)
+LOOP_WATCHDOG_THRESHOLD = float(os.getenv("LOOP_WATCHDOG_THRESHOLD", "1"))
+# Seconds between stack samples taken by /profiler start
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))
+# Default budget for handlers decorated with @latency_budget()
+HANDLER_LATENCY_BUDGET_MS = float(os.getenv("HANDLER_LATENCY_BUDGET_MS", "100"))
+
+# Logging (src/logger.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "console" (colored text) or "json" (one JSON object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "console").lower()
+# Write to this file, rotated by size, instead of the console
+LOG_FILE = os.getenv("LOG_FILE") or None
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_FILE_BACKUPS = int(os.getenv("LOG_FILE_BACKUPS", "5"))
+# At most LOG_RATE_LIMIT_BURST messages per call site every LOG_RATE_LIMIT_WINDOW seconds (0 disables)
+LOG_RATE_LIMIT_WINDOW = float(os.getenv("LOG_RATE_LIMIT_WINDOW", "10"))
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "20"))
+
+# Anti-spam / anti-raid (src/antispam.py, AutoMod cog)
+# Off unless the operator opts in; the AutoMod cog isn't added at all otherwise
+ANTISPAM_ENABLED = os.getenv("ANTISPAM_ENABLED", "0") == "1"
+# A member sending ANTISPAM_MESSAGE_LIMIT messages within ANTISPAM_MESSAGE_WINDOW seconds is spamming
+ANTISPAM_MESSAGE_LIMIT = int(os.getenv("ANTISPAM_MESSAGE_LIMIT", "7"))
+ANTISPAM_MESSAGE_WINDOW = float(os.getenv("ANTISPAM_MESSAGE_WINDOW", "4"))
+# ... so is one repeating the same message, or posting text the server saw this many times, within the window
+ANTISPAM_DUPLICATE_LIMIT = int(os.getenv("ANTISPAM_DUPLICATE_LIMIT", "4"))
+ANTISPAM_GUILD_DUPLICATE_LIMIT = int(os.getenv("ANTISPAM_GUILD_DUPLICATE_LIMIT", "8"))
+ANTISPAM_DUPLICATE_WINDOW = float(os.getenv("ANTISPAM_DUPLICATE_WINDOW", "15"))
+# Shorter messages ("gm", "lol") are not compared across members
+ANTISPAM_DUPLICATE_MIN_LENGTH = int(os.getenv("ANTISPAM_DUPLICATE_MIN_LENGTH", "12"))
+# What happens to spammers: log, timeout, kick or ban
+ANTISPAM_ACTION = os.getenv("ANTISPAM_ACTION", "log").lower()
+ANTISPAM_TIMEOUT_MINUTES = int(os.getenv("ANTISPAM_TIMEOUT_MINUTES", "10"))
+# RAID_JOIN_LIMIT joins within RAID_JOIN_WINDOW seconds start raid mode for RAID_DURATION seconds;
+# RAID_ACTION (log, timeout, kick or ban) applies to the members who joined during it
+RAID_JOIN_LIMIT = int(os.getenv("RAID_JOIN_LIMIT", "10"))
+RAID_JOIN_WINDOW = float(os.getenv("RAID_JOIN_WINDOW", "10"))
+RAID_DURATION = float(os.getenv("RAID_DURATION", "300"))
+RAID_ACTION = os.getenv("RAID_ACTION", "log").lower()
 
 VERSION = "0.1 Pre-release"
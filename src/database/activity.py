@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func, text
+from src.database.db import async_session
+from src.database.dialect import insert, trunc_day
+from src.database.models import ActivityHourly, ActivityDaily
+
+# Activity rollups.
+#
+# Tracking.on_message aggregates messages into activity_hourly (see
+# ActivityBuffer). Hourly rows older than the retention period are compacted
+# into activity_daily, so the hourly table stays small and reads over long
+# ranges touch at most one row per day per (channel, user).
+
+COMPACTION_LOCK_KEY = 72_114_002 # Next to migrate.ADVISORY_LOCK_KEY
+
+async def compact_activity(retention_days):
+    """Moves whole days of hourly rows older than `retention_days` into activity_daily."""
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    day = trunc_day(ActivityHourly.hour)
+
+    rollup = select(
+        ActivityHourly.guild_id, day, ActivityHourly.channel_id, ActivityHourly.user_id,
+        func.sum(ActivityHourly.message_count)
+    ).where(ActivityHourly.hour < cutoff).group_by(
+        ActivityHourly.guild_id, day, ActivityHourly.channel_id, ActivityHourly.user_id
+    )
+
+    stmt = insert(ActivityDaily).from_select(
+        ["guild_id", "day", "channel_id", "user_id", "message_count"], rollup
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ActivityDaily.guild_id, ActivityDaily.day, ActivityDaily.channel_id, ActivityDaily.user_id],
+        set_={"message_count": ActivityDaily.message_count + stmt.excluded.message_count}
+    )
+
+    async with async_session() as session:
+        # Every cluster worker runs this loop. Without the lock two of them can
+        # aggregate the same hourly rows before either deletes them, doubling
+        # the daily counts. The lock is released with the transaction; whoever
+        # doesn't get it skips this round. (SQLite serializes writers anyway.)
+        if session.bind.dialect.name == "postgresql":
+            locked = await session.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": COMPACTION_LOCK_KEY})
+            if not locked:
+                return 0
+        await session.execute(stmt)
+        result = await session.execute(delete(ActivityHourly).where(ActivityHourly.hour < cutoff))
+        await session.commit()
+    return result.rowcount
+
+async def activity_series(guild_id, start, hourly=False, channel_id=None, user_id=None):
+    """
+    Message counts per bucket (hour or day) since `start`, for a guild,
+    optionally narrowed to one channel or user. Returns {bucket: count}.
+    """
+    series = {}
+
+    for table, column in ((ActivityHourly, ActivityHourly.hour), (ActivityDaily, ActivityDaily.day)):
+        if hourly and table is ActivityDaily:
+            # Hourly resolution only exists inside the retention window
+            continue
+        bucket = column if hourly else trunc_day(column)
+        stmt = select(bucket, func.sum(table.message_count)).where(
+            (table.guild_id == guild_id) & (column >= start)
+        )
+        if channel_id:
+            stmt = stmt.where(table.channel_id == channel_id)
+        if user_id:
+            stmt = stmt.where(table.user_id == user_id)
+        stmt = stmt.group_by(bucket)
+
+        async with async_session() as session:
+            for when, count in await session.execute(stmt):
+                series[when] = series.get(when, 0) + count
+
+    return dict(sorted(series.items()))
+
+async def activity_top(guild_id, start, by, limit=5, channel_id=None, user_id=None):
+    """Top channels or users (`by` = "channel_id" / "user_id") by messages since `start`."""
+    totals = {}
+    for table, column in ((ActivityHourly, ActivityHourly.hour), (ActivityDaily, ActivityDaily.day)):
+        key = getattr(table, by)
+        stmt = select(key, func.sum(table.message_count)).where(
+            (table.guild_id == guild_id) & (column >= start)
+        )
+        if channel_id:
+            stmt = stmt.where(table.channel_id == channel_id)
+        if user_id:
+            stmt = stmt.where(table.user_id == user_id)
+        # Over-fetch: an item can rank differently in the hourly and daily tables
+        stmt = stmt.group_by(key).order_by(func.sum(table.message_count).desc()).limit(limit * 4)
+
+        async with async_session() as session:
+            for item, count in await session.execute(stmt):
+                totals[item] = totals.get(item, 0) + count
+
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:limit]
@@ -0,0 +1,364 @@
+import asyncio
+import itertools
+from datetime import datetime
+from src.database.db import async_session
+from src.database.dialect import insert
+from src.database.leaderboard import leaderboards
+from src.database.models import UserProfile, UserHistory, ActivityHourly
+from src.logger import logger
+
+# Postgres and SQLite cap a statement at 32767 / 32766 bind parameters; rows use up to 5.
+ROWS_PER_STATEMENT = 5000
+
+# Longest wait between flush attempts while the database keeps failing, in seconds
+MAX_RETRY_DELAY = 300.0
+
+# Items each buffer had to drop because the database was down for too long,
+# by buffer name. Lives here rather than on the buffers so hot reloads keep it.
+dropped = {}
+
+async def increment_profile_counters(session, column, counts):
+    """
+    Adds `counts` ({(guild_id, user_id): delta}) to a UserProfile counter column
+    with multi-row INSERT ... ON CONFLICT DO UPDATE statements. Missing profiles
+    are created. Returns the new (guild_id, user_id, value) of every row so
+    callers can keep in-memory rankings current. The caller commits.
+    """
+    rows = [
+        {"guild_id": guild_id, "user_id": user_id, column: delta}
+        for (guild_id, user_id), delta in counts.items()
+    ]
+    target = getattr(UserProfile, column)
+    updated = []
+
+    for i in range(0, len(rows), ROWS_PER_STATEMENT):
+        stmt = insert(UserProfile).values(rows[i:i + ROWS_PER_STATEMENT])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserProfile.user_id, UserProfile.guild_id],
+            set_={column: target + getattr(stmt.excluded, column)}
+        ).returning(UserProfile.guild_id, UserProfile.user_id, target)
+        updated.extend((await session.execute(stmt)).all())
+    return updated
+
+async def ensure_profiles(session, keys):
+    """Creates any missing UserProfile rows for {(guild_id, user_id)}. The caller commits."""
+    rows = [{"guild_id": guild_id, "user_id": user_id} for guild_id, user_id in keys]
+    for i in range(0, len(rows), ROWS_PER_STATEMENT):
+        stmt = insert(UserProfile).values(rows[i:i + ROWS_PER_STATEMENT]).on_conflict_do_nothing()
+        await session.execute(stmt)
+
+def _merge_counts(buffer, batch):
+    # For buffers of {key: count}: the failed batch goes first, so it is dropped first
+    restored = dict(batch)
+    for key, count in buffer._pending.items():
+        restored[key] = restored.get(key, 0) + count
+    buffer._pending = restored
+    buffer._pending_total += sum(batch.values())
+
+def _drop_counts(buffer, count):
+    lost = 0
+    while lost < count and buffer._pending:
+        lost += buffer._pending.pop(next(iter(buffer._pending)))
+    buffer._pending_total -= lost
+    return lost
+
+class WriteBehindBuffer:
+    """
+    Base for in-memory write-behind buffers.
+
+    Subclasses collect writes in memory and implement `_take()`, `_write()`,
+    `_restore()` and `_drop_oldest()`. The buffer is flushed every
+    `flush_interval` seconds, as soon as `max_pending` items are buffered, and
+    on `close()`. While the database is reachable a crash loses at most about
+    `max_pending` items.
+
+    A failed flush is put back and retried with exponential backoff (starting
+    at `flush_interval`, up to MAX_RETRY_DELAY), so an outage doesn't turn
+    every add() into another failing flush. Writes keep piling up meanwhile;
+    past `max_buffered` items (10 x max_pending by default) the oldest are
+    dropped and counted in `dropped`. That is also how much a crash can lose
+    during an outage.
+    """
+
+    name = "buffer"
+
+    def __init__(self, flush_interval=10.0, max_pending=500, max_buffered=None):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_buffered = max_buffered or max_pending * 10
+        self.failures = 0
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._flush_task = None
+
+    @property
+    def pending(self):
+        """Number of items not yet written to the database."""
+        raise NotImplementedError
+
+    def _take(self):
+        """Returns (batch, size) and empties the buffer."""
+        raise NotImplementedError
+
+    async def _write(self, batch):
+        raise NotImplementedError
+
+    def _restore(self, batch):
+        """Merges a batch that failed to write back into the buffer, ahead of newer items."""
+        raise NotImplementedError
+
+    def _drop_oldest(self, count):
+        """Drops at least `count` items, oldest first. Returns how many were dropped."""
+        raise NotImplementedError
+
+    @property
+    def backing_off(self):
+        return self.failures > 0 and asyncio.get_running_loop().time() < self._retry_at
+
+    def _check_threshold(self):
+        # Size threshold reached, flush without waiting for the next tick
+        if self.pending < self.max_pending:
+            return
+        if self.backing_off:
+            self._trim()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self.flush(), name=f"{self.name}-flush")
+
+    def _trim(self):
+        excess = self.pending - self.max_buffered
+        if excess > 0:
+            lost = self._drop_oldest(excess)
+            dropped[self.name] = dropped.get(self.name, 0) + lost
+            logger.warning(f"{self.name} buffer is over {self.max_buffered} item(s), dropped the oldest {lost}")
+
+    def _failed(self, batch):
+        self._restore(batch)
+        self._trim()
+
+        delay = min(self.flush_interval * 2 ** self.failures, MAX_RETRY_DELAY)
+        self.failures += 1
+        self._retry_at = asyncio.get_running_loop().time() + delay
+        return delay
+
+    async def flush(self):
+        """Writes everything buffered. Returns the number of items written."""
+        async with self._lock:
+            if not self.pending:
+                return 0
+
+            batch, size = self._take()
+            try:
+                await self._write(batch)
+            except Exception as e:
+                delay = self._failed(batch)
+                logger.error(f"Failed to flush {size} {self.name} item(s), retrying in {delay:g}s: {e}")
+                return 0
+
+            self.failures = 0
+            return size
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.backing_off:
+                continue
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"{self.name} flush loop error: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"{self.name}-flush")
+
+    async def close(self):
+        """Stops the periodic flush and writes whatever is still buffered."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+class MessageCountBuffer(WriteBehindBuffer):
+    """
+    Write-behind accumulator for UserProfile.message_count.
+
+    Increments are collected keyed by (guild_id, user_id) and written as one
+    multi-row upsert per flush. The new totals feed the message leaderboard.
+    """
+
+    name = "message-count"
+
+    def __init__(self, flush_interval=10.0, max_pending=500, max_buffered=None):
+        super().__init__(flush_interval, max_pending, max_buffered)
+        self._pending = {}
+        self._pending_total = 0
+
+    @property
+    def pending(self):
+        return self._pending_total
+
+    def add(self, guild_id, user_id, delta=1):
+        key = (guild_id, user_id)
+        self._pending[key] = self._pending.get(key, 0) + delta
+        self._pending_total += delta
+        self._check_threshold()
+
+    def _take(self):
+        batch, self._pending = self._pending, {}
+        total, self._pending_total = self._pending_total, 0
+        return batch, total
+
+    async def _write(self, batch):
+        async with async_session() as session:
+            updated = await increment_profile_counters(session, "message_count", batch)
+            await session.commit()
+        leaderboards.offer_rows("messages", updated)
+
+    def _restore(self, batch):
+        _merge_counts(self, batch)
+
+    def _drop_oldest(self, count):
+        return _drop_counts(self, count)
+
+HISTORY_COLUMNS = ("user_id", "guild_id", "change_type", "old_value", "new_value", "timestamp")
+
+class HistoryBuffer(WriteBehindBuffer):
+    """
+    Write-behind buffer for UserHistory rows.
+
+    Events are keyed by (guild_id, user_id, change_type). A second change of
+    the same kind inside one flush window is folded into the first, keeping the
+    original old value and the newest new value. If a change is reverted inside
+    the window (A -> B -> A) the event is dropped. Rows are written with
+    asyncpg's COPY (copy_records_to_table) on Postgres, or a multi-row INSERT
+    elsewhere, after making sure the referenced user profiles exist.
+    """
+
+    name = "history"
+
+    def __init__(self, flush_interval=5.0, max_pending=1000, max_buffered=None):
+        super().__init__(flush_interval, max_pending, max_buffered)
+        self._pending = {}
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def add(self, guild_id, user_id, change_type, old_value, new_value, timestamp=None):
+        key = (guild_id, user_id, change_type)
+        timestamp = timestamp or datetime.utcnow()
+        existing = self._pending.get(key)
+
+        if existing is None:
+            if old_value != new_value:
+                self._pending[key] = [old_value, new_value, timestamp]
+        elif existing[0] == new_value:
+            # Flip-flop back to where the window started, nothing to record
+            del self._pending[key]
+        else:
+            existing[1] = new_value
+            existing[2] = timestamp
+
+        self._check_threshold()
+
+    def _take(self):
+        batch, self._pending = self._pending, {}
+        return batch, len(batch)
+
+    def _restore(self, batch):
+        # The failed batch is older, so it goes first. A newer event for the same
+        # key is folded in like add() does: the batch's old value, the newer new value.
+        restored = dict(batch)
+        for key, (old_value, new_value, timestamp) in self._pending.items():
+            existing = restored.get(key)
+            if existing is None:
+                restored[key] = [old_value, new_value, timestamp]
+            elif existing[0] == new_value:
+                del restored[key]
+            else:
+                restored[key] = [existing[0], new_value, timestamp]
+        self._pending = restored
+
+    def _drop_oldest(self, count):
+        keys = list(itertools.islice(self._pending, count))
+        for key in keys:
+            del self._pending[key]
+        return len(keys)
+
+    async def _write(self, batch):
+        records = [
+            (user_id, guild_id, change_type, old_value, new_value, timestamp)
+            for (guild_id, user_id, change_type), (old_value, new_value, timestamp) in batch.items()
+        ]
+        profiles = {(guild_id, user_id) for (guild_id, user_id, _) in batch}
+
+        async with async_session() as session:
+            # History rows reference user_profiles, so make sure those exist first
+            await ensure_profiles(session, profiles)
+
+            conn = await session.connection()
+            if conn.dialect.name == "postgresql":
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    UserHistory.__tablename__, records=records, columns=HISTORY_COLUMNS
+                )
+            else:
+                await session.execute(
+                    UserHistory.__table__.insert(),
+                    [dict(zip(HISTORY_COLUMNS, record)) for record in records]
+                )
+            await session.commit()
+
+class ActivityBuffer(WriteBehindBuffer):
+    """
+    Write-behind aggregator for the hourly activity rollup.
+
+    Messages are counted per (guild, channel, user, hour) in memory and added
+    to activity_hourly with multi-row upserts.
+    """
+
+    name = "activity"
+
+    def __init__(self, flush_interval=30.0, max_pending=5000, max_buffered=None):
+        super().__init__(flush_interval, max_pending, max_buffered)
+        self._pending = {}
+        self._pending_total = 0
+
+    @property
+    def pending(self):
+        return self._pending_total
+
+    def add(self, guild_id, channel_id, user_id, when):
+        # `when` is an aware UTC datetime (message.created_at)
+        hour = when.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+        key = (guild_id, channel_id, user_id, hour)
+        self._pending[key] = self._pending.get(key, 0) + 1
+        self._pending_total += 1
+        self._check_threshold()
+
+    def _take(self):
+        batch, self._pending = self._pending, {}
+        total, self._pending_total = self._pending_total, 0
+        return batch, total
+
+    def _restore(self, batch):
+        _merge_counts(self, batch)
+
+    def _drop_oldest(self, count):
+        return _drop_counts(self, count)
+
+    async def _write(self, batch):
+        rows = [
+            {"guild_id": guild_id, "channel_id": channel_id, "user_id": user_id, "hour": hour, "message_count": count}
+            for (guild_id, channel_id, user_id, hour), count in batch.items()
+        ]
+        async with async_session() as session:
+            for i in range(0, len(rows), ROWS_PER_STATEMENT):
+                stmt = insert(ActivityHourly).values(rows[i:i + ROWS_PER_STATEMENT])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[ActivityHourly.guild_id, ActivityHourly.hour, ActivityHourly.channel_id, ActivityHourly.user_id],
+                    set_={"message_count": ActivityHourly.message_count + stmt.excluded.message_count}
+                )
+                await session.execute(stmt)
+            await session.commit()
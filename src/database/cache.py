@@ -0,0 +1,151 @@
+import asyncio
+import time
+from sqlalchemy import select
+from src.database.db import async_session
+from src.database.models import GuildConfig, ReactionRole
+from src.logger import logger
+
+class GuildConfigCache:
+    """
+    Per-process read-through cache of GuildConfig rows.
+
+    GuildConfig only changes through /setup, which writes the new row back with
+    `set()`, so reads on the hot path (mod-log posts, ticket creation) never need
+    a round trip once a guild has been seen. Guilds without a row are cached as
+    None so they don't hit the database either.
+    """
+
+    def __init__(self):
+        self._configs = {}
+        self._fully_loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    async def load_all(self):
+        """Loads every GuildConfig row. Called once at startup."""
+        async with async_session() as session:
+            result = await session.execute(select(GuildConfig))
+            configs = result.scalars().all()
+
+        self._configs = {config.guild_id: config for config in configs}
+        self._fully_loaded = True
+        logger.info(f"Cached {len(self._configs)} guild config(s).")
+
+    async def get(self, guild_id):
+        """Returns the GuildConfig for a guild, or None if it has not been setup."""
+        if guild_id in self._configs or self._fully_loaded:
+            self.hits += 1
+            return self._configs.get(guild_id)
+
+        self.misses += 1
+        async with async_session() as session:
+            stmt = select(GuildConfig).where(GuildConfig.guild_id == guild_id)
+            result = await session.execute(stmt)
+            config = result.scalar_one_or_none()
+
+        self._configs[guild_id] = config
+        return config
+
+    def set(self, config):
+        """Stores a freshly committed GuildConfig, replacing any cached copy."""
+        self._configs[config.guild_id] = config
+
+    def invalidate(self, guild_id=None):
+        """Drops one guild (or everything) so the next read goes to the database."""
+        if guild_id is None:
+            self._configs.clear()
+        else:
+            self._configs.pop(guild_id, None)
+        self._fully_loaded = False
+
+    def all(self):
+        """All cached configs that exist in the database."""
+        return [config for config in self._configs.values() if config is not None]
+
+    @property
+    def stats(self):
+        return {"size": len(self._configs), "hits": self.hits, "misses": self.misses}
+
+guild_configs = GuildConfigCache()
+
+class ReactionRoleIndex:
+    """
+    In-memory index of reaction-role bindings: message_id -> {emoji: role_id}.
+
+    Almost every reaction the bot sees is on a message without a binding, so the
+    reaction listeners check `lookup()` first and return without touching the
+    database. The index is loaded from `reaction_roles` at startup and kept
+    current by the /reaction_role commands. If that load failed, lookups query
+    the one row they need while the full load is retried in the background, at
+    most every LOAD_RETRY_INTERVAL seconds.
+    """
+
+    LOAD_RETRY_INTERVAL = 30.0
+
+    def __init__(self):
+        self._bindings = {}
+        self._loaded = False
+        self._load_task = None
+        self._retry_at = 0.0
+
+    async def load_all(self):
+        async with async_session() as session:
+            result = await session.execute(select(ReactionRole))
+            rows = result.scalars().all()
+
+        bindings = {}
+        for rr in rows:
+            bindings.setdefault(rr.message_id, {})[rr.emoji] = rr.role_id
+
+        self._bindings = bindings
+        self._loaded = True
+        logger.info(f"Indexed {len(rows)} reaction role(s) on {len(bindings)} message(s).")
+
+    async def _load_in_background(self):
+        try:
+            await self.load_all()
+        except Exception as e:
+            self._retry_at = time.monotonic() + self.LOAD_RETRY_INTERVAL
+            logger.error(f"Failed to index reaction roles, retrying in {self.LOAD_RETRY_INTERVAL:g}s: {e}")
+
+    async def _lookup_row(self, message_id, emoji):
+        async with async_session() as session:
+            stmt = select(ReactionRole.role_id).where(
+                (ReactionRole.message_id == message_id) &
+                (ReactionRole.emoji == emoji)
+            )
+            return (await session.execute(stmt)).scalars().first()
+
+    async def lookup(self, message_id, emoji):
+        """Returns the bound role ID, or None if the message/emoji is not tracked."""
+        if not self._loaded:
+            idle = self._load_task is None or self._load_task.done()
+            if idle and time.monotonic() >= self._retry_at:
+                self._load_task = asyncio.create_task(self._load_in_background(), name="reaction-role-index")
+            return await self._lookup_row(message_id, emoji)
+
+        emojis = self._bindings.get(message_id)
+        if emojis is None:
+            return None
+        return emojis.get(emoji)
+
+    def add(self, message_id, emoji, role_id):
+        self._bindings.setdefault(message_id, {})[emoji] = role_id
+
+    def remove(self, message_id, emoji=None):
+        """Removes one emoji binding, or every binding on the message."""
+        if emoji is None:
+            self._bindings.pop(message_id, None)
+            return
+
+        emojis = self._bindings.get(message_id)
+        if emojis is not None:
+            emojis.pop(emoji, None)
+            if not emojis:
+                del self._bindings[message_id]
+
+    @property
+    def stats(self):
+        return {"messages": len(self._bindings), "bindings": sum(len(e) for e in self._bindings.values())}
+
+reaction_roles = ReactionRoleIndex()
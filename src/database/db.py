@@ -1,10 +1,105 @@
+import asyncio
+import sys
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from src.config import DATABASE_URL
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS, DB_STATEMENT_CACHE_SIZE
+)
+from src.database.metrics import db_metrics, db_caller
 from src.logger import logger
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+def _current_caller():
+    caller = db_caller.get()
+    if caller is None:
+        # Background work that didn't go through get_session(); name it by task
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        caller = task.get_name() if task else "unknown"
+    return caller
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection."""
+
+    # Log under sqlalchemy.pool like the stock pools, so the `sqlalchemy` level in
+    # src/logger.py applies (the default name would be src.database.db.InstrumentedPool)
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.InstrumentedPool"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_metrics.observe_checkout_wait(_current_caller(), time.perf_counter() - started)
+
+# Applied to every new SQLite connection: WAL lets readers run alongside the
+# writer, and NORMAL sync is durable in WAL mode except on power loss
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "foreign_keys=ON",
+    "busy_timeout=5000",
+    "temp_store=MEMORY",
+    "cache_size=-65536", # 64 MiB
+    "mmap_size=268435456",
+)
+
+def _engine_options(url):
+    options = {
+        "poolclass": InstrumentedPool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if url.get_backend_name() == "postgresql":
+        # SQLAlchemy keeps its own prepared statement cache on top of asyncpg's
+        url = url.update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+        connect_args = {"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+        if DB_STATEMENT_TIMEOUT_MS:
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        options["connect_args"] = connect_args
+    return url, options
+
+_url, _options = _engine_options(make_url(DATABASE_URL))
+engine = create_async_engine(_url, echo=False, **_options)
 async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+db_metrics.pool = engine.sync_engine.pool
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    db_metrics.observe_statement(statement, _current_caller(), time.perf_counter() - started)
+
+@event.listens_for(engine.sync_engine.pool, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    connection_record.info["checked_out_at"] = time.perf_counter()
+    connection_record.info["caller"] = _current_caller()
+
+@event.listens_for(engine.sync_engine.pool, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    started = connection_record.info.pop("checked_out_at", None)
+    if started is not None:
+        db_metrics.observe_hold(connection_record.info.pop("caller", "unknown"), time.perf_counter() - started)
 
 class Base(DeclarativeBase):
     pass
@@ -18,5 +113,14 @@ async def init_db():
 
 async def get_session() -> AsyncSession:
     """Dependency to get a DB session."""
-    async with async_session() as session:
-        yield session
+    # Attribute pool and statement metrics to the module that asked for the session
+    token = db_caller.set(sys._getframe(1).f_globals.get("__name__", "unknown"))
+    try:
+        async with async_session() as session:
+            yield session
+    finally:
+        try:
+            db_caller.reset(token)
+        except ValueError:
+            # Generator was closed from another context (e.g. early return in `async for`)
+            pass
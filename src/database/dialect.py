@@ -0,0 +1,25 @@
+from sqlalchemy import DateTime, func, literal_column, type_coerce
+from sqlalchemy.dialects import postgresql, sqlite
+from src.database.db import engine
+
+# Backend-specific SQL behind one interface, so the rest of the code runs
+# unchanged on Postgres and SQLite.
+
+def insert(table):
+    """
+    INSERT construct for the configured backend. Both support
+    on_conflict_do_update / on_conflict_do_nothing, `excluded` and RETURNING,
+    which is everything the upserts in this codebase use.
+    """
+    if engine.dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
+def trunc_day(column):
+    """Truncates a DateTime column to midnight."""
+    if engine.dialect.name == "sqlite":
+        # Same text format SQLAlchemy stores DateTime in, so the result compares and
+        # conflicts with stored values and is parsed back into a datetime
+        return type_coerce(func.strftime(literal_column("'%Y-%m-%d 00:00:00.000000'"), column), DateTime)
+    # Rendered inline rather than bound, so GROUP BY matches the selected expression
+    return func.date_trunc(literal_column("'day'"), column)
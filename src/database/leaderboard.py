@@ -0,0 +1,141 @@
+import asyncio
+from sqlalchemy import select, func
+from src.config import LEADERBOARD_SIZE
+from src.database.db import async_session
+from src.database.models import UserProfile
+from src.logger import logger
+
+# In-memory per-guild leaderboards for UserProfile counters.
+#
+# Each (guild, metric) keeps the top LEADERBOARD_SIZE users. It is seeded with
+# an indexed ORDER BY ... LIMIT and then updated from the absolute counts that
+# the bulk counter upserts return, so /leaderboard never sorts the table.
+# Counters only ever go up, which keeps the top-K exact: a user outside it
+# can only enter by passing the current minimum.
+
+METRICS = {
+    "messages": "message_count",
+    "invites": "invites_count",
+}
+
+class TopK:
+    def __init__(self, k):
+        self.k = k
+        self.counts = {}
+        self._floor = 0 # Lower bound of the smallest count held once full
+
+    def offer(self, user_id, count):
+        counts = self.counts
+        if user_id in counts:
+            counts[user_id] = count
+        elif len(counts) < self.k:
+            # Not full means every user of the guild is tracked
+            counts[user_id] = count
+        elif count > self._floor:
+            lowest = min(counts, key=counts.get)
+            if count > counts[lowest]:
+                del counts[lowest]
+                counts[user_id] = count
+            self._floor = min(counts.values())
+
+    def top(self, n):
+        return sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+class Leaderboards:
+    def __init__(self, size=100):
+        self.size = size
+        self._boards = {}
+        self._seeding = {}
+
+    async def seed(self, guild_id, metric):
+        """Loads the top `size` users for one guild and metric."""
+        key = (guild_id, metric)
+        if key in self._boards:
+            return self._boards[key]
+        if key in self._seeding:
+            await self._seeding[key][0]
+            return await self.seed(guild_id, metric)
+
+        # Offers that arrive while we query are replayed on top of the snapshot
+        done = asyncio.get_running_loop().create_future()
+        pending = []
+        self._seeding[key] = (done, pending)
+        try:
+            column = getattr(UserProfile, METRICS[metric])
+            stmt = select(UserProfile.user_id, column).where(
+                (UserProfile.guild_id == guild_id) & (column > 0)
+            ).order_by(column.desc()).limit(self.size)
+            async with async_session() as session:
+                rows = (await session.execute(stmt)).all()
+
+            board = TopK(self.size)
+            for user_id, count in rows:
+                board.offer(user_id, count)
+            for user_id, count in pending:
+                board.offer(user_id, count)
+            self._boards[key] = board
+            return board
+        finally:
+            del self._seeding[key]
+            done.set_result(None)
+
+    async def seed_guilds(self, guild_ids, concurrency=4):
+        """Seeds every metric for many guilds with bounded concurrency (startup)."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def seed(guild_id, metric):
+            async with semaphore:
+                try:
+                    await self.seed(guild_id, metric)
+                except Exception as e:
+                    logger.warning(f"Failed to seed {metric} leaderboard for guild {guild_id}: {e}")
+
+        await asyncio.gather(*(seed(g, m) for g in guild_ids for m in METRICS))
+
+    def offer(self, guild_id, metric, user_id, count):
+        key = (guild_id, metric)
+        board = self._boards.get(key)
+        if board is not None:
+            board.offer(user_id, count)
+        elif key in self._seeding:
+            self._seeding[key][1].append((user_id, count))
+        # Unseeded guilds pick the new value up from the database when seeded
+
+    def offer_rows(self, metric, rows):
+        """Feeds (guild_id, user_id, count) rows returned by a counter upsert."""
+        for guild_id, user_id, count in rows:
+            self.offer(guild_id, metric, user_id, count)
+
+    async def top(self, guild_id, metric, n=10):
+        board = await self.seed(guild_id, metric)
+        return board.top(n)
+
+    async def rank(self, guild_id, metric, user_id):
+        """Returns (rank, count) for a user, or (None, 0) if they have no count yet."""
+        board = await self.seed(guild_id, metric)
+        if user_id in board.counts:
+            count = board.counts[user_id]
+            return 1 + sum(1 for c in board.counts.values() if c > count), count
+
+        column = getattr(UserProfile, METRICS[metric])
+        async with async_session() as session:
+            count = await session.scalar(select(column).where(
+                (UserProfile.guild_id == guild_id) & (UserProfile.user_id == user_id)
+            ))
+            if not count:
+                return None, 0
+            # Index range scan on (guild_id, <metric>)
+            ahead = await session.scalar(select(func.count()).select_from(UserProfile).where(
+                (UserProfile.guild_id == guild_id) & (column > count)
+            ))
+        return ahead + 1, count
+
+    def forget(self, guild_id):
+        for metric in METRICS:
+            self._boards.pop((guild_id, metric), None)
+
+    @property
+    def stats(self):
+        return {"boards": len(self._boards), "entries": sum(len(b.counts) for b in self._boards.values())}
+
+leaderboards = Leaderboards(LEADERBOARD_SIZE)
@@ -0,0 +1,116 @@
+import bisect
+import re
+from contextvars import ContextVar
+
+# Who is using the database right now. get_session() sets it to the calling
+# module, so pool and statement metrics can be broken down per cog.
+db_caller = ContextVar("db_caller", default=None)
+
+# Latency bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Fixed-bucket latency histogram. Cheap enough to update on every statement."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """Upper bound of the bucket containing the p-th percentile (0-100)."""
+        if not self.count:
+            return 0.0
+        rank = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE)\s+"?(\w+)', re.IGNORECASE)
+_MAX_LABELS = 1000
+
+class DBMetrics:
+    """Statement latency, pool checkout wait and connection hold times."""
+
+    def __init__(self):
+        self.statements = {}
+        self.checkout_wait = Histogram()
+        self.callers = {}
+        self.pool = None
+        self._labels = {}
+
+    def label(self, statement):
+        """Short, low-cardinality name for a statement, e.g. 'SELECT guild_config'."""
+        label = self._labels.get(statement)
+        if label is None:
+            verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+            match = _TABLE_RE.search(statement)
+            label = f"{verb} {match.group(1)}" if match else verb
+            if len(self._labels) < _MAX_LABELS:
+                self._labels[statement] = label
+        return label
+
+    def _caller(self, caller):
+        stats = self.callers.get(caller)
+        if stats is None:
+            stats = self.callers[caller] = {"statements": Histogram(), "checkout_wait": Histogram(), "hold": Histogram()}
+        return stats
+
+    def observe_statement(self, statement, caller, seconds):
+        label = self.label(statement)
+        histogram = self.statements.get(label)
+        if histogram is None:
+            histogram = self.statements[label] = Histogram()
+        histogram.observe(seconds)
+        self._caller(caller)["statements"].observe(seconds)
+
+    def observe_checkout_wait(self, caller, seconds):
+        self.checkout_wait.observe(seconds)
+        self._caller(caller)["checkout_wait"].observe(seconds)
+
+    def observe_hold(self, caller, seconds):
+        self._caller(caller)["hold"].observe(seconds)
+
+    def pool_status(self):
+        if self.pool is None:
+            return {}
+        return {
+            "size": self.pool.size(),
+            "checked_out": self.pool.checkedout(),
+            "overflow": self.pool.overflow(),
+            "checked_in": self.pool.checkedin(),
+        }
+
+    def snapshot(self):
+        return {
+            "pool": self.pool_status(),
+            "checkout_wait": self.checkout_wait.summary(),
+            "statements": {label: h.summary() for label, h in sorted(self.statements.items())},
+            "callers": {
+                caller: {name: h.summary() for name, h in stats.items()}
+                for caller, stats in sorted(self.callers.items(), key=lambda kv: str(kv[0]))
+            },
+        }
+
+db_metrics = DBMetrics()
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import importlib
+import os
+import re
+from datetime import datetime
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, inspect, select, text
+from src.database.db import engine
+from src.logger import logger
+
+# Versioned schema migrations.
+#
+# Migrations live in src/database/migrations as NNNN_description.py, are
+# applied in version order and recorded in the schema_migrations table. Each
+# module defines `async def upgrade(conn)` and may set:
+#
+#   BACKGROUND = True   Applied after startup, outside a transaction, so it can
+#                       build indexes CONCURRENTLY without holding up the bot.
+#                       Background migrations must only add indexes/constraints
+#                       the code doesn't depend on.
+#
+# Everything else runs inside a transaction before the cogs load. Postgres
+# advisory locks make sure only one process (e.g. one cluster worker) applies
+# migrations of each kind at a time. Background ones use their own lock, so an
+# index build doesn't hold up other workers' startup, and nothing is locked
+# when there is nothing pending.
+#
+#   python -m src.database.migrate           apply everything pending
+#   python -m src.database.migrate --status  show applied / pending versions
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+MIGRATION_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.py$")
+ADVISORY_LOCK_KEY = 72_114_001
+BACKGROUND_LOCK_KEY = 72_114_003
+
+schema_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", schema_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+class Migration:
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+        self.background = getattr(module, "BACKGROUND", False)
+        self.description = (module.__doc__ or name).strip().splitlines()[0]
+
+    async def upgrade(self, conn):
+        await self.module.upgrade(conn)
+
+def discover():
+    """All migrations in version order."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = MIGRATION_FILE_RE.match(filename)
+        if not match:
+            continue
+        module = importlib.import_module(f"src.database.migrations.{filename[:-3]}")
+        migrations.append(Migration(int(match.group(1)), match.group(2), module))
+
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration version numbers in src/database/migrations")
+    return migrations
+
+async def create_index(conn, name, table, columns, unique=False):
+    """
+    Creates an index if it doesn't exist. On Postgres this uses CREATE INDEX
+    CONCURRENTLY (so `conn` must be in autocommit mode) and first drops an
+    INVALID index left behind by an interrupted build.
+    """
+    quote = conn.dialect.identifier_preparer.quote
+    cols = ", ".join(quote(c) for c in columns)
+    unique_sql = "UNIQUE " if unique else ""
+
+    if conn.dialect.name == "postgresql":
+        invalid = await conn.scalar(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name})
+        if invalid:
+            logger.warning(f"Dropping invalid index {name} from an interrupted build")
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {quote(name)}"))
+        await conn.execute(text(f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {quote(name)} ON {quote(table)} ({cols})"))
+    else:
+        await conn.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} ({cols})"))
+
+async def add_column(conn, table, column, type_sql):
+    """
+    Adds a nullable column if it doesn't exist. Fresh databases already get it
+    from create_all, so this has to be a no-op there.
+    """
+    quote = conn.dialect.identifier_preparer.quote
+    existing = await conn.run_sync(lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns(table)})
+    if column not in existing:
+        await conn.execute(text(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(column)} {type_sql}"))
+
+async def _applied_versions(conn):
+    result = await conn.execute(select(schema_migrations.c.version))
+    return {row[0] for row in result}
+
+async def _lock(conn, key, wait):
+    if conn.dialect.name != "postgresql":
+        return True
+    if wait:
+        await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": key})
+        return True
+    return await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": key})
+
+async def _unlock(conn, key):
+    if conn.dialect.name == "postgresql":
+        await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+
+async def migrate(background=None, wait=True):
+    """
+    Applies pending migrations and returns the versions applied.
+    `background=False` applies only foreground migrations, `True` only
+    background ones, `None` everything. With `wait=False` the call returns
+    immediately if another process holds the migration lock.
+    """
+    migrations = [m for m in discover() if background is None or m.background == background]
+    if not migrations:
+        return []
+
+    async with engine.begin() as conn:
+        await conn.run_sync(schema_metadata.create_all)
+        done = await _applied_versions(conn)
+    # Usual case at startup: nothing to do, so don't queue up behind the lock
+    if all(m.version in done for m in migrations):
+        return []
+
+    keys = {False: [ADVISORY_LOCK_KEY], True: [BACKGROUND_LOCK_KEY]}.get(background, [ADVISORY_LOCK_KEY, BACKGROUND_LOCK_KEY])
+    applied = []
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        locked = []
+        try:
+            for key in keys:
+                if not await _lock(conn, key, wait):
+                    logger.info("Another process is applying migrations, skipping.")
+                    return []
+                locked.append(key)
+
+            # Read again under the lock: another process may have just applied them
+            done = await _applied_versions(conn)
+            for migration in migrations:
+                if migration.version in done:
+                    continue
+
+                logger.info(f"Applying migration {migration.version:04d}: {migration.description}")
+                if migration.background:
+                    await migration.upgrade(conn)
+                    await conn.execute(schema_migrations.insert().values(version=migration.version, name=migration.name))
+                else:
+                    # Separate transaction so the schema change and its version row commit together
+                    async with engine.begin() as tx:
+                        await migration.upgrade(tx)
+                        await tx.execute(schema_migrations.insert().values(version=migration.version, name=migration.name))
+                applied.append(migration.version)
+        finally:
+            for key in locked:
+                await _unlock(conn, key)
+
+    return applied
+
+async def migrate_in_background():
+    """Startup hook: applies background migrations without blocking the bot."""
+    try:
+        applied = await migrate(background=True, wait=False)
+        if applied:
+            logger.info(f"Applied {len(applied)} background migration(s).")
+    except Exception as e:
+        logger.error(f"Background migrations failed: {e}")
+
+async def status():
+    async with engine.begin() as conn:
+        await conn.run_sync(schema_metadata.create_all)
+        done = await _applied_versions(conn)
+
+    for migration in discover():
+        state = "applied" if migration.version in done else "pending"
+        kind = "background" if migration.background else "foreground"
+        print(f"{migration.version:04d}  {state:<8} {kind:<10} {migration.description}")
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply database migrations.")
+    parser.add_argument("--status", action="store_true", help="List migrations and whether they are applied.")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.status:
+            await status()
+        else:
+            applied = await migrate()
+            print(f"Applied {len(applied)} migration(s).")
+    finally:
+        await engine.dispose()
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,9 @@
+"""Indexes for the warnings, tickets and user history lookups."""
+from src.database.migrate import create_index
+
+BACKGROUND = True
+
+async def upgrade(conn):
+    await create_index(conn, "ix_warnings_guild_user_timestamp", "warnings", ["guild_id", "user_id", "timestamp"])
+    await create_index(conn, "ix_tickets_channel_status", "tickets", ["channel_id", "status"])
+    await create_index(conn, "ix_user_history_guild_user_timestamp", "user_history", ["guild_id", "user_id", "timestamp"])
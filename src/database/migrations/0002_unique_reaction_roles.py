@@ -0,0 +1,19 @@
+"""Unique (message_id, emoji) index on reaction roles."""
+from sqlalchemy import text
+from src.database.migrate import create_index
+
+BACKGROUND = True
+
+async def upgrade(conn):
+    # Older versions of /reaction_role could bind the same emoji twice; keep the newest binding
+    if conn.dialect.name == "postgresql":
+        await conn.execute(text(
+            "DELETE FROM reaction_roles a USING reaction_roles b "
+            "WHERE a.message_id = b.message_id AND a.emoji = b.emoji AND a.id < b.id"
+        ))
+    else:
+        await conn.execute(text(
+            "DELETE FROM reaction_roles WHERE id NOT IN "
+            "(SELECT MAX(id) FROM reaction_roles GROUP BY message_id, emoji)"
+        ))
+    await create_index(conn, "ux_reaction_roles_message_emoji", "reaction_roles", ["message_id", "emoji"], unique=True)
@@ -0,0 +1,8 @@
+"""Indexes for the per-guild message and invite leaderboards."""
+from src.database.migrate import create_index
+
+BACKGROUND = True
+
+async def upgrade(conn):
+    await create_index(conn, "ix_user_profiles_guild_message_count", "user_profiles", ["guild_id", "message_count"])
+    await create_index(conn, "ix_user_profiles_guild_invites_count", "user_profiles", ["guild_id", "invites_count"])
@@ -0,0 +1,5 @@
+"""Path of the exported transcript on closed tickets."""
+from src.database.migrate import add_column
+
+async def upgrade(conn):
+    await add_column(conn, "tickets", "transcript_path", "VARCHAR")
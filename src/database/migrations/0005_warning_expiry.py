@@ -0,0 +1,5 @@
+"""Expiry time on warnings."""
+from src.database.migrate import add_column
+
+async def upgrade(conn):
+    await add_column(conn, "warnings", "expires_at", "TIMESTAMP")
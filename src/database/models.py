@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, BigInteger, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from src.database.db import Base
@@ -24,6 +24,12 @@ class UserProfile(Base):
     warnings = relationship("Warning", back_populates="user", cascade="all, delete-orphan")
     history = relationship("UserHistory", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # /leaderboard seeding (ORDER BY ... LIMIT) and rank counts
+        Index('ix_user_profiles_guild_message_count', 'guild_id', 'message_count'), # Migration 0003
+        Index('ix_user_profiles_guild_invites_count', 'guild_id', 'invites_count'), # Migration 0003
+    )
+
 class UserHistory(Base):
     __tablename__ = 'user_history'
 
@@ -42,6 +48,7 @@ class UserHistory(Base):
     from sqlalchemy import ForeignKeyConstraint
     __table_args__ = (
         ForeignKeyConstraint(['user_id', 'guild_id'], ['user_profiles.user_id', 'user_profiles.guild_id']),
+        Index('ix_user_history_guild_user_timestamp', 'guild_id', 'user_id', 'timestamp'), # Migration 0001
     )
 
     timestamp = Column(DateTime, default=datetime.utcnow)
@@ -61,11 +68,13 @@ class Warning(Base):
     from sqlalchemy import ForeignKeyConstraint
     __table_args__ = (
         ForeignKeyConstraint(['user_id', 'guild_id'], ['user_profiles.user_id', 'user_profiles.guild_id']),
+        Index('ix_warnings_guild_user_timestamp', 'guild_id', 'user_id', 'timestamp'), # Migration 0001
     )
 
     moderator_id = Column(BigInteger, nullable=False)
     reason = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=True) # Migration 0005, removed by the scheduler once reached
 
     user = relationship("UserProfile", back_populates="warnings")
 
@@ -80,6 +89,11 @@ class Ticket(Base):
     status = Column(String, default='OPEN') # OPEN, CLOSED
     created_at = Column(DateTime, default=datetime.utcnow)
     closed_at = Column(DateTime, nullable=True)
+    transcript_path = Column(String, nullable=True) # Migration 0004, gzip JSONL export written on close
+
+    __table_args__ = (
+        Index('ix_tickets_channel_status', 'channel_id', 'status'), # Migration 0001
+    )
 
 class ReactionRole(Base):
     __tablename__ = 'reaction_roles'
@@ -89,3 +103,55 @@ class ReactionRole(Base):
     message_id = Column(BigInteger, nullable=False)
     emoji = Column(String, nullable=False) # Unicode or Custom ID
     role_id = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index('ux_reaction_roles_message_emoji', 'message_id', 'emoji', unique=True), # Migration 0002
+    )
+
+class ActivityHourly(Base):
+    __tablename__ = 'activity_hourly'
+
+    # Messages per (guild, channel, user) per hour, rolled up from Tracking.on_message
+    guild_id = Column(BigInteger, primary_key=True)
+    hour = Column(DateTime, primary_key=True) # UTC, truncated to the hour
+    channel_id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)
+    message_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_activity_hourly_guild_channel_hour', 'guild_id', 'channel_id', 'hour'),
+        Index('ix_activity_hourly_guild_user_hour', 'guild_id', 'user_id', 'hour'),
+    )
+
+class ActivityDaily(Base):
+    __tablename__ = 'activity_daily'
+
+    # Hourly rows older than ACTIVITY_HOURLY_RETENTION_DAYS are compacted into these
+    guild_id = Column(BigInteger, primary_key=True)
+    day = Column(DateTime, primary_key=True) # UTC, truncated to the day
+    channel_id = Column(BigInteger, primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)
+    message_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_activity_daily_guild_channel_day', 'guild_id', 'channel_id', 'day'),
+        Index('ix_activity_daily_guild_user_day', 'guild_id', 'user_id', 'day'),
+    )
+
+class ScheduledAction(Base):
+    __tablename__ = 'scheduled_actions'
+
+    # Delayed work run by src/scheduler.py; rows are deleted once they succeed
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    guild_id = Column(BigInteger, nullable=False)
+    action = Column(String, nullable=False) # 'delete_channel', 'unban', 'expire_warning'
+    target_id = Column(BigInteger, nullable=False) # Channel, user or warning ID depending on the action
+    run_at = Column(DateTime, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_scheduled_actions_run_at', 'run_at'),
+        Index('ix_scheduled_actions_action_guild_target', 'action', 'guild_id', 'target_id'),
+    )
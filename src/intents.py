@@ -0,0 +1,102 @@
+import discord
+
+# Intent and member-cache profiles.
+#
+# Intents.all() with default caching makes the bot download and hold every
+# member of every guild, though only a few listeners need it. INTENT_PROFILE
+# selects how much the gateway sends and how much of it we keep:
+#
+#   full      Every intent, every member cached, all guilds chunked at startup.
+#   standard  Members and message content, no presences. Members are cached
+#             as they are seen, and a guild is chunked on demand the first
+#             time one of its members is active.
+#   minimal   No privileged intents and no member cache. Member lookups go
+#             through the API.
+
+class IntentProfile:
+    def __init__(self, name, intents, member_cache_flags, chunk_guilds_at_startup, lazy_chunking):
+        self.name = name
+        self.intents = intents
+        self.member_cache_flags = member_cache_flags
+        self.chunk_guilds_at_startup = chunk_guilds_at_startup
+        self.lazy_chunking = lazy_chunking
+
+    def client_options(self):
+        """Keyword arguments for discord.Client / commands.Bot."""
+        return {
+            "intents": self.intents,
+            "member_cache_flags": self.member_cache_flags,
+            "chunk_guilds_at_startup": self.chunk_guilds_at_startup,
+        }
+
+def _full():
+    return IntentProfile(
+        "full",
+        intents=discord.Intents.all(),
+        member_cache_flags=discord.MemberCacheFlags.all(),
+        chunk_guilds_at_startup=True,
+        lazy_chunking=False
+    )
+
+def _standard():
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    return IntentProfile(
+        "standard",
+        intents=intents,
+        member_cache_flags=discord.MemberCacheFlags.from_intents(intents),
+        chunk_guilds_at_startup=False,
+        lazy_chunking=True
+    )
+
+def _minimal():
+    intents = discord.Intents.default()
+    return IntentProfile(
+        "minimal",
+        intents=intents,
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        chunk_guilds_at_startup=False,
+        lazy_chunking=False
+    )
+
+PROFILES = {
+    "full": _full,
+    "standard": _standard,
+    "minimal": _minimal,
+}
+
+# What each extension needs from the gateway to work fully.
+# "member_cache" means listeners rely on members being cached (e.g. the
+# before/after pair of on_member_update only exists for cached members).
+COG_REQUIREMENTS = {
+    "src.cogs.automod": {"guild_messages", "message_content", "members"},
+    "src.cogs.tracking": {"guild_messages", "members", "invites", "member_cache"},
+    "src.cogs.roles": {"guild_reactions"},
+    "src.cogs.moderation": {"guilds"},
+    "src.cogs.tickets": {"guilds"},
+    "src.cogs.setup": {"guilds"},
+    "src.cogs.system": {"guilds"},
+}
+
+def get_profile(name):
+    try:
+        return PROFILES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown intent profile {name!r}, expected one of: {', '.join(PROFILES)}")
+
+def validate_profile(profile, extensions):
+    """
+    Returns a list of human readable problems with running `extensions` under
+    `profile`. Pass the modules of the cogs that actually loaded, since an
+    extension may load without adding its cog.
+    """
+    problems = []
+    for extension in extensions:
+        for requirement in sorted(COG_REQUIREMENTS.get(extension, ())):
+            if requirement == "member_cache":
+                if not profile.member_cache_flags.joined:
+                    problems.append(f"{extension} relies on the member cache, which profile '{profile.name}' disables")
+            elif not getattr(profile.intents, requirement):
+                problems.append(f"{extension} needs the '{requirement}' intent, which profile '{profile.name}' disables")
+    return problems
@@ -0,0 +1,177 @@
+import asyncio
+import itertools
+import json
+from src.logger import logger
+
+# Lightweight IPC between the cluster launcher and its workers.
+# Messages are newline-delimited JSON over a localhost TCP connection:
+#   {"type": "hello", "cluster_id": 0}                      worker -> launcher
+#   {"type": "request", "id": 1, "op": "stats", "data": {}}  either direction
+#     (optionally with "timeout": seconds the launcher waits for each worker)
+#   {"type": "response", "id": 1, "data": ...}              either direction
+# A request sent by a worker is answered by the launcher, which either handles
+# the op itself (e.g. "restart") or fans it out to every worker and replies
+# with the list of their answers.
+
+REQUEST_TIMEOUT = 5.0
+
+async def _send(writer, message):
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+class IPCServer:
+    """Runs in the launcher process. Routes requests between workers."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.handlers = {}
+        self._workers = {}
+        self._waiters = {}
+        self._ids = itertools.count(1)
+        self._server = None
+
+    def handler(self, op):
+        """Registers a coroutine that answers `op` in the launcher instead of fanning it out."""
+        def decorator(func):
+            self.handlers[op] = func
+            return func
+        return decorator
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._on_connect, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"IPC server listening on {self.host}:{self.port}")
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    @property
+    def connected(self):
+        return sorted(self._workers)
+
+    async def _on_connect(self, reader, writer):
+        cluster_id = None
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                kind = message.get("type")
+
+                if kind == "hello":
+                    cluster_id = message["cluster_id"]
+                    self._workers[cluster_id] = writer
+                    logger.info(f"Cluster {cluster_id} connected to IPC")
+                elif kind == "request":
+                    asyncio.create_task(self._answer(writer, message))
+                elif kind == "response":
+                    waiter = self._waiters.get(message["id"])
+                    if waiter and not waiter.done():
+                        waiter.set_result(message.get("data"))
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning(f"IPC connection from cluster {cluster_id} dropped: {e}")
+        finally:
+            if cluster_id is not None and self._workers.get(cluster_id) is writer:
+                del self._workers[cluster_id]
+            writer.close()
+
+    async def _answer(self, writer, message):
+        op = message["op"]
+        data = message.get("data") or {}
+        try:
+            if op in self.handlers:
+                result = await self.handlers[op](**data)
+            else:
+                result = await self.broadcast(op, timeout=message.get("timeout", REQUEST_TIMEOUT), **data)
+        except Exception as e:
+            logger.error(f"IPC request {op} failed: {e}")
+            result = None
+        await _send(writer, {"type": "response", "id": message["id"], "data": result})
+
+    async def broadcast(self, op, timeout=REQUEST_TIMEOUT, **data):
+        """Sends `op` to every connected worker and returns the answers that arrive within `timeout`."""
+        async def ask(writer):
+            request_id = next(self._ids)
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[request_id] = waiter
+            try:
+                await _send(writer, {"type": "request", "id": request_id, "op": op, "data": data})
+                return await asyncio.wait_for(waiter, timeout)
+            except (asyncio.TimeoutError, ConnectionError):
+                return None
+            finally:
+                self._waiters.pop(request_id, None)
+
+        results = await asyncio.gather(*(ask(writer) for writer in list(self._workers.values())))
+        return [result for result in results if result is not None]
+
+class IPCClient:
+    """Runs in each worker. Answers launcher requests and sends cluster-wide ones."""
+
+    def __init__(self, cluster_id, host="127.0.0.1", port=0):
+        self.cluster_id = cluster_id
+        self.host = host
+        self.port = port
+        self.handlers = {}
+        self._writer = None
+        self._waiters = {}
+        self._ids = itertools.count(1)
+        self._task = None
+
+    def handler(self, op):
+        """Registers a coroutine that answers `op` when another process asks for it."""
+        def decorator(func):
+            self.handlers[op] = func
+            return func
+        return decorator
+
+    async def connect(self):
+        reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        await _send(self._writer, {"type": "hello", "cluster_id": self.cluster_id})
+        self._task = asyncio.create_task(self._listen(reader))
+        logger.info(f"Cluster {self.cluster_id} connected to IPC on port {self.port}")
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        if self._writer:
+            self._writer.close()
+
+    async def _listen(self, reader):
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message.get("type") == "request":
+                    asyncio.create_task(self._answer(message))
+                elif message.get("type") == "response":
+                    waiter = self._waiters.get(message["id"])
+                    if waiter and not waiter.done():
+                        waiter.set_result(message.get("data"))
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning(f"IPC connection lost: {e}")
+
+    async def _answer(self, message):
+        func = self.handlers.get(message["op"])
+        try:
+            result = await func(**(message.get("data") or {})) if func else None
+        except Exception as e:
+            logger.error(f"IPC handler {message['op']} failed: {e}")
+            result = None
+        await _send(self._writer, {"type": "response", "id": message["id"], "data": result})
+
+    async def request(self, op, timeout=REQUEST_TIMEOUT * 2, **data):
+        """
+        Asks the launcher to run `op`. Unhandled ops are answered by every
+        worker, including this one; the launcher waits for them until shortly
+        before `timeout`, so slow workers are still collected.
+        """
+        request_id = next(self._ids)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[request_id] = waiter
+        fan_out = max(timeout - REQUEST_TIMEOUT, REQUEST_TIMEOUT / 2)
+        try:
+            await _send(self._writer, {"type": "request", "id": request_id, "op": op, "data": data, "timeout": fan_out})
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            self._waiters.pop(request_id, None)
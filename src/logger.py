@@ -1,26 +1,176 @@
+import atexit
+import contextlib
+import contextvars
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import colorlog
+from src.config import (
+    LOG_LEVEL, LOG_FORMAT, LOG_FILE, LOG_FILE_MAX_BYTES, LOG_FILE_BACKUPS,
+    LOG_RATE_LIMIT_WINDOW, LOG_RATE_LIMIT_BURST
+)
 
-def setup_logger():
+# Handlers on the event loop thread only put records on a queue; a listener
+# thread formats and writes them (console or a rotating file, plain or JSON
+# lines). Records carry the guild/shard/cog of the event or command that
+# logged them (see log_context) and are rate limited per call site.
+
+_context = contextvars.ContextVar("log_context", default={})
+CONTEXT_FIELDS = ("guild_id", "shard_id", "cog")
+
+def set_log_context(**fields):
+    """Adds fields to the logging context of the current task. Returns a token for reset_log_context."""
+    return _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+
+def reset_log_context(token):
+    _context.reset(token)
+
+@contextlib.contextmanager
+def log_context(**fields):
+    token = set_log_context(**fields)
+    try:
+        yield
+    finally:
+        reset_log_context(token)
+
+class ContextFilter(logging.Filter):
+    """Copies the current log context onto the record."""
+
+    def filter(self, record):
+        context = _context.get()
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+class RateLimitFilter(logging.Filter):
     """
-    Sets up a clean, condensed, colored logger.
+    Lets at most `burst` records per key through every `window` seconds. The
+    key is the call site (logger, file and line) unless the record has a
+    `rate_key` extra. The next record let through for a key says how many
+    were dropped.
     """
-    handler = colorlog.StreamHandler()
-    handler.setFormatter(colorlog.ColoredFormatter(
-        '%(log_color)s[%(asctime)s] [%(levelname)s] %(name)s: %(message)s',
-        datefmt='%H:%M:%S',
-        log_colors={
-            'DEBUG': 'cyan',
-            'INFO': 'green',
-            'WARNING': 'yellow',
-            'ERROR': 'red',
-            'CRITICAL': 'red,bg_white',
+
+    MAX_KEYS = 10000
+
+    def __init__(self, window, burst):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.burst <= 0:
+            return True
+        key = getattr(record, "rate_key", None) or (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                if state is None and len(self._keys) >= self.MAX_KEYS:
+                    self._keys.clear()
+                self._keys[key] = [now, 1, 0]
+            elif state[1] < self.burst:
+                state[1] += 1
+                suppressed = state[2]
+                state[2] = 0
+            else:
+                state[2] += 1
+                return False
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar message(s) suppressed)"
+            record.args = None
+        return True
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Like QueueHandler.prepare, but keeps the traceback separate from the
+        # message so the JSON formatter can put it in its own field.
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
         }
-    ))
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def _output_handler():
+    if LOG_FILE:
+        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8")
+        if LOG_FORMAT != "json":
+            handler.setFormatter(logging.Formatter('[%(asctime)s] [%(levelname)s] %(name)s: %(message)s'))
+    else:
+        handler = colorlog.StreamHandler()
+        if LOG_FORMAT != "json":
+            handler.setFormatter(colorlog.ColoredFormatter(
+                '%(log_color)s[%(asctime)s] [%(levelname)s] %(name)s: %(message)s',
+                datefmt='%H:%M:%S',
+                log_colors={
+                    'DEBUG': 'cyan',
+                    'INFO': 'green',
+                    'WARNING': 'yellow',
+                    'ERROR': 'red',
+                    'CRITICAL': 'red,bg_white',
+                }
+            ))
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JSONFormatter())
+    return handler
+
+_listener = None
+
+def setup_logger():
+    """
+    Sets up a clean, condensed logger that writes from a background thread.
+    LOG_FORMAT=json switches to JSON lines; LOG_FILE writes to a rotating
+    file instead of the console.
+    """
+    global _listener
+
+    handler = _QueueHandler(queue.SimpleQueue())
+    handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT_WINDOW, LOG_RATE_LIMIT_BURST))
+    handler.addFilter(ContextFilter())
+
+    _listener = QueueListener(handler.queue, _output_handler(), respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
 
     logger = colorlog.getLogger()
     logger.addHandler(handler)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(LOG_LEVEL)
 
     # Silence noisy libraries
     logging.getLogger('discord').setLevel(logging.WARNING)
@@ -28,4 +178,11 @@ def setup_logger():
 
     return logger
 
+def stop_logging():
+    """Writes out queued records and stops the listener thread (before exiting or exec'ing)."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
 logger = setup_logger()
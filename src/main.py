@@ -1,19 +1,113 @@
+import asyncio
+import hashlib
+import json
+import math
+import time
 import discord
 from discord.ext import commands
 import os
 import sys
-from src.config import DISCORD_TOKEN, VERSION
-from src.logger import logger
-from src.database.db import init_db
+from sqlalchemy import select
+from src.config import (
+    DISCORD_TOKEN, VERSION, BROADCAST_CONCURRENCY, INTENT_PROFILE,
+    COMMAND_TREE_HASH_FILE, FORCE_TREE_SYNC,
+    CLUSTER_ID, SHARD_IDS, SHARD_COUNT, CLUSTER_IPC_PORT, CLUSTER_FAKE_GATEWAY,
+    METRICS_HOST, METRICS_PORT, LOOP_WATCHDOG_THRESHOLD
+)
+from src.logger import logger, set_log_context
+from src.ipc import IPCClient
+from src.modlog import ModLogDispatcher
+from src.scheduler import Scheduler
+from src.metrics import bot_metrics, InstrumentedCommandTree, MetricsServer
+from src.profiling import LoopWatchdog
+from src.intents import get_profile, validate_profile
+from src.database.db import init_db, async_session
+from src.database.migrate import migrate, migrate_in_background
+from src.database.models import GuildConfig
+from src.database.cache import guild_configs, reaction_roles
 
-class Bot(commands.Bot):
+# Extensions that must finish loading before the given extension starts.
+# Everything else is loaded concurrently.
+EXTENSION_DEPENDENCIES = {}
+
+# After a failed guild chunk, wait this long before trying again; doubles per failure
+CHUNK_RETRY_DELAY = 60.0
+MAX_CHUNK_RETRY_DELAY = 3600.0
+
+def _log_task_failure(task):
+    """Done-callback for background tasks whose errors would otherwise go unseen."""
+    if not task.cancelled() and task.exception():
+        logger.error(f"Background task {task.get_name()} failed", exc_info=task.exception())
+
+def _event_context(coro, args):
+    """guild_id/shard_id/cog log fields for a listener call, from its first argument."""
+    owner = getattr(coro, "__self__", None)
+    context = {"cog": owner.qualified_name if isinstance(owner, commands.Cog) else None}
+    if args:
+        subject = args[0]
+        guild = subject if isinstance(subject, discord.Guild) else getattr(subject, "guild", None)
+        if isinstance(guild, discord.Guild):
+            context["guild_id"] = guild.id
+            context["shard_id"] = guild.shard_id
+        else:
+            # Raw event payloads only carry the id
+            context["guild_id"] = getattr(subject, "guild_id", None)
+    return context
+
+class Bot(commands.AutoShardedBot):
     def __init__(self):
+        # In cluster mode the launcher assigns this process a range of shards;
+        # on its own the bot shards automatically over every guild.
+        self.intent_profile = get_profile(INTENT_PROFILE)
         super().__init__(
             command_prefix=commands.when_mentioned_or("!"),
-            intents=discord.Intents.all(),
-            help_command=None
+            help_command=None,
+            shard_ids=SHARD_IDS,
+            shard_count=SHARD_COUNT,
+            tree_cls=InstrumentedCommandTree,
+            **self.intent_profile.client_options()
         )
         self.version = VERSION
+        self._chunking = set()
+        self._chunk_failures = {} # guild_id -> (failures, monotonic time of the next attempt)
+        self.cluster_id = CLUSTER_ID
+        self.ipc = None
+        self.modlog = ModLogDispatcher(self)
+        self.scheduler = Scheduler(self)
+        self.metrics_server = MetricsServer(self, METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+        self.watchdog = LoopWatchdog(LOOP_WATCHDOG_THRESHOLD) if LOOP_WATCHDOG_THRESHOLD > 0 else None
+        self._broadcast_task = None
+        self._migration_task = None
+        # State handed from a cog to its replacement during a hot reload, by cog name
+        self.cog_state = {}
+
+    async def start_ipc(self):
+        """Connects to the cluster launcher, if this process was started by one."""
+        if CLUSTER_IPC_PORT is None:
+            return
+        self.ipc = IPCClient(self.cluster_id, port=CLUSTER_IPC_PORT)
+        self.ipc.handler("stats")(self.local_stats)
+        self.ipc.handler("reload_extensions")(self.ipc_reload_extensions)
+        await self.ipc.connect()
+
+    async def local_stats(self):
+        """Stats for the shards running in this process."""
+        latency = self.latency
+        return {
+            "cluster_id": self.cluster_id,
+            "shards": self.shard_ids or list(self.shards),
+            "guilds": len(self.guilds),
+            "latency": latency if math.isfinite(latency) else None
+        }
+
+    async def cluster_stats(self):
+        """Stats for every process in the cluster (just this one when not clustered)."""
+        if self.ipc:
+            try:
+                return sorted(await self.ipc.request("stats"), key=lambda s: s["cluster_id"])
+            except asyncio.TimeoutError:
+                logger.warning("Timed out collecting cluster stats, showing local stats only.")
+        return [await self.local_stats()]
 
     async def setup_hook(self):
         """
@@ -22,63 +116,302 @@ class Bot(commands.Bot):
         """
         logger.info(f"Initializing Bot v{self.version}...")
 
+        try:
+            await self.start_ipc()
+        except OSError as e:
+            logger.error(f"Failed to connect to cluster IPC: {e}")
+
+        bot_metrics.start()
+        if self.watchdog:
+            self.watchdog.start()
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Failed to start metrics endpoint on port {METRICS_PORT}: {e}")
+
         # Initialize Database
         try:
             await init_db()
+            await migrate(background=False)
+            self._migration_task = asyncio.create_task(migrate_in_background(), name="migrations")
+            self._migration_task.add_done_callback(_log_task_failure)
             logger.info("Database connection established and tables checked.")
+            await guild_configs.load_all()
+            await reaction_roles.load_all()
         except Exception as e:
             logger.critical(f"Failed to initialize database: {e}")
             # We might want to exit here if DB is critical, but for now let's log it.
 
         # Load Cogs
-        for filename in os.listdir('./src/cogs'):
-            if filename.endswith('.py'):
-                try:
-                    await self.load_extension(f'src.cogs.{filename[:-3]}')
-                    logger.info(f"Loaded extension: {filename[:-3]}")
-                except Exception as e:
-                    logger.error(f"Failed to load extension {filename}: {e}")
+        await self.load_cogs()
+
+        # Cogs register their scheduled action handlers in cog_load
+        self.scheduler.start()
+
+        # By the cogs that loaded: an extension can opt out (automod without ANTISPAM_ENABLED)
+        loaded = {type(cog).__module__ for cog in self.cogs.values()}
+        for problem in validate_profile(self.intent_profile, loaded):
+            logger.warning(f"Intent profile: {problem}")
+        logger.info(f"Using intent profile '{self.intent_profile.name}'")
+
+        # Sync Slash Commands. Commands are global, so in cluster mode only
+        # cluster 0 syncs; the others would race it on the API and the hash file.
+        if self.cluster_id == 0:
+            await self.sync_tree()
+
+    async def load_cogs(self):
+        """
+        Loads every extension in src/cogs. Extensions are loaded concurrently,
+        in waves, so that anything listed in EXTENSION_DEPENDENCIES loads after
+        the extensions it depends on.
+        """
+        started = time.perf_counter()
+        pending = sorted(
+            f'src.cogs.{filename[:-3]}'
+            for filename in os.listdir('./src/cogs')
+            if filename.endswith('.py')
+        )
+
+        async def load(extension):
+            t = time.perf_counter()
+            try:
+                await self.load_extension(extension)
+                logger.info(f"Loaded extension: {extension.rsplit('.', 1)[-1]} ({(time.perf_counter() - t) * 1000:.0f}ms)")
+            except Exception as e:
+                logger.error(f"Failed to load extension {extension}: {e}")
+
+        while pending:
+            ready = [
+                ext for ext in pending
+                if not any(dep in pending for dep in EXTENSION_DEPENDENCIES.get(ext, ()))
+            ]
+            if not ready:
+                logger.error(f"Circular extension dependencies, not loading: {', '.join(pending)}")
+                break
+            await asyncio.gather(*(load(ext) for ext in ready))
+            pending = [ext for ext in pending if ext not in ready]
+
+        logger.info(f"Loaded {len(self.extensions)} extension(s) in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    async def reload_extensions(self, reload=(), load=(), unload=()):
+        """
+        Applies changed cogs in place after /update (see src/updater.py) and
+        returns {extension: outcome}. Before a cog is unloaded, its
+        `export_state()` (if it has one) is stored in `self.cog_state` under
+        the cog's name, for the new instance to take over in cog_load. A
+        failed reload leaves the previous version loaded.
+        """
+        results = {}
+
+        for extension in unload:
+            try:
+                await self.unload_extension(extension)
+                results[extension] = "unloaded"
+            except commands.ExtensionNotLoaded:
+                results[extension] = "not loaded"
+
+        for extension in [*reload, *load]:
+            handed_off = []
+            for cog in list(self.cogs.values()):
+                if cog.__module__ == extension and hasattr(cog, "export_state"):
+                    self.cog_state[cog.qualified_name] = cog.export_state()
+                    handed_off.append(cog.qualified_name)
+
+            started = time.perf_counter()
+            try:
+                if extension in self.extensions:
+                    await self.reload_extension(extension)
+                    results[extension] = "reloaded"
+                else:
+                    await self.load_extension(extension)
+                    results[extension] = "loaded"
+                logger.info(f"Hot {results[extension]} extension: {extension} ({(time.perf_counter() - started) * 1000:.0f}ms)")
+            except Exception as e:
+                results[extension] = f"failed: {e}"
+                logger.error(f"Failed to hot reload extension {extension}: {e}")
+            finally:
+                # Don't hand stale state to a later reload
+                for name in handed_off:
+                    self.cog_state.pop(name, None)
+
+        return results
+
+    async def ipc_reload_extensions(self, **extensions):
+        """IPC op: /update in another cluster process pulled new cogs. The process handling /update syncs the tree."""
+        results = await self.reload_extensions(**extensions)
+        return {"cluster_id": self.cluster_id, "results": results}
+
+    def command_tree_hash(self):
+        """Canonical hash of the global application commands as they would be synced."""
+        payload = [command.to_dict(self.tree) for command in self.tree.get_commands()]
+        payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+        canonical = json.dumps({"application_id": self.application_id, "commands": payload}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    async def sync_tree(self, force=FORCE_TREE_SYNC):
+        """Syncs the command tree, skipping the API call when nothing changed since the last sync."""
+        tree_hash = self.command_tree_hash()
+        try:
+            with open(COMMAND_TREE_HASH_FILE) as f:
+                last_hash = f.read().strip()
+        except OSError:
+            last_hash = None
+
+        if not force and tree_hash == last_hash:
+            logger.info("Command tree unchanged, skipping sync.")
+            return
 
-        # Sync Slash Commands
         try:
             synced = await self.tree.sync()
             logger.info(f"Synced {len(synced)} command(s).")
         except Exception as e:
-            logger.error(f"Failed to sync commands: {e}")
+            return logger.error(f"Failed to sync commands: {e}")
+
+        try:
+            os.makedirs(os.path.dirname(COMMAND_TREE_HASH_FILE) or ".", exist_ok=True)
+            with open(COMMAND_TREE_HASH_FILE, "w") as f:
+                f.write(tree_hash)
+        except OSError as e:
+            logger.warning(f"Could not store command tree hash: {e}")
+
+    async def close(self):
+        if self._migration_task:
+            # An interrupted CONCURRENTLY build is dropped and redone on the next start
+            self._migration_task.cancel()
+            await asyncio.gather(self._migration_task, return_exceptions=True)
+        # Jobs already running may still need their cogs
+        await self.scheduler.close()
+        # Unload before super().close() does: cog_unload (e.g. Tickets draining
+        # archives) still posts to the mod-log and schedules actions
+        for extension in tuple(self.extensions):
+            try:
+                await self.unload_extension(extension)
+            except Exception as e:
+                logger.error(f"Failed to unload {extension}: {e}")
+        # Post queued mod-log entries while the HTTP session is still open
+        await self.modlog.close()
+        bot_metrics.stop()
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.metrics_server:
+            await self.metrics_server.close()
+        await super().close()
+
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        # Same as discord.py's, plus timing and error counts for every listener (see src/metrics.py).
+        # Each event runs in its own task, so the log context only applies to this listener.
+        set_log_context(**_event_context(coro, args))
+        started = time.perf_counter()
+        failed = False
+        try:
+            await coro(*args, **kwargs)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            failed = True
+            try:
+                await self.on_error(event_name, *args, **kwargs)
+            except asyncio.CancelledError:
+                pass
+        finally:
+            name = getattr(coro, "__qualname__", event_name)
+            bot_metrics.observe_listener(name, time.perf_counter() - started, failed)
+
+    async def on_app_command_completion(self, interaction, command):
+        self.tree.record_completion(interaction)
+
+    def request_chunk(self, guild):
+        """Chunks a guild's members in the background the first time it is needed (lazy profiles only)."""
+        if not self.intent_profile.lazy_chunking or guild.chunked or guild.id in self._chunking:
+            return
+        failed = self._chunk_failures.get(guild.id)
+        if failed and time.monotonic() < failed[1]:
+            return
+        self._chunking.add(guild.id)
+        asyncio.create_task(self._chunk_guild(guild))
+
+    async def _chunk_guild(self, guild):
+        try:
+            await guild.chunk(cache=True)
+            self._chunk_failures.pop(guild.id, None)
+        except Exception as e:
+            failures = self._chunk_failures.get(guild.id, (0, 0))[0] + 1
+            delay = min(CHUNK_RETRY_DELAY * 2 ** (failures - 1), MAX_CHUNK_RETRY_DELAY)
+            self._chunk_failures[guild.id] = (failures, time.monotonic() + delay)
+            logger.warning(f"Failed to chunk guild {guild.id}, retrying in {delay:g}s: {e}")
+        finally:
+            self._chunking.discard(guild.id)
 
     async def on_ready(self):
         logger.info(f"Logged in as {self.user} (ID: {self.user.id})")
         logger.info(f"Bot is running on v{self.version}")
 
-        # Broadcast version to log channels
-        from src.database.db import get_session
-        from src.database.models import GuildConfig
-        from sqlalchemy import select
-
-        async for session in get_session():
-            stmt = select(GuildConfig)
-            result = await session.execute(stmt)
-            configs = result.scalars().all()
-
-            for config in configs:
-                if config.mod_log_channel_id:
-                    guild = self.get_guild(config.guild_id)
-                    if guild:
-                        channel = guild.get_channel(config.mod_log_channel_id)
-                        if channel:
-                            try:
-                                await channel.send(f"🟢 **Bot Online**\nVersion: `{self.version}`")
-                            except Exception:
-                                pass
+        # on_ready fires again after every gateway reconnect; only announce once per process
+        if self._broadcast_task is None:
+            self._broadcast_task = asyncio.create_task(self.broadcast_version(), name="version-broadcast")
+
+    async def broadcast_version(self):
+        """Announces the running version in every configured mod-log channel."""
+        started = time.perf_counter()
+
+        try:
+            async with async_session() as session:
+                stmt = select(GuildConfig.guild_id, GuildConfig.mod_log_channel_id).where(
+                    GuildConfig.mod_log_channel_id.is_not(None)
+                )
+                if self.shard_ids is not None:
+                    # Only guilds on this process' shards: (guild_id >> 22) % shard_count
+                    shard = GuildConfig.guild_id.op(">>")(22) % self.shard_count
+                    stmt = stmt.where(shard.in_(self.shard_ids))
+                result = await session.execute(stmt)
+                targets = result.all()
+        except Exception as e:
+            return logger.error(f"Version broadcast skipped, could not load mod-log channels: {e}")
+
+        # discord.py queues each request on its route's rate-limit bucket; the
+        # semaphore keeps us from flooding the global limit on large bots.
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        content = f"🟢 **Bot Online**\nVersion: `{self.version}`"
+
+        async def send(guild_id, channel_id):
+            guild = self.get_guild(guild_id)
+            channel = guild.get_channel(channel_id) if guild else None
+            if not channel:
+                return False
+            async with semaphore:
+                try:
+                    await channel.send(content)
+                    return True
+                except discord.HTTPException:
+                    return False
+
+        results = await asyncio.gather(*(send(guild_id, channel_id) for guild_id, channel_id in targets))
+        sent = sum(results)
+        logger.info(
+            f"Version broadcast: {sent} sent, {len(results) - sent} failed "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
 
 bot = Bot()
 
+async def run_fake_worker():
+    """Cluster worker that joins IPC without connecting to Discord (src.cluster --fake-gateway)."""
+    await bot.start_ipc()
+    logger.info(f"Cluster {bot.cluster_id} running with fake gateway for shards {SHARD_IDS}")
+    await asyncio.Event().wait()
+
 if __name__ == '__main__':
+    if CLUSTER_FAKE_GATEWAY:
+        asyncio.run(run_fake_worker())
+        sys.exit(0)
+
     if not DISCORD_TOKEN:
         logger.critical("DISCORD_TOKEN is not set in .env")
         sys.exit(1)
 
     try:
-        bot.run(DISCORD_TOKEN)
+        # Our own handlers (src/logger.py) already cover discord.py's loggers
+        bot.run(DISCORD_TOKEN, log_handler=None)
     except Exception as e:
         logger.critical(f"Bot crashed: {e}")
@@ -0,0 +1,215 @@
+import asyncio
+import math
+import time
+from aiohttp import web
+from discord import app_commands
+from src.config import METRICS_LOOP_LAG_INTERVAL
+from src.database.buffers import dropped as buffer_dropped
+from src.database.metrics import Histogram, db_metrics
+from src.database.cache import guild_configs, reaction_roles
+from src.database.leaderboard import leaderboards
+from src.logger import logger, set_log_context
+
+# Runtime metrics for the bot process.
+#
+# Bot._run_event times every listener and InstrumentedCommandTree times every
+# app command, so cogs don't need timers of their own. A background task
+# measures event-loop lag. Everything is exposed through `/stats` and,
+# when METRICS_PORT is set, as Prometheus text on http://METRICS_HOST:PORT/metrics.
+
+class BotMetrics:
+    """Listener and app command latency, event-loop lag and error counts."""
+
+    def __init__(self):
+        self.listeners = {}
+        self.commands = {}
+        self.errors = {}
+        self.loop_lag = Histogram()
+        self.last_loop_lag = 0.0
+        self._lag_task = None
+
+    def _observe(self, table, name, seconds):
+        histogram = table.get(name)
+        if histogram is None:
+            histogram = table[name] = Histogram()
+        histogram.observe(seconds)
+
+    def observe_listener(self, name, seconds, failed=False):
+        self._observe(self.listeners, name, seconds)
+        if failed:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def observe_command(self, name, seconds, failed=False):
+        self._observe(self.commands, name, seconds)
+        if failed:
+            key = f"/{name}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    async def _measure_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + METRICS_LOOP_LAG_INTERVAL
+            await asyncio.sleep(METRICS_LOOP_LAG_INTERVAL)
+            # How late the loop woke us up is how long something else held it
+            self.last_loop_lag = max(loop.time() - expected, 0.0)
+            self.loop_lag.observe(self.last_loop_lag)
+
+    def start(self):
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.create_task(self._measure_loop_lag(), name="loop-lag")
+
+    def stop(self):
+        if self._lag_task:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+    def snapshot(self, bot):
+        """Everything /stats shows, as plain data."""
+        return {
+            "shards": {
+                shard_id: round(latency * 1000, 1) if math.isfinite(latency) else None
+                for shard_id, latency in bot.latencies
+            },
+            "loop_lag": {"last_ms": round(self.last_loop_lag * 1000, 2), **self.loop_lag.summary()},
+            "listeners": {name: h.summary() for name, h in sorted(self.listeners.items())},
+            "commands": {name: h.summary() for name, h in sorted(self.commands.items())},
+            "errors": dict(sorted(self.errors.items())),
+            "pool": db_metrics.pool_status(),
+            "caches": cache_sizes(bot),
+        }
+
+bot_metrics = BotMetrics()
+
+def _cached_members(guild):
+    # Size of discord.py's member cache. The public guild.members builds a list
+    # of every cached member, on each /stats and scrape, for every guild; and
+    # guild.member_count is the gateway's total, not what this process holds.
+    # _members is the dict behind guild.members; this is the only place that reads it.
+    return len(guild._members)
+
+def cache_sizes(bot):
+    return {
+        "guilds": len(bot.guilds),
+        "members": sum(_cached_members(guild) for guild in bot.guilds),
+        "users": len(bot.users),
+        "guild_configs": guild_configs.stats["size"],
+        "reaction_roles": reaction_roles.stats["bindings"],
+        "leaderboard_entries": leaderboards.stats["entries"],
+        "modlog_backlog": bot.modlog.depth,
+        "scheduled_actions": bot.scheduler.stats["queued"],
+    }
+
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Command tree that records the latency and failures of every app command."""
+
+    async def interaction_check(self, interaction):
+        interaction.extras["metrics_started"] = time.perf_counter()
+        # The command runs in this same task, so its log lines carry these fields
+        binding = getattr(interaction.command, "binding", None)
+        set_log_context(
+            guild_id=interaction.guild_id,
+            shard_id=interaction.guild.shard_id if interaction.guild else None,
+            cog=binding.qualified_name if binding is not None else None
+        )
+        return True
+
+    def _record(self, interaction, failed):
+        started = interaction.extras.pop("metrics_started", None)
+        if started is not None and interaction.command is not None:
+            bot_metrics.observe_command(interaction.command.qualified_name, time.perf_counter() - started, failed)
+
+    async def on_error(self, interaction, error):
+        self._record(interaction, failed=True)
+        await super().on_error(interaction, error)
+
+    def record_completion(self, interaction):
+        """Called from on_app_command_completion."""
+        self._record(interaction, failed=False)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _histogram_lines(metric, histogram, labels):
+    label = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    prefix = f"{label}," if label else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    suffix = f"{{{label}}}" if label else ""
+    lines.append(f"{metric}_sum{suffix} {histogram.sum}")
+    lines.append(f"{metric}_count{suffix} {histogram.count}")
+    return lines
+
+def render_prometheus(bot):
+    """Prometheus text exposition (format 0.0.4) of the bot and database metrics."""
+    lines = []
+
+    def histograms(metric, help_text, table, label):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, histogram in sorted(table.items()):
+            lines.extend(_histogram_lines(metric, histogram, {label: name}))
+
+    def gauge(metric, help_text, values, label=None):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for key, value in values:
+            if value is None:
+                continue
+            lines.append(f'{metric}{{{label}="{_escape(key)}"}} {value}' if label else f"{metric} {value}")
+
+    histograms("bot_listener_seconds", "Event listener run time.", bot_metrics.listeners, "listener")
+    histograms("bot_command_seconds", "App command run time.", bot_metrics.commands, "command")
+    histograms("bot_db_statement_seconds", "Database statement latency.", db_metrics.statements, "statement")
+
+    lines.append("# HELP bot_handler_errors_total Listeners and commands that raised.")
+    lines.append("# TYPE bot_handler_errors_total counter")
+    for name, count in sorted(bot_metrics.errors.items()):
+        lines.append(f'bot_handler_errors_total{{handler="{_escape(name)}"}} {count}')
+
+    lines.append("# HELP bot_buffer_dropped_total Buffered writes dropped while the database was unavailable.")
+    lines.append("# TYPE bot_buffer_dropped_total counter")
+    for name, count in sorted(buffer_dropped.items()):
+        lines.append(f'bot_buffer_dropped_total{{buffer="{_escape(name)}"}} {count}')
+
+    lines.append("# HELP bot_event_loop_lag_seconds How late the event loop ran a periodic timer.")
+    lines.append("# TYPE bot_event_loop_lag_seconds histogram")
+    lines.extend(_histogram_lines("bot_event_loop_lag_seconds", bot_metrics.loop_lag, {}))
+    lines.append("# HELP bot_db_checkout_wait_seconds Time spent waiting for a pooled connection.")
+    lines.append("# TYPE bot_db_checkout_wait_seconds histogram")
+    lines.extend(_histogram_lines("bot_db_checkout_wait_seconds", db_metrics.checkout_wait, {}))
+
+    gauge("bot_gateway_latency_seconds", "Heartbeat latency per shard.",
+          [(shard_id, latency if math.isfinite(latency) else None) for shard_id, latency in bot.latencies], "shard")
+    gauge("bot_db_pool", "Database pool connections by state.", db_metrics.pool_status().items(), "state")
+    gauge("bot_cache_size", "Cached objects by kind.", cache_sizes(bot).items(), "cache")
+
+    return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    """Serves /metrics for Prometheus. Meant to listen on localhost only."""
+
+    def __init__(self, bot, host, port):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def _metrics(self, request):
+        return web.Response(text=render_prometheus(self.bot), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Metrics available on http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,179 @@
+import asyncio
+import discord
+from src.config import MODLOG_COALESCE_WINDOW, MODLOG_MAX_RETRIES, MODLOG_MAX_BACKLOG
+from src.database.cache import guild_configs
+from src.logger import logger
+
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBEDS_PER_MESSAGE = 10
+MESSAGE_EMBED_LIMIT = 5900 # 6000 minus room for the title
+IDLE_TIMEOUT = 60
+
+class ModLogDispatcher:
+    """
+    Per-guild queue for mod-log posts.
+
+    Callers only `enqueue()`. One worker per guild waits MODLOG_COALESCE_WINDOW
+    seconds after the first entry, then posts everything queued so far as a
+    single message, so a burst of bans during a raid becomes a few messages
+    instead of hundreds. Workers send one message at a time per channel, which
+    keeps them inside the channel's rate-limit bucket, and retry on 429/5xx.
+    Idle workers exit and are recreated on the next entry.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._queues = {}
+        self._workers = {}
+        self._inflight = {}
+        self._posting = set()
+        self._closing = False
+        self.sent = 0
+        self.dropped = 0
+
+    def enqueue(self, guild, content):
+        if self._closing:
+            # Workers exit once closing; Bot.close() unloads the cogs before this
+            self.dropped += 1
+            logger.warning(f"Mod-log entry for guild {guild.id} after close, dropped")
+            return
+
+        queue = self._queues.get(guild.id)
+        if queue is None:
+            queue = self._queues[guild.id] = asyncio.Queue()
+
+        if queue.qsize() >= MODLOG_MAX_BACKLOG:
+            # Drop the oldest entry rather than grow without bound
+            queue.get_nowait()
+            self.dropped += 1
+
+        queue.put_nowait(content)
+
+        worker = self._workers.get(guild.id)
+        if worker is None or worker.done():
+            self._workers[guild.id] = asyncio.create_task(self._run(guild.id, queue), name="modlog")
+
+    def backlog(self):
+        """Queued entries per guild (only guilds with a backlog)."""
+        return {guild_id: q.qsize() for guild_id, q in self._queues.items() if q.qsize()}
+
+    @property
+    def depth(self):
+        """Total entries waiting to be posted, across all guilds."""
+        return sum(q.qsize() for q in self._queues.values()) + sum(len(e) for e in self._inflight.values())
+
+    async def _run(self, guild_id, queue):
+        while not self._closing:
+            try:
+                first = await asyncio.wait_for(queue.get(), IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    self._workers.pop(guild_id, None)
+                    self._queues.pop(guild_id, None)
+                    return
+                continue
+
+            # Let the rest of the burst arrive, then take all of it
+            entries = self._inflight[guild_id] = [first]
+            await asyncio.sleep(MODLOG_COALESCE_WINDOW)
+            while not queue.empty():
+                entries.append(queue.get_nowait())
+
+            self._posting.add(guild_id)
+            try:
+                await self._post(guild_id, entries)
+            except Exception as e:
+                logger.error(f"Failed to post {len(entries)} mod-log entries in guild {guild_id}: {e}")
+            finally:
+                self._posting.discard(guild_id)
+                self._inflight.pop(guild_id, None)
+
+    async def _channel(self, guild_id):
+        guild = self.bot.get_guild(guild_id)
+        config = await guild_configs.get(guild_id)
+        if not guild or not config or not config.mod_log_channel_id:
+            return None
+        return guild.get_channel(config.mod_log_channel_id)
+
+    async def post_file(self, guild, content, path):
+        """Posts one entry with a file attached, bypassing the coalescing queue."""
+        channel = await self._channel(guild.id)
+        if not channel:
+            return None
+        return await channel.send(content=content, file=discord.File(path))
+
+    async def _post(self, guild_id, entries):
+        channel = await self._channel(guild_id)
+        if not channel:
+            return
+
+        for kwargs in self._render(entries):
+            await self._send(channel, kwargs)
+        self.sent += len(entries)
+
+    def _render(self, entries):
+        """Yields send() kwargs: plain content for one entry, batched embeds for a burst."""
+        if len(entries) == 1 and len(entries[0]) <= 2000:
+            yield {"content": entries[0]}
+            return
+
+        descriptions = []
+        current = ""
+        for entry in entries:
+            entry = entry[:EMBED_DESCRIPTION_LIMIT]
+            if current and len(current) + len(entry) + 2 > EMBED_DESCRIPTION_LIMIT:
+                descriptions.append(current)
+                current = ""
+            current = f"{current}\n\n{entry}" if current else entry
+        descriptions.append(current)
+
+        # Discord caps a message at 10 embeds and 6000 characters across them
+        batch, size = [], 0
+        for d in descriptions:
+            if batch and (len(batch) == EMBEDS_PER_MESSAGE or size + len(d) > MESSAGE_EMBED_LIMIT):
+                yield {"embeds": self._embeds(batch, len(entries))}
+                batch, size = [], 0
+            batch.append(d)
+            size += len(d)
+        yield {"embeds": self._embeds(batch, len(entries))}
+
+    def _embeds(self, descriptions, total):
+        embeds = [discord.Embed(description=d, color=discord.Color.dark_grey()) for d in descriptions]
+        embeds[0].title = f"Mod Log ({total} actions)"
+        return embeds
+
+    async def _send(self, channel, kwargs):
+        for attempt in range(MODLOG_MAX_RETRIES + 1):
+            try:
+                return await channel.send(**kwargs)
+            except (discord.Forbidden, discord.NotFound):
+                raise
+            except discord.HTTPException as e:
+                if (e.status != 429 and e.status < 500) or attempt == MODLOG_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    async def close(self):
+        """Posts whatever is still queued, then stops the workers."""
+        self._closing = True
+        posting = []
+        for guild_id, worker in self._workers.items():
+            if guild_id in self._posting:
+                posting.append(worker)
+            else:
+                worker.cancel()
+        # Let posts already being sent finish (the workers exit after them):
+        # cancelled mid-send, their entries could be posted twice below
+        await asyncio.gather(*posting, return_exceptions=True)
+
+        for guild_id, queue in list(self._queues.items()):
+            entries = self._inflight.pop(guild_id, [])
+            while not queue.empty():
+                entries.append(queue.get_nowait())
+            if entries:
+                try:
+                    await self._post(guild_id, entries)
+                except Exception as e:
+                    logger.error(f"Failed to flush mod-log for guild {guild_id}: {e}")
+        self._workers.clear()
+        self._queues.clear()
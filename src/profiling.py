@@ -0,0 +1,164 @@
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+import traceback
+from src.config import HANDLER_LATENCY_BUDGET_MS
+from src.logger import logger
+
+# Tools for finding out why the bot is slow.
+#
+# LoopWatchdog     logs what the event loop thread was doing when it stays
+#                  blocked longer than a threshold (e.g. a synchronous call).
+# SamplingProfiler samples the event loop thread's stack for a while and
+#                  reports the hottest frames plus a collapsed-stack file for
+#                  flamegraph tools (/profiler start|stop).
+# latency_budget   decorator that warns when a handler runs over budget.
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class LoopWatchdog:
+    """
+    A task on the loop updates a heartbeat every `threshold / 4` seconds and a
+    daemon thread checks it. When the heartbeat is older than `threshold`,
+    the thread logs the loop thread's current stack, once per stall.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.interval = threshold / 4
+        self.stalls = 0
+        self._last_beat = time.monotonic()
+        self._thread_id = None
+        self._task = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    async def _beat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(self.interval):
+            beat = self._last_beat
+            blocked = time.monotonic() - beat
+            if blocked < self.threshold:
+                if reported is not None and reported != beat:
+                    reported = None
+                continue
+            if reported == beat:
+                continue
+
+            reported = beat
+            self.stalls += 1
+            frame = sys._current_frames().get(self._thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(no frame)"
+            logger.warning(f"Event loop blocked for {blocked:.2f}s (threshold {self.threshold}s), loop thread stack:\n{stack}")
+
+    def start(self):
+        """Must be called from the event loop thread."""
+        self._thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._beat(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+class SamplingProfiler:
+    """Samples one thread's stack every `interval` seconds from a background thread."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.started = None
+        self.duration = 0.0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            key = tuple(reversed(labels))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._thread:
+            await asyncio.to_thread(self._thread.join)
+        self.duration = time.monotonic() - self.started
+
+    def top(self, n=15):
+        """[(frame, self samples, total samples)] sorted by self samples."""
+        own = {}
+        total = {}
+        for stack, count in self.stacks.items():
+            own[stack[-1]] = own.get(stack[-1], 0) + count
+            for label in set(stack):
+                total[label] = total.get(label, 0) + count
+        ranked = sorted(own.items(), key=lambda kv: kv[1], reverse=True)[:n]
+        return [(label, count, total[label]) for label, count in ranked]
+
+    def collapsed(self):
+        """Brendan Gregg's collapsed stack format, one `a;b;c count` line per stack."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+def latency_budget(budget_ms=None, report_interval=10.0):
+    """
+    Warns when the decorated coroutine takes longer than `budget_ms`
+    (HANDLER_LATENCY_BUDGET_MS by default). Apply it below
+    @commands.Cog.listener() / @app_commands.command. Warnings are limited to
+    one per handler per `report_interval` seconds, with a count of the
+    calls that went over budget in between.
+    """
+    def decorator(func):
+        budget = (budget_ms if budget_ms is not None else HANDLER_LATENCY_BUDGET_MS) / 1000
+        state = {"over": 0, "reported": 0.0}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                if elapsed > budget:
+                    state["over"] += 1
+                    now = time.monotonic()
+                    if now - state["reported"] >= report_interval:
+                        logger.warning(
+                            f"{func.__qualname__} took {elapsed * 1000:.1f}ms (budget {budget * 1000:.0f}ms), "
+                            f"{state['over']} call(s) over budget since the last report"
+                        )
+                        state["over"] = 0
+                        state["reported"] = now
+        return wrapper
+    return decorator
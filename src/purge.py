@@ -0,0 +1,132 @@
+import asyncio
+import time
+from datetime import timedelta
+import discord
+from src.config import PURGE_MAX_SCAN, PURGE_OLD_DELETE_INTERVAL
+from src.logger import logger
+
+BULK_DELETE_LIMIT = 100
+# Bulk delete rejects messages older than 14 days; keep a margin for clock skew
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+PROGRESS_INTERVAL = 2.0
+# Old messages read ahead of the one-at-a-time lane; past this the scan waits for it
+OLD_LANE_SIZE = 100
+
+class PurgeJob:
+    """
+    Streams a channel's history newest-first and deletes messages matching `check`.
+
+    History is read page by page rather than loaded up front. Recent matches
+    are grouped into bulk deletes of 100, while messages too old for bulk
+    delete go to a separate lane that deletes them one at a time every
+    PURGE_OLD_DELETE_INTERVAL seconds; the scan pauses while OLD_LANE_SIZE of
+    them are waiting. `progress` is awaited with the job
+    every couple of seconds, and `cancel()` stops the job at the next message.
+    """
+
+    def __init__(self, channel, amount, check=None, before=None, after=None, progress=None):
+        self.channel = channel
+        self.amount = amount
+        self.check = check or (lambda message: True)
+        self.before = before
+        self.after = after
+        self.progress = progress
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.old_deleted = 0
+        self.failed = 0
+        self.cancelled = False
+        self.done = False
+        self._old_lane = asyncio.Queue(maxsize=OLD_LANE_SIZE)
+        self._last_progress = 0.0
+
+    def cancel(self):
+        self.cancelled = True
+
+    async def run(self):
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        old_lane = asyncio.create_task(self._delete_old(), name="purge-old-lane")
+        batch = []
+
+        try:
+            async for message in self.channel.history(limit=PURGE_MAX_SCAN, before=self.before, after=self.after, oldest_first=False):
+                if self.cancelled:
+                    break
+
+                self.scanned += 1
+                if self.check(message):
+                    self.matched += 1
+                    if message.created_at < cutoff:
+                        await self._old_lane.put(message)
+                    else:
+                        batch.append(message)
+                        if len(batch) == BULK_DELETE_LIMIT:
+                            await self._bulk_delete(batch)
+                            batch = []
+
+                await self._report()
+                if self.matched >= self.amount:
+                    break
+
+            if batch and not self.cancelled:
+                await self._bulk_delete(batch)
+        finally:
+            # The lane returns by itself once cancelled, and a full queue would never drain
+            if not old_lane.done():
+                await self._old_lane.put(None)
+            await old_lane
+            self.done = True
+            await self._report(force=True)
+
+        return self
+
+    async def _bulk_delete(self, messages):
+        try:
+            await self.channel.delete_messages(messages)
+            self.deleted += len(messages)
+        except discord.HTTPException as e:
+            self.failed += len(messages)
+            logger.warning(f"Bulk delete of {len(messages)} messages in {self.channel.id} failed: {e}")
+
+    async def _delete_old(self):
+        while True:
+            message = await self._old_lane.get()
+            if message is None or self.cancelled:
+                return
+            try:
+                await message.delete()
+                self.old_deleted += 1
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                self.failed += 1
+                logger.warning(f"Failed to delete old message {message.id}: {e}")
+            await self._report()
+            await asyncio.sleep(PURGE_OLD_DELETE_INTERVAL)
+
+    async def _report(self, force=False):
+        if not self.progress:
+            return
+        now = time.monotonic()
+        if force or now - self._last_progress >= PROGRESS_INTERVAL:
+            self._last_progress = now
+            try:
+                await self.progress(self)
+            except discord.HTTPException:
+                # The followup token expires after 15 minutes; keep purging regardless
+                pass
+
+    @property
+    def total_deleted(self):
+        return self.deleted + self.old_deleted
+
+    def summary(self):
+        state = "Cancelled" if self.cancelled else ("Done" if self.done else "Purging")
+        text = f"**{state}.** Scanned {self.scanned}, deleted {self.total_deleted}"
+        pending = self._old_lane.qsize()
+        if pending and not self.done:
+            text += f" ({pending} older than 14 days still queued)"
+        if self.failed:
+            text += f", {self.failed} failed"
+        return text + "."
@@ -0,0 +1,207 @@
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, update
+from src.config import SCHEDULER_HORIZON, SCHEDULER_CONCURRENCY, SCHEDULER_MAX_ATTEMPTS
+from src.database.db import async_session
+from src.database.models import ScheduledAction
+from src.logger import logger
+
+RETRY_BASE = 30 # Seconds before the first retry, doubled on every attempt
+
+class Scheduler:
+    """
+    Persistent delayed actions (channel deletes, unbans, warning expiry).
+
+    Every job is a ScheduledAction row, so jobs survive restarts. Jobs due
+    within SCHEDULER_HORIZON seconds are kept in an in-memory heap ordered by
+    run_at. One task sleeps until the earliest of them, and the heap is
+    refilled from the database every half horizon. Handlers are registered
+    per action with `handler()` and run with bounded concurrency. A job is
+    deleted once its handler returns, or retried with exponential backoff if
+    the handler raises, up to SCHEDULER_MAX_ATTEMPTS times. In cluster mode
+    each process only runs the jobs of guilds on its own shards.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.handlers = {}
+        self._heap = []
+        self._queued = {}
+        self._wake = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(SCHEDULER_CONCURRENCY)
+        self._running = set()
+        self._finished = set()
+        self._task = None
+        self._loaded_until = None
+        self.completed = 0
+        self.failed = 0
+
+    def handler(self, action):
+        """Registers a coroutine that runs jobs of the given action: `async def func(job)`."""
+        def decorator(func):
+            self.handlers[action] = func
+            return func
+        return decorator
+
+    async def schedule(self, action, guild_id, target_id, run_at):
+        """Stores a job to run at `run_at` (naive UTC) and returns its id."""
+        async with async_session() as session:
+            job = ScheduledAction(action=action, guild_id=guild_id, target_id=target_id, run_at=run_at)
+            session.add(job)
+            await session.commit()
+
+        # Later jobs are picked up by the next refill
+        if self._loaded_until is not None and run_at <= self._loaded_until:
+            self._push(job)
+        return job.id
+
+    async def cancel(self, action, guild_id, target_id):
+        """Removes pending jobs for a target, e.g. the unban of a tempban made permanent."""
+        async with async_session() as session:
+            result = await session.execute(
+                delete(ScheduledAction).where(
+                    (ScheduledAction.action == action) &
+                    (ScheduledAction.guild_id == guild_id) &
+                    (ScheduledAction.target_id == target_id)
+                ).returning(ScheduledAction.id)
+            )
+            ids = result.scalars().all()
+            await session.commit()
+
+        for job_id in ids:
+            # Heap entries of cancelled jobs are skipped when popped
+            self._queued.pop(job_id, None)
+        return len(ids)
+
+    def _owns(self, guild_id):
+        if self.bot.shard_ids is None:
+            return True
+        return (guild_id >> 22) % self.bot.shard_count in self.bot.shard_ids
+
+    def _push(self, job):
+        if job.id in self._queued or not self._owns(job.guild_id):
+            return
+        self._queued[job.id] = job
+        heapq.heappush(self._heap, (job.run_at, job.id))
+        if self._heap[0][1] == job.id:
+            self._wake.set()
+
+    async def _refill(self):
+        until = datetime.utcnow() + timedelta(seconds=SCHEDULER_HORIZON)
+        # Jobs that finish while we query must not be queued again
+        self._finished = set()
+        stmt = select(ScheduledAction).where(ScheduledAction.run_at <= until)
+        if self.bot.shard_ids is not None:
+            shard = ScheduledAction.guild_id.op(">>")(22) % self.bot.shard_count
+            stmt = stmt.where(shard.in_(self.bot.shard_ids))
+
+        async with async_session() as session:
+            jobs = (await session.execute(stmt)).scalars().all()
+
+        skip = self._finished | {task.job.id for task in self._running}
+        for job in jobs:
+            if job.id not in skip:
+                self._push(job)
+        self._loaded_until = until
+
+    async def _run(self):
+        # Handlers need the guild cache
+        await self.bot.wait_until_ready()
+        next_refill = 0
+
+        while True:
+            loop = asyncio.get_running_loop()
+            if loop.time() >= next_refill:
+                try:
+                    await self._refill()
+                except Exception as e:
+                    logger.error(f"Failed to load scheduled actions: {e}")
+                next_refill = loop.time() + SCHEDULER_HORIZON / 2
+
+            now = datetime.utcnow()
+            while self._heap and self._heap[0][0] <= now:
+                _, job_id = heapq.heappop(self._heap)
+                job = self._queued.pop(job_id, None)
+                if job is not None:
+                    self._start(job)
+
+            delay = next_refill - loop.time()
+            if self._heap:
+                delay = min(delay, (self._heap[0][0] - now).total_seconds())
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def _start(self, job):
+        task = asyncio.create_task(self._execute(job), name=f"scheduled-{job.action}")
+        task.job = job
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job):
+        handler = self.handlers.get(job.action)
+        if handler is None:
+            # e.g. the cog that owns it failed to load; the next refill tries again
+            logger.warning(f"No handler for scheduled {job.action} {job.id}, leaving it queued in the database.")
+            return
+
+        async with self._semaphore:
+            try:
+                await handler(job)
+            except Exception as e:
+                await self._retry(job, e)
+                return
+
+        try:
+            async with async_session() as session:
+                await session.execute(delete(ScheduledAction).where(ScheduledAction.id == job.id))
+                await session.commit()
+            self._finished.add(job.id)
+            self.completed += 1
+        except Exception as e:
+            # The handler ran, so at worst it runs again after a restart
+            logger.error(f"Failed to clear scheduled action {job.id}: {e}")
+
+    async def _retry(self, job, error):
+        job.attempts += 1
+        if job.attempts >= SCHEDULER_MAX_ATTEMPTS:
+            self.failed += 1
+            logger.error(f"Scheduled {job.action} {job.id} (target {job.target_id}) failed {job.attempts} times, giving up: {error}")
+            stmt = delete(ScheduledAction).where(ScheduledAction.id == job.id)
+            self._finished.add(job.id)
+        else:
+            job.run_at = datetime.utcnow() + timedelta(seconds=RETRY_BASE * 2 ** (job.attempts - 1))
+            logger.warning(f"Scheduled {job.action} {job.id} failed, retrying at {job.run_at:%H:%M:%S}: {error}")
+            stmt = update(ScheduledAction).where(ScheduledAction.id == job.id).values(
+                attempts=job.attempts, run_at=job.run_at, last_error=str(error)[:1000]
+            )
+
+        try:
+            async with async_session() as session:
+                await session.execute(stmt)
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to update scheduled action {job.id}: {e}")
+
+        if job.attempts < SCHEDULER_MAX_ATTEMPTS and job.run_at <= self._loaded_until:
+            self._push(job)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="scheduler")
+
+    async def close(self):
+        """Stops the scheduler. Running jobs get a few seconds; the rest stay in the database."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._running:
+            await asyncio.wait(self._running, timeout=5)
+
+    @property
+    def stats(self):
+        return {"queued": len(self._queued), "running": len(self._running), "completed": self.completed, "failed": self.failed}
@@ -0,0 +1,127 @@
+import asyncio
+import gzip
+import html
+import json
+import os
+from src.config import TRANSCRIPT_DIR
+
+# Messages buffered before a page is handed to the writer thread
+PAGE_SIZE = 100
+
+HTML_HEADER = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: sans-serif; background: #313338; color: #dbdee1; margin: 2em; }}
+.msg {{ margin: 0 0 1em; }}
+.author {{ font-weight: bold; color: #fff; }}
+.time {{ color: #949ba4; font-size: 0.8em; margin-left: 0.5em; }}
+.content {{ white-space: pre-wrap; }}
+.embed {{ border-left: 4px solid #5865f2; padding-left: 0.5em; margin-top: 0.3em; }}
+a {{ color: #00a8fc; }}
+</style></head><body>
+<h1>{title}</h1>
+"""
+HTML_FOOTER = "<p><em>{count} message(s)</em></p>\n</body></html>\n"
+
+class TranscriptExporter:
+    """
+    Streams a channel's history oldest-first into a transcript.
+
+    Writes `ticket-<id>.jsonl.gz` (one JSON object per message) and a
+    `ticket-<id>.html` view next to it under TRANSCRIPT_DIR/<guild_id>.
+    History is fetched page by page and each page is written by a worker
+    thread, so memory stays bounded by PAGE_SIZE messages regardless of how
+    long the ticket is. Attachments are referenced by URL, never downloaded.
+    Files are written under a `.part` name and renamed when complete.
+    """
+
+    def __init__(self, channel, ticket_id, directory=TRANSCRIPT_DIR):
+        self.channel = channel
+        self.ticket_id = ticket_id
+        folder = os.path.join(directory, str(channel.guild.id))
+        self.path = os.path.join(folder, f"ticket-{ticket_id}.jsonl.gz")
+        self.html_path = os.path.join(folder, f"ticket-{ticket_id}.html")
+        self.count = 0
+
+    async def run(self):
+        await asyncio.to_thread(os.makedirs, os.path.dirname(self.path), exist_ok=True)
+        jsonl = await asyncio.to_thread(gzip.open, self.path + ".part", "wt", encoding="utf-8")
+        page = await asyncio.to_thread(open, self.html_path + ".part", "w", encoding="utf-8")
+
+        try:
+            title = html.escape(f"Ticket #{self.ticket_id} - #{self.channel.name}")
+            await asyncio.to_thread(page.write, HTML_HEADER.format(title=title))
+
+            records = []
+            async for message in self.channel.history(limit=None, oldest_first=True):
+                records.append(self._record(message))
+                if len(records) == PAGE_SIZE:
+                    await asyncio.to_thread(self._write_page, jsonl, page, records)
+                    records = []
+            if records:
+                await asyncio.to_thread(self._write_page, jsonl, page, records)
+
+            await asyncio.to_thread(page.write, HTML_FOOTER.format(count=self.count))
+        except BaseException:
+            await asyncio.to_thread(self._discard, jsonl, page)
+            raise
+
+        await asyncio.to_thread(self._finish, jsonl, page)
+        return self
+
+    def _finish(self, jsonl, page):
+        jsonl.close()
+        page.close()
+        os.replace(self.path + ".part", self.path)
+        os.replace(self.html_path + ".part", self.html_path)
+
+    def _discard(self, jsonl, page):
+        jsonl.close()
+        page.close()
+        for path in (self.path + ".part", self.html_path + ".part"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _record(self, message):
+        return {
+            "id": message.id,
+            "author_id": message.author.id,
+            "author": str(message.author),
+            "bot": message.author.bot,
+            "created_at": message.created_at.isoformat(),
+            "edited_at": message.edited_at.isoformat() if message.edited_at else None,
+            "content": message.content,
+            "attachments": [
+                {"filename": a.filename, "url": a.url, "size": a.size, "content_type": a.content_type}
+                for a in message.attachments
+            ],
+            "embeds": [
+                {"title": e.title, "description": e.description}
+                for e in message.embeds
+            ],
+        }
+
+    def _write_page(self, jsonl, page, records):
+        # Runs in a worker thread
+        jsonl.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        page.writelines(self._render(record) for record in records)
+        self.count += len(records)
+
+    def _render(self, record):
+        parts = [
+            f'<div class="msg"><span class="author">{html.escape(record["author"])}</span>'
+            f'<span class="time">{record["created_at"][:19].replace("T", " ")} UTC</span>'
+        ]
+        if record["content"]:
+            parts.append(f'<div class="content">{html.escape(record["content"])}</div>')
+        for embed in record["embeds"]:
+            text = " - ".join(html.escape(v) for v in (embed["title"], embed["description"]) if v)
+            if text:
+                parts.append(f'<div class="embed">{text}</div>')
+        for a in record["attachments"]:
+            url = html.escape(a["url"], quote=True)
+            parts.append(f'<div><a href="{url}">{html.escape(a["filename"])}</a> ({a["size"]} bytes)</div>')
+        parts.append("</div>\n")
+        return "".join(parts)
@@ -0,0 +1,60 @@
+import asyncio
+
+# Deciding how to apply a `git pull` from /update.
+#
+# Changed cogs (src/cogs/*.py) are reloaded in place by Bot.reload_extensions,
+# which keeps the gateway connection, caches and command tree. Any other
+# Python module under src/ (database, main, config, helpers imported by cogs)
+# and requirements.txt need a full restart, since modules that are already
+# imported keep running the old code. Anything else (docs, benchmarks,
+# examples) needs neither.
+
+COG_PREFIX = "src/cogs/"
+RESTART_FILES = ("requirements.txt",)
+
+async def git(*args):
+    """Runs git without blocking the event loop. Returns (returncode, stdout, stderr)."""
+    process = await asyncio.create_subprocess_exec(
+        "git", *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate()
+    return process.returncode, stdout.decode(errors="replace").strip(), stderr.decode(errors="replace").strip()
+
+class UpdatePlan:
+    """What to do about the files changed between two commits."""
+
+    def __init__(self, changes):
+        self.reload = []
+        self.load = []
+        self.unload = []
+        self.restart_reasons = []
+
+        for status, path in changes:
+            name = path[len(COG_PREFIX):] if path.startswith(COG_PREFIX) else None
+            if name and name.endswith(".py") and "/" not in name:
+                extension = f"src.cogs.{name[:-3]}"
+                if status == "A":
+                    self.load.append(extension)
+                elif status == "D":
+                    self.unload.append(extension)
+                else:
+                    self.reload.append(extension)
+            elif (path.startswith("src/") and path.endswith(".py")) or path in RESTART_FILES:
+                self.restart_reasons.append(path)
+
+    @property
+    def restart(self):
+        return bool(self.restart_reasons)
+
+    @property
+    def extensions(self):
+        """Keyword arguments for Bot.reload_extensions."""
+        return {"reload": self.reload, "load": self.load, "unload": self.unload}
+
+    @classmethod
+    async def between(cls, old, new):
+        code, out, err = await git("diff", "--name-status", "--no-renames", old, new)
+        if code != 0:
+            raise RuntimeError(err or f"git diff exited with {code}")
+        changes = [line.split("\t", 1) for line in out.splitlines() if "\t" in line]
+        return cls([(status[0], path) for status, path in changes])
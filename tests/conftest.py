@@ -0,0 +1,32 @@
+import asyncio
+import os
+import tempfile
+import pytest
+
+# src.database.db creates its engine on import, so point it at a scratch
+# SQLite file before anything from src is imported.
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='bot-tests-')}/bot.db"
+
+from src.database.db import Base, engine, init_db
+from src.database.migrate import schema_metadata
+
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            # Pooled aiosqlite connections belong to this loop
+            await engine.dispose()
+    return asyncio.run(main())
+
+@pytest.fixture
+def run():
+    """Empties the database, then returns a function that runs a coroutine to completion."""
+    async def reset():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(schema_metadata.drop_all)
+        await init_db()
+
+    _run(reset())
+    return _run
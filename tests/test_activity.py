@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from src.database.buffers import ActivityBuffer
+from src.database.activity import compact_activity, activity_series
+from src.database.db import async_session
+from src.database.models import ActivityHourly, ActivityDaily
+
+def _hourly(day, hour, count, channel_id=2, user_id=10):
+    return ActivityHourly(guild_id=1, hour=day + timedelta(hours=hour), channel_id=channel_id, user_id=user_id, message_count=count)
+
+async def _rows(*columns):
+    async with async_session() as session:
+        return (await session.execute(select(*columns).order_by(*columns))).all()
+
+def test_old_hours_are_rolled_into_days(run):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    old = today - timedelta(days=10)
+
+    async def scenario():
+        async with async_session() as session:
+            session.add_all([
+                _hourly(old, 1, 3), _hourly(old, 5, 4), _hourly(old, 6, 1, user_id=11),
+                _hourly(old + timedelta(days=1), 2, 7),
+                _hourly(today, 0, 9),
+            ])
+            await session.commit()
+
+        moved = await compact_activity(retention_days=7)
+        daily = await _rows(ActivityDaily.day, ActivityDaily.user_id, ActivityDaily.message_count)
+        hourly = await _rows(ActivityHourly.hour, ActivityHourly.message_count)
+        return moved, daily, hourly
+
+    moved, daily, hourly = run(scenario())
+    assert moved == 4
+    assert daily == [(old, 10, 7), (old, 11, 1), (old + timedelta(days=1), 10, 7)]
+    assert hourly == [(today, 9)]
+
+def test_compaction_adds_to_existing_days_and_is_repeatable(run):
+    old = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=10)
+
+    async def scenario():
+        async with async_session() as session:
+            session.add(_hourly(old, 1, 3))
+            await session.commit()
+        await compact_activity(retention_days=7)
+
+        # Late rows for a day that was already compacted
+        async with async_session() as session:
+            session.add(_hourly(old, 2, 2))
+            await session.commit()
+        await compact_activity(retention_days=7)
+        again = await compact_activity(retention_days=7)
+        return again, await _rows(ActivityDaily.day, ActivityDaily.message_count)
+
+    again, daily = run(scenario())
+    assert again == 0
+    assert daily == [(old, 5)]
+
+def test_series_spans_hourly_and_daily_rows(run):
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    old = today - timedelta(days=10)
+
+    async def scenario():
+        async with async_session() as session:
+            session.add_all([_hourly(old, 1, 3), _hourly(today, 0, 4), _hourly(today, 1, 1)])
+            await session.commit()
+        await compact_activity(retention_days=7)
+        return await activity_series(1, old - timedelta(days=1))
+
+    series = run(scenario())
+    assert {when.date(): count for when, count in series.items()} == {old.date(): 3, today.date(): 5}
+
+def test_activity_is_counted_per_hour(run):
+    async def scenario():
+        activity = ActivityBuffer()
+        for minute in (1, 30, 59):
+            activity.add(1, 2, 10, datetime(2024, 1, 1, 12, minute))
+        activity.add(1, 2, 10, datetime(2024, 1, 1, 13, 0))
+        await activity.flush()
+        activity.add(1, 2, 10, datetime(2024, 1, 1, 12, 45))
+        await activity.flush()
+        return await _rows(ActivityHourly.hour, ActivityHourly.message_count)
+
+    assert run(scenario()) == [(datetime(2024, 1, 1, 12), 4), (datetime(2024, 1, 1, 13), 1)]
@@ -0,0 +1,66 @@
+from src.antispam import RingWindow, SpamGuard
+
+def test_ring_window_fires_when_the_last_n_events_fit():
+    window = RingWindow(3)
+    assert [window.hit(t, 1.0) for t in (0.0, 0.4, 0.8)] == [False, False, True]
+    # The oldest of the last three is now 0.4
+    assert not window.hit(1.5, 1.0)
+    window.clear()
+    assert not window.hit(1.6, 1.0)
+
+def test_steady_chatter_is_not_spam():
+    guard = SpamGuard(message_limit=7, message_window=4.0)
+    assert not any(guard.message(1, 10, f"message {i}", i * 1.0) for i in range(100))
+
+def test_message_flood_is_flagged_once_per_cooldown():
+    guard = SpamGuard(message_limit=5, message_window=2.0, cooldown=30.0)
+    reasons = [guard.message(1, 10, f"message {i}", i * 0.1) for i in range(20)]
+    assert reasons[:4] == [None] * 4
+    assert "5 messages" in reasons[4]
+    assert reasons[5:] == [None] * 15
+    assert guard.stats["flagged"] == 1
+
+    # After the cooldown the member starts from a clean slate
+    assert guard.message(1, 10, "hello", 40.0) is None
+
+def test_repeated_message_is_flagged():
+    guard = SpamGuard(message_limit=0, duplicate_limit=3, duplicate_window=10.0)
+    reasons = [guard.message(1, 10, "  Buy Now ", t) for t in (0.0, 3.0, 6.0)]
+    assert reasons[:2] == [None, None]
+    assert "repeated" in reasons[2]
+
+def test_repeats_spread_out_are_fine():
+    guard = SpamGuard(message_limit=0, duplicate_limit=3, duplicate_window=10.0)
+    assert not any(guard.message(1, 10, "gm", t) for t in (0.0, 6.0, 12.0, 18.0))
+
+def test_same_text_from_many_members_is_flagged():
+    guard = SpamGuard(message_limit=0, duplicate_limit=0, guild_duplicate_limit=4, duplicate_min_length=10)
+    text = "join my server discord.gg/example"
+    reasons = [guard.message(1, user_id, text, user_id * 0.5) for user_id in range(4)]
+    assert reasons[:3] == [None] * 3
+    assert "seen 4 times" in reasons[3]
+    # Short messages ("lol") never count
+    assert not any(guard.message(2, user_id, "lol", 0.0) for user_id in range(10))
+
+def test_raid_returns_the_joins_that_triggered_it():
+    guard = SpamGuard(join_limit=3, join_window=10.0, raid_duration=60.0)
+    results = [guard.join(1, f"member {i}", i * 1.0) for i in range(3)]
+    assert results[:2] == [([], False), ([], False)]
+    assert results[2] == (["member 0", "member 1", "member 2"], True)
+    assert guard.in_raid(1, 30.0)
+
+    # Everyone joining during the raid is returned; another guild is unaffected
+    assert guard.join(1, "member 3", 40.0) == (["member 3"], False)
+    assert guard.join(2, "other", 40.0) == ([], False)
+    assert not guard.in_raid(1, 200.0)
+    assert guard.stats["raids"] == 1
+
+def test_sweep_and_forget_drop_idle_state():
+    guard = SpamGuard(message_window=4.0, duplicate_window=15.0, join_window=10.0, cooldown=30.0)
+    guard.message(1, 10, "hello there everyone", 0.0)
+    guard.message(2, 20, "hello there everyone", 100.0)
+    assert guard.sweep(101.0) == 2
+    assert guard.stats["users"] == 1
+
+    guard.forget(2)
+    assert guard.stats == {"users": 0, "guilds": 0, "flagged": 0, "raids": 0}
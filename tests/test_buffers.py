@@ -0,0 +1,82 @@
+import asyncio
+from sqlalchemy import select
+from src.database import buffers
+from src.database.buffers import MessageCountBuffer
+from src.database.db import async_session
+from src.database.models import UserProfile
+
+class FailingBuffer(MessageCountBuffer):
+    """Message counts whose writes fail until `failures` runs out."""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures_left = failures
+        self.writes = 0
+
+    async def _write(self, batch):
+        self.writes += 1
+        if self.failures_left:
+            self.failures_left -= 1
+            raise RuntimeError("database is down")
+        await super()._write(batch)
+
+async def _rows(stmt):
+    async with async_session() as session:
+        return (await session.execute(stmt)).all()
+
+def test_message_counts_are_upserted(run):
+    async def scenario():
+        counts = MessageCountBuffer(max_pending=1000)
+        for _ in range(3):
+            counts.add(1, 10)
+        counts.add(1, 11)
+        assert await counts.flush() == 4
+
+        counts.add(1, 10, delta=2)
+        await counts.close()
+        return await _rows(select(UserProfile.user_id, UserProfile.message_count).order_by(UserProfile.user_id))
+
+    assert run(scenario()) == [(10, 5), (11, 1)]
+
+def test_failed_flush_is_restored_and_retried(run):
+    async def scenario():
+        counts = FailingBuffer(failures=1, max_pending=1000)
+        counts.add(1, 10)
+        assert await counts.flush() == 0
+        assert counts.pending == 1
+        counts.add(1, 10)
+        assert await counts.flush() == 2
+        return await _rows(select(UserProfile.message_count))
+
+    assert run(scenario()) == [(2,)]
+
+def test_failed_flush_backs_off(run):
+    async def scenario():
+        counts = FailingBuffer(failures=100, flush_interval=60, max_pending=5)
+        for user_id in range(5):
+            counts.add(1, user_id)
+        await asyncio.sleep(0)
+        # The threshold flush failed; more writes must not start another one right away
+        for user_id in range(5, 50):
+            counts.add(1, user_id)
+            await asyncio.sleep(0)
+        return counts.writes, counts.backing_off
+
+    assert run(scenario()) == (1, True)
+
+def test_restore_is_capped_and_drops_the_oldest(run):
+    async def scenario():
+        counts = FailingBuffer(failures=1, max_pending=1000, max_buffered=10)
+        for user_id in range(8):
+            counts.add(1, user_id)
+        batch, _ = counts._take()
+        for user_id in range(100, 108):
+            counts.add(1, user_id)
+        counts._failed(batch)
+        return counts.pending, sorted(user_id for _, user_id in counts._pending)
+
+    before = buffers.dropped.get("message-count", 0)
+    pending, users = run(scenario())
+    assert pending == 10
+    assert users == [6, 7] + list(range(100, 108))
+    assert buffers.dropped["message-count"] - before == 6
@@ -0,0 +1,21 @@
+from src.cluster import split_shards
+
+def test_even_split():
+    assert split_shards(8, 4) == [[0, 1], [2, 3], [4, 5], [6, 7]]
+
+def test_uneven_split_gives_the_first_clusters_one_more():
+    assert split_shards(10, 4) == [[0, 1, 2], [3, 4, 5], [6, 7], [8, 9]]
+
+def test_more_clusters_than_shards():
+    assert split_shards(3, 8) == [[0], [1], [2]]
+
+def test_at_least_one_cluster():
+    assert split_shards(5, 0) == [[0, 1, 2, 3, 4]]
+
+def test_every_shard_exactly_once():
+    for shard_count in range(1, 40):
+        for clusters in range(1, 12):
+            ranges = split_shards(shard_count, clusters)
+            assert [shard for r in ranges for shard in r] == list(range(shard_count))
+            sizes = [len(r) for r in ranges]
+            assert max(sizes) - min(sizes) <= 1
@@ -0,0 +1,39 @@
+from datetime import datetime
+from sqlalchemy import select
+from src.database.buffers import HistoryBuffer
+from src.database.db import async_session
+from src.database.models import UserProfile, UserHistory
+
+async def _rows(stmt):
+    async with async_session() as session:
+        return (await session.execute(stmt)).all()
+
+def test_history_folds_changes_within_a_window():
+    history = HistoryBuffer()
+    history.add(1, 10, "nickname", "a", "b")
+    history.add(1, 10, "nickname", "b", "c")
+    history.add(1, 11, "nickname", "x", "y")
+    history.add(1, 11, "nickname", "y", "x")
+    history.add(1, 12, "username", "same", "same")
+    assert {key: event[:2] for key, event in history._pending.items()} == {(1, 10, "nickname"): ["a", "c"]}
+
+def test_history_restore_merges_with_newer_events():
+    history = HistoryBuffer()
+    history.add(1, 10, "nickname", "a", "b")
+    history.add(1, 11, "nickname", "x", "y")
+    batch, _ = history._take()
+    history.add(1, 10, "nickname", "b", "c")
+    history.add(1, 11, "nickname", "y", "x")
+    history._restore(batch)
+    assert {key: event[:2] for key, event in history._pending.items()} == {(1, 10, "nickname"): ["a", "c"]}
+
+def test_history_rows_are_written_with_their_profiles(run):
+    async def scenario():
+        history = HistoryBuffer()
+        history.add(1, 10, "nickname", "a", "b", timestamp=datetime(2024, 1, 1))
+        await history.close()
+        rows = await _rows(select(UserHistory.user_id, UserHistory.old_value, UserHistory.new_value))
+        profiles = await _rows(select(UserProfile.guild_id, UserProfile.user_id))
+        return rows, profiles
+
+    assert run(scenario()) == ([(10, "a", "b")], [(1, 10)])
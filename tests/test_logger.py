@@ -0,0 +1,73 @@
+import json
+import logging
+import sys
+from src import logger as logger_module
+from src.logger import RateLimitFilter, ContextFilter, JSONFormatter, _QueueHandler, log_context
+
+def _record(msg="hello %s", args=("world",), lineno=10, **extra):
+    record = logging.LogRecord("test", logging.WARNING, "/src/cogs/tracking.py", lineno, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_rate_limit_per_call_site(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(logger_module.time, "monotonic", clock)
+    limiter = RateLimitFilter(window=10, burst=3)
+
+    assert [limiter.filter(_record()) for _ in range(5)] == [True, True, True, False, False]
+    # Another line has its own budget
+    assert limiter.filter(_record(lineno=11))
+
+    clock.now += 10
+    record = _record()
+    assert limiter.filter(record)
+    assert record.getMessage() == "hello world (2 similar message(s) suppressed)"
+
+def test_rate_key_groups_call_sites(monkeypatch):
+    monkeypatch.setattr(logger_module.time, "monotonic", Clock())
+    limiter = RateLimitFilter(window=10, burst=1)
+
+    assert limiter.filter(_record(lineno=1, rate_key="guild-42"))
+    assert not limiter.filter(_record(lineno=2, rate_key="guild-42"))
+    assert limiter.filter(_record(lineno=3, rate_key="guild-43"))
+
+def test_zero_burst_disables_the_limit():
+    limiter = RateLimitFilter(window=10, burst=0)
+    assert all(limiter.filter(_record()) for _ in range(100))
+
+def test_context_fields_follow_the_block():
+    context = ContextFilter()
+    with log_context(guild_id=1, shard_id=0):
+        with log_context(cog="Tracking"):
+            inner = _record()
+            context.filter(inner)
+        outer = _record()
+        context.filter(outer)
+    after = _record()
+    context.filter(after)
+
+    assert (inner.guild_id, inner.shard_id, inner.cog) == (1, 0, "Tracking")
+    assert (outer.guild_id, outer.cog) == (1, None)
+    assert after.guild_id is None
+
+def test_json_lines_keep_the_traceback_separate():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = _record(exc_info=sys.exc_info(), guild_id=5)
+    # What the listener thread receives
+    prepared = _QueueHandler(None).prepare(record)
+    entry = json.loads(JSONFormatter().format(prepared))
+
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "WARNING"
+    assert entry["guild_id"] == 5
+    assert "ValueError: boom" in entry["exc"]
+    assert "boom" not in entry["message"]
@@ -0,0 +1,75 @@
+from sqlalchemy import inspect, select, text
+from src.database.db import engine, async_session
+from src.database import migrate as migrate_module
+from src.database.migrate import migrate, discover, schema_migrations
+from src.database.models import ReactionRole
+
+async def _indexes(table):
+    async with engine.connect() as conn:
+        return await conn.run_sync(lambda sync_conn: {i["name"] for i in inspect(sync_conn).get_indexes(table)})
+
+async def _columns(table):
+    async with engine.connect() as conn:
+        return await conn.run_sync(lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns(table)})
+
+def test_every_migration_applies_once(run):
+    async def scenario():
+        first = await migrate()
+        second = await migrate()
+        async with engine.connect() as conn:
+            recorded = {row[0] for row in await conn.execute(select(schema_migrations.c.version))}
+        return first, second, recorded
+
+    versions = [m.version for m in discover()]
+    first, second, recorded = run(scenario())
+    assert first == versions
+    assert second == []
+    assert recorded == set(versions)
+
+def test_nothing_pending_takes_no_lock(run, monkeypatch):
+    run(migrate())
+
+    async def locked(*args):
+        raise AssertionError("took the migration lock with nothing pending")
+
+    monkeypatch.setattr(migrate_module, "_lock", locked)
+    assert run(migrate(background=False)) == []
+    assert run(migrate(background=True, wait=False)) == []
+
+def test_foreground_and_background_split(run):
+    migrations = discover()
+    foreground = [m.version for m in migrations if not m.background]
+    background = [m.version for m in migrations if m.background]
+
+    assert run(migrate(background=False)) == foreground
+    assert run(migrate(background=True)) == background
+    assert run(migrate()) == []
+
+def test_migrations_upgrade_an_old_database(run):
+    async def scenario():
+        # Roll the schema back to before 0001, 0002 and 0005
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP INDEX ix_warnings_guild_user_timestamp"))
+            await conn.execute(text("DROP INDEX ux_reaction_roles_message_emoji"))
+            await conn.execute(text("ALTER TABLE warnings DROP COLUMN expires_at"))
+
+        async with async_session() as session:
+            session.add_all([
+                ReactionRole(guild_id=1, message_id=5, emoji="👍", role_id=100),
+                ReactionRole(guild_id=1, message_id=5, emoji="👍", role_id=200),
+                ReactionRole(guild_id=1, message_id=5, emoji="👎", role_id=300),
+            ])
+            await session.commit()
+
+        await migrate()
+
+        async with async_session() as session:
+            roles = (await session.execute(select(ReactionRole.emoji, ReactionRole.role_id).order_by(ReactionRole.role_id))).all()
+        return roles, await _indexes("warnings"), await _indexes("reaction_roles"), await _columns("warnings")
+
+    roles, warning_indexes, role_indexes, warning_columns = run(scenario())
+    # Duplicate bindings are resolved in favour of the newest one
+    assert roles == [("👍", 200), ("👎", 300)]
+    assert "ix_warnings_guild_user_timestamp" in warning_indexes
+    assert "ux_reaction_roles_message_emoji" in role_indexes
+    assert "expires_at" in warning_columns
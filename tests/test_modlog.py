@@ -0,0 +1,131 @@
+import asyncio
+import discord
+from src import modlog
+from src.modlog import ModLogDispatcher, EMBEDS_PER_MESSAGE, MESSAGE_EMBED_LIMIT, EMBED_DESCRIPTION_LIMIT
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+
+class FakeChannel:
+    """Records what was sent; each send takes `delay` seconds."""
+
+    def __init__(self, delay=0.0, failures=()):
+        self.delay = delay
+        self.failures = list(failures)
+        self.sent = []
+
+    async def send(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append(kwargs)
+
+def _dispatcher(channel, monkeypatch, window=0.01):
+    monkeypatch.setattr(modlog, "MODLOG_COALESCE_WINDOW", window)
+    dispatcher = ModLogDispatcher(bot=None)
+
+    async def fake_channel(guild_id):
+        return channel
+
+    dispatcher._channel = fake_channel
+    return dispatcher
+
+def _entries(sent):
+    """The entries in sent messages, in order."""
+    entries = []
+    for kwargs in sent:
+        if "content" in kwargs:
+            entries.append(kwargs["content"])
+        else:
+            for embed in kwargs["embeds"]:
+                entries.extend(embed.description.split("\n\n"))
+    return entries
+
+def test_single_entry_is_plain_content():
+    dispatcher = ModLogDispatcher(bot=None)
+    assert list(dispatcher._render(["**KICK**: someone"])) == [{"content": "**KICK**: someone"}]
+
+def test_burst_fits_discord_limits():
+    dispatcher = ModLogDispatcher(bot=None)
+    entries = [f"**BAN**: member {i} " + "x" * 300 for i in range(400)]
+    messages = list(dispatcher._render(entries))
+
+    assert len(messages) > 1
+    for kwargs in messages:
+        embeds = kwargs["embeds"]
+        assert len(embeds) <= EMBEDS_PER_MESSAGE
+        assert sum(len(e.description) for e in embeds) <= MESSAGE_EMBED_LIMIT
+        assert all(len(e.description) <= EMBED_DESCRIPTION_LIMIT for e in embeds)
+        assert embeds[0].title == "Mod Log (400 actions)"
+    assert _entries(messages) == entries
+
+def test_burst_is_coalesced_into_one_message(monkeypatch):
+    channel = FakeChannel()
+    dispatcher = _dispatcher(channel, monkeypatch)
+
+    async def scenario():
+        for i in range(20):
+            dispatcher.enqueue(FakeGuild(1), f"entry {i}")
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert len(channel.sent) == 1
+    assert _entries(channel.sent) == [f"entry {i}" for i in range(20)]
+    assert dispatcher.sent == 20
+
+def test_backlog_drops_the_oldest(monkeypatch):
+    monkeypatch.setattr(modlog, "MODLOG_MAX_BACKLOG", 5)
+    channel = FakeChannel()
+    dispatcher = _dispatcher(channel, monkeypatch, window=0.05)
+
+    async def scenario():
+        # The worker takes the first entry right away; the rest queue behind it
+        dispatcher.enqueue(FakeGuild(1), "first")
+        while not dispatcher._inflight:
+            await asyncio.sleep(0)
+        for i in range(10):
+            dispatcher.enqueue(FakeGuild(1), f"entry {i}")
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert dispatcher.dropped == 5
+    assert _entries(channel.sent) == ["first"] + [f"entry {i}" for i in range(5, 10)]
+
+def test_rate_limits_are_retried(monkeypatch):
+    sleep = asyncio.sleep
+    monkeypatch.setattr(asyncio, "sleep", _fast_sleep(sleep))
+    response = type("Response", (), {"status": 429, "reason": "Too Many Requests"})()
+    channel = FakeChannel(failures=[discord.HTTPException(response, "slow down")])
+    dispatcher = _dispatcher(channel, monkeypatch)
+
+    async def scenario():
+        dispatcher.enqueue(FakeGuild(1), "entry")
+        await sleep(0.1)
+
+    asyncio.run(scenario())
+    assert channel.sent == [{"content": "entry"}]
+
+def test_close_flushes_without_posting_twice(monkeypatch):
+    channel = FakeChannel(delay=0.05)
+    dispatcher = _dispatcher(channel, monkeypatch)
+
+    async def scenario():
+        dispatcher.enqueue(FakeGuild(1), "posting")
+        dispatcher.enqueue(FakeGuild(2), "also posting")
+        await asyncio.sleep(0.03)
+        # Guild 1 is mid-send; this one waits in the queue
+        dispatcher.enqueue(FakeGuild(1), "queued")
+        dispatcher.enqueue(FakeGuild(3), "coalescing")
+        await dispatcher.close()
+        dispatcher.enqueue(FakeGuild(1), "after close")
+
+    asyncio.run(scenario())
+    assert sorted(_entries(channel.sent)) == ["also posting", "coalescing", "posting", "queued"]
+    assert dispatcher.dropped == 1
+
+def _fast_sleep(sleep):
+    async def fast(seconds, *args, **kwargs):
+        # Skip retry backoff, keep the short waits the tests rely on
+        return await sleep(min(seconds, 0.01), *args, **kwargs)
+    return fast
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import timedelta
+import discord
+from src import purge
+from src.purge import PurgeJob, BULK_DELETE_LIMIT, OLD_LANE_SIZE
+
+class FakeMessage:
+    def __init__(self, message_id, created_at, author_id=1, channel=None):
+        self.id = message_id
+        self.created_at = created_at
+        self.author_id = author_id
+        self.channel = channel
+
+    async def delete(self):
+        self.channel.deleted_one.append(self.id)
+
+class FakeChannel:
+    """History of `recent` messages newer than 14 days followed by `old` older ones, newest first."""
+
+    id = 1
+
+    def __init__(self, recent, old):
+        now = discord.utils.utcnow()
+        self.messages = [FakeMessage(i, now - timedelta(minutes=i), author_id=i % 2, channel=self) for i in range(recent)]
+        self.messages += [FakeMessage(recent + i, now - timedelta(days=20, minutes=i), author_id=i % 2, channel=self) for i in range(old)]
+        self.bulk_deleted = []
+        self.deleted_one = []
+        self.largest_lane = 0
+        self.job = None
+
+    async def history(self, limit=None, before=None, after=None, oldest_first=False):
+        for message in self.messages[:limit]:
+            if self.job:
+                self.largest_lane = max(self.largest_lane, self.job._old_lane.qsize())
+            yield message
+
+    async def delete_messages(self, messages):
+        assert len(messages) <= BULK_DELETE_LIMIT
+        self.bulk_deleted.extend(m.id for m in messages)
+
+def test_recent_and_old_messages_take_their_lanes(monkeypatch):
+    monkeypatch.setattr(purge, "PURGE_OLD_DELETE_INTERVAL", 0)
+    channel = FakeChannel(recent=250, old=30)
+    job = asyncio.run(PurgeJob(channel, amount=1000).run())
+
+    assert sorted(channel.bulk_deleted) == list(range(250))
+    assert sorted(channel.deleted_one) == list(range(250, 280))
+    assert (job.deleted, job.old_deleted, job.failed) == (250, 30, 0)
+    assert job.done
+
+def test_filter_and_amount(monkeypatch):
+    monkeypatch.setattr(purge, "PURGE_OLD_DELETE_INTERVAL", 0)
+    channel = FakeChannel(recent=100, old=0)
+    job = asyncio.run(PurgeJob(channel, amount=10, check=lambda m: m.author_id == 1).run())
+
+    assert channel.bulk_deleted == [1, 3, 5, 7, 9, 11, 13, 15, 17, 19]
+    assert job.scanned == 20
+
+def test_old_lane_back_pressures_the_scan(monkeypatch):
+    monkeypatch.setattr(purge, "PURGE_OLD_DELETE_INTERVAL", 0)
+    channel = FakeChannel(recent=0, old=OLD_LANE_SIZE * 3)
+    job = PurgeJob(channel, amount=10_000)
+    channel.job = job
+    asyncio.run(job.run())
+
+    assert job.old_deleted == OLD_LANE_SIZE * 3
+    assert channel.largest_lane <= OLD_LANE_SIZE
+
+def test_cancel_stops_both_lanes(monkeypatch):
+    monkeypatch.setattr(purge, "PURGE_OLD_DELETE_INTERVAL", 0.01)
+    channel = FakeChannel(recent=0, old=OLD_LANE_SIZE * 3)
+
+    async def scenario():
+        job = PurgeJob(channel, amount=10_000)
+        task = asyncio.create_task(job.run())
+        await asyncio.sleep(0.05)
+        job.cancel()
+        # Even with a full lane the job has to finish promptly
+        return await asyncio.wait_for(task, 1)
+
+    job = asyncio.run(scenario())
+    assert job.cancelled and job.done
+    assert 0 < job.old_deleted < OLD_LANE_SIZE
+    assert job.scanned < OLD_LANE_SIZE * 3
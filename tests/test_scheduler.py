@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from src import scheduler as scheduler_module
+from src.database.db import async_session
+from src.database.models import ScheduledAction
+from src.scheduler import Scheduler
+
+class FakeBot:
+    def __init__(self, shard_ids=None, shard_count=1):
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+
+    async def wait_until_ready(self):
+        pass
+
+def _guild_on_shard(shard_id, shard_count, n=0):
+    """A guild ID that Discord routes to `shard_id`."""
+    return (((n * shard_count) + shard_id) << 22) | 12345
+
+async def _jobs():
+    async with async_session() as session:
+        return (await session.execute(select(ScheduledAction).order_by(ScheduledAction.id))).scalars().all()
+
+async def _until(condition, timeout=2):
+    async def wait():
+        while not condition():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(wait(), timeout)
+
+def test_refill_loads_only_jobs_within_the_horizon(run, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "SCHEDULER_HORIZON", 3600)
+
+    async def scenario():
+        scheduler = Scheduler(FakeBot())
+        now = datetime.utcnow()
+        soon = await scheduler.schedule("unban", 1, 10, now + timedelta(minutes=5))
+        await scheduler.schedule("unban", 1, 11, now + timedelta(days=2))
+        await scheduler._refill()
+        queued_at_refill = set(scheduler._queued)
+
+        # Once loaded, jobs scheduled inside the horizon go straight to the heap
+        inside = await scheduler.schedule("unban", 1, 12, now + timedelta(minutes=30))
+        await scheduler.schedule("unban", 1, 13, now + timedelta(days=3))
+        return queued_at_refill, set(scheduler._queued), {soon, inside}
+
+    queued_at_refill, queued, expected = run(scenario())
+    assert len(queued_at_refill) == 1
+    assert queued == expected
+
+def test_only_own_shards_are_loaded(run):
+    async def scenario():
+        scheduler = Scheduler(FakeBot(shard_ids=[1, 3], shard_count=4))
+        now = datetime.utcnow()
+        for shard_id in range(4):
+            await scheduler.schedule("unban", _guild_on_shard(shard_id, 4), shard_id, now)
+        await scheduler._refill()
+        return sorted(job.target_id for job in scheduler._queued.values())
+
+    assert run(scenario()) == [1, 3]
+
+def test_due_jobs_run_and_are_deleted(run):
+    async def scenario():
+        scheduler = Scheduler(FakeBot())
+        ran = []
+
+        @scheduler.handler("delete_channel")
+        async def handle(job):
+            ran.append(job.target_id)
+
+        now = datetime.utcnow()
+        await scheduler.schedule("delete_channel", 1, 10, now - timedelta(seconds=1))
+        scheduler.start()
+        await _until(lambda: ran)
+        # Scheduled after start and due shortly: the loop wakes up for it
+        await scheduler.schedule("delete_channel", 1, 11, datetime.utcnow() + timedelta(milliseconds=50))
+        await _until(lambda: scheduler.completed == 2)
+        await scheduler.close()
+        return ran, await _jobs()
+
+    ran, remaining = run(scenario())
+    assert ran == [10, 11]
+    assert remaining == []
+
+def test_failing_job_backs_off_then_gives_up(run, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "RETRY_BASE", 0.05)
+    monkeypatch.setattr(scheduler_module, "SCHEDULER_MAX_ATTEMPTS", 3)
+
+    async def scenario():
+        scheduler = Scheduler(FakeBot())
+        attempts = []
+
+        @scheduler.handler("unban")
+        async def handle(job):
+            attempts.append(datetime.utcnow())
+            if len(attempts) == 1:
+                # Whichever job runs first succeeds; the other keeps failing
+                return
+            raise RuntimeError("missing permissions")
+
+        await scheduler.schedule("unban", 1, 10, datetime.utcnow())
+        await scheduler.schedule("unban", 1, 11, datetime.utcnow())
+        scheduler.start()
+        await _until(lambda: scheduler.failed == 1 and scheduler.completed == 1)
+        await scheduler.close()
+        return attempts, scheduler, await _jobs()
+
+    attempts, scheduler, remaining = run(scenario())
+    # One success, then three failing attempts with a growing delay between them
+    assert len(attempts) == 4
+    assert attempts[3] - attempts[2] > attempts[2] - attempts[1]
+    assert remaining == []
+    assert scheduler.stats["queued"] == 0
+
+def test_retry_is_recorded_in_the_database(run, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "SCHEDULER_MAX_ATTEMPTS", 5)
+
+    async def scenario():
+        scheduler = Scheduler(FakeBot())
+
+        @scheduler.handler("unban")
+        async def handle(job):
+            raise RuntimeError("missing permissions")
+
+        await scheduler.schedule("unban", 1, 10, datetime.utcnow())
+        await scheduler._refill()
+        job = next(iter(scheduler._queued.values()))
+        await scheduler._execute(job)
+        return await _jobs()
+
+    [job] = run(scenario())
+    assert job.attempts == 1
+    assert job.last_error == "missing permissions"
+    assert job.run_at > datetime.utcnow() + timedelta(seconds=scheduler_module.RETRY_BASE - 5)
+
+def test_cancel_removes_queued_jobs(run):
+    async def scenario():
+        scheduler = Scheduler(FakeBot())
+        await scheduler.schedule("unban", 1, 10, datetime.utcnow() + timedelta(minutes=5))
+        await scheduler._refill()
+        cancelled = await scheduler.cancel("unban", 1, 10)
+        return cancelled, scheduler.stats["queued"], await _jobs()
+
+    assert run(scenario()) == (1, 0, [])
@@ -0,0 +1,58 @@
+import asyncio
+import subprocess
+from src.updater import UpdatePlan
+
+def test_cogs_are_reloaded_loaded_and_unloaded():
+    plan = UpdatePlan([
+        ("M", "src/cogs/tracking.py"),
+        ("A", "src/cogs/automod.py"),
+        ("D", "src/cogs/legacy.py"),
+        ("M", "README.md"),
+        ("M", "benchmarks/handlers.py"),
+    ])
+    assert plan.extensions == {
+        "reload": ["src.cogs.tracking"],
+        "load": ["src.cogs.automod"],
+        "unload": ["src.cogs.legacy"],
+    }
+    assert not plan.restart
+
+def test_core_modules_and_requirements_need_a_restart():
+    plan = UpdatePlan([
+        ("M", "src/cogs/tracking.py"),
+        ("M", "src/database/buffers.py"),
+        ("M", "requirements.txt"),
+        ("A", "src/cogs/helpers/views.py"),
+    ])
+    assert plan.restart
+    # Helpers below src/cogs/ aren't extensions; cogs that import them keep the old code
+    assert plan.restart_reasons == ["src/database/buffers.py", "requirements.txt", "src/cogs/helpers/views.py"]
+    assert plan.reload == ["src.cogs.tracking"]
+
+def _git(repo, *args):
+    return subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True, text=True).stdout.strip()
+
+def test_plan_between_commits(tmp_path, monkeypatch):
+    repo = tmp_path
+    _git(repo, "init", "-q")
+    _git(repo, "config", "user.email", "test@example.com")
+    _git(repo, "config", "user.name", "test")
+    (repo / "src" / "cogs").mkdir(parents=True)
+    (repo / "src" / "cogs" / "roles.py").write_text("A = 1\n")
+    (repo / "src" / "cogs" / "tickets.py").write_text("A = 1\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "old")
+    old = _git(repo, "rev-parse", "HEAD")
+
+    (repo / "src" / "cogs" / "roles.py").write_text("A = 2\n")
+    (repo / "src" / "cogs" / "tickets.py").unlink()
+    (repo / "src" / "cogs" / "automod.py").write_text("A = 1\n")
+    (repo / "docs.md").write_text("notes\n")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "new")
+    new = _git(repo, "rev-parse", "HEAD")
+
+    monkeypatch.chdir(repo)
+    plan = asyncio.run(UpdatePlan.between(old, new))
+    assert plan.extensions == {"reload": ["src.cogs.roles"], "load": ["src.cogs.automod"], "unload": ["src.cogs.tickets"]}
+    assert not plan.restart
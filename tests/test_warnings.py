@@ -0,0 +1,67 @@
+import re
+from datetime import datetime, timedelta
+from src.cogs.moderation import build_warnings_page, WarningsPageButton, WARNINGS_PAGE_SIZE
+from src.database.db import async_session
+from src.database.models import UserProfile, Warning as WarningModel
+
+GUILD_ID = 1
+USER_ID = 10
+
+class FakeGuild:
+    id = GUILD_ID
+
+    def get_member(self, user_id):
+        return None
+
+async def _add_warnings(count, start=datetime(2024, 1, 1)):
+    async with async_session() as session:
+        session.add(UserProfile(user_id=USER_ID, guild_id=GUILD_ID))
+        # Every second pair shares a timestamp, so paging has to break ties on id
+        session.add_all([
+            WarningModel(user_id=USER_ID, guild_id=GUILD_ID, moderator_id=99, reason=f"warning {i}",
+                         timestamp=start + timedelta(minutes=i // 2))
+            for i in range(count)
+        ])
+        await session.commit()
+
+def _reasons(embed):
+    return [re.search(r"warning (\d+)", field.value).group(1) for field in embed.fields]
+
+def _buttons(view):
+    return {button.direction: button for button in view.children}
+
+def _round_trip(button):
+    """The button as rebuilt from its custom_id after a restart."""
+    match = re.fullmatch(WarningsPageButton.__discord_ui_compiled_template__, button.item.custom_id)
+    return WarningsPageButton(match["direction"], int(match["user_id"]), int(match["page"]), int(match["ts"]), int(match["id"]))
+
+def test_pages_walk_every_warning_once_in_both_directions(run):
+    total = WARNINGS_PAGE_SIZE * 2 + 5
+
+    async def scenario():
+        await _add_warnings(total)
+        guild = FakeGuild()
+        pages = []
+
+        embed, view = await build_warnings_page(guild, USER_ID, 1)
+        pages.append((embed, view))
+        while not _buttons(view)["older"].item.disabled:
+            button = _round_trip(_buttons(view)["older"])
+            embed, view = await build_warnings_page(guild, USER_ID, button.page, button.cursor, button.direction)
+            pages.append((embed, view))
+
+        back = []
+        while not _buttons(view)["newer"].item.disabled:
+            button = _round_trip(_buttons(view)["newer"])
+            embed, view = await build_warnings_page(guild, USER_ID, button.page, button.cursor, button.direction)
+            back.append(embed)
+        return pages, back
+
+    pages, back = run(scenario())
+    seen = [reason for embed, _ in pages for reason in _reasons(embed)]
+    assert seen == [str(i) for i in reversed(range(total))]
+    assert [embed.footer.text for embed, _ in pages] == ["Page 1/3", "Page 2/3", "Page 3/3"]
+    assert [_reasons(embed) for embed in back] == [_reasons(pages[1][0]), _reasons(pages[0][0])]
+
+def test_no_warnings(run):
+    assert run(build_warnings_page(FakeGuild(), USER_ID, 1)) is None